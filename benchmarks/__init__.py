@@ -0,0 +1,3 @@
+"""
+Benchmarks del analisis de calidad del agua Villa Verde
+"""
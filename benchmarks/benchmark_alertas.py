@@ -0,0 +1,173 @@
+"""
+BENCHMARK DE REPRODUCCION DE LAS ALERTAS DE LMP
+Convierte la hoja Datos de un libro sintetico en lecturas
+Punto,Variable,Valor,Marca y mide:
+
+  - rendimiento: todas las lecturas evaluadas en memoria lo mas rapido posible
+  - latencia: un productor reproduce las lecturas a un ritmo fijo por el stdin
+    de un proceso con el motor (como en --alertas -), marcando cada lectura al
+    enviarla; el motor reporta los percentiles de latencia de punta a punta
+
+    python -m benchmarks.benchmark_alertas --lecturas 1000000 --ritmo 100000
+
+Antes se verifica que las alertas, con lecturas en CSV y en JSON, coincidan con
+identificar_incumplimientos, y que las lecturas no finitas se descarten.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks.datos_sinteticos import escribir_libro, generar_libro
+from modules.data_loader import organizar_datos
+from modules.limit_alerts import MotorAlertas, formatear_eventos, vigilar
+from modules.lmp_analysis import identificar_incumplimientos
+
+LINEAS_POR_BLOQUE = 1000
+
+# Proceso consumidor: el motor sobre stdin, con el resumen en JSON por stdout
+CONSUMIDOR = """
+import json, os, sys
+from modules.limit_alerts import bloques_descriptor, cargar_motor, vigilar
+motor = cargar_motor(sys.argv[1], usar_cache=False)
+with open(os.devnull, 'w') as salida:
+    vigilar(motor, bloques_descriptor(sys.stdin.fileno()), salida)
+print(json.dumps(motor.resumen()))
+"""
+
+
+def motor_del_libro(hojas):
+    coordenadas = hojas['Coordenadas']
+    return MotorAlertas(hojas['Limites'], dict(zip(coordenadas['Punto'], coordenadas['TipoSistema'])))
+
+
+def lecturas_del_libro(hojas):
+    """
+    Prefijos 'Punto,Variable,Valor,' de cada medicion de las variables con limites
+    """
+    datos = hojas['Datos']
+    variables = [v for v in hojas['Limites']['Variable'].unique() if v in datos.columns]
+    largas = datos.melt(id_vars=['Punto'], value_vars=variables, var_name='Variable', value_name='Valor').dropna()
+    return [f'{p},{v},{x!r},' for p, v, x in zip(largas['Punto'], largas['Variable'], largas['Valor'].astype(float))]
+
+
+def verificar(hojas, prefijos):
+    """
+    Falla con AssertionError si las alertas difieren de la evaluacion por lotes,
+    con las lecturas en CSV y en lineas JSON
+    """
+    variables = list(hojas['Limites']['Variable'].unique())
+    lote = identificar_incumplimientos(organizar_datos(hojas['Datos'], hojas['Coordenadas']), hojas['Limites'],
+                                       [v for v in variables if v in hojas['Datos'].columns])
+    esperadas = Counter(zip(lote['Punto'], lote['Variable'], lote['Tipo'], lote['LMP'].astype(float)))
+    csv = ''.join(p + '0\n' for p in prefijos)
+    lineas_json = ''.join(json.dumps({'Punto': p, 'Variable': v, 'Valor': float(x), 'Marca': 0}) + '\n'
+                          for p, v, x, _ in (p.split(',') for p in prefijos))
+    for formato, texto in (('CSV', csv), ('JSON', lineas_json)):
+        eventos, _ = motor_del_libro(hojas).procesar(texto)
+        eventos = [json.loads(linea) for linea in formatear_eventos(eventos, 0).splitlines()]
+        obtenidas = Counter((e['Punto'], e['Variable'], e['Tipo'], e['LMP']) for e in eventos)
+        assert obtenidas == esperadas, \
+            f"{formato}: {sum(obtenidas.values())} alertas vs {sum(esperadas.values())} por lotes"
+
+    # Valores o marcas no finitos: no generan alertas (no serian JSON valido) y cuentan como invalidas
+    motor = motor_del_libro(hojas)
+    punto, variable = next(iter(motor.reglas))
+    no_finitas = [f'{punto},{variable},1e999,0', f'{punto},{variable},-inf,0', f'{punto},{variable},nan,0',
+                  f'{punto},{variable},1,inf',
+                  f'{{"Punto": "{punto}", "Variable": "{variable}", "Valor": Infinity, "Marca": 0}}',
+                  f'{{"Punto": "{punto}", "Variable": "{variable}", "Valor": NaN, "Marca": 0}}']
+    eventos_no_finitos, _ = motor.procesar('\n'.join(no_finitas) + '\n')
+    assert not eventos_no_finitos and motor.invalidas == len(no_finitas), \
+        f"{len(eventos_no_finitos)} alertas y {motor.invalidas} invalidas con {len(no_finitas)} lecturas no finitas"
+    return len(eventos)
+
+
+def medir_rendimiento(hojas, prefijos, lecturas):
+    marca = f'{time.time():.6f}\n'
+    lineas = [prefijos[i % len(prefijos)] + marca for i in range(lecturas)]
+    bloques = [''.join(lineas[i:i + LINEAS_POR_BLOQUE]) for i in range(0, lecturas, LINEAS_POR_BLOQUE)]
+    motor = motor_del_libro(hojas)
+    inicio = time.perf_counter()
+    vigilar(motor, iter(bloques), io.StringIO())
+    segundos = time.perf_counter() - inicio
+    return {'lecturas': lecturas, 'segundos': round(segundos, 3), 'lecturas_por_segundo': round(lecturas / segundos),
+            'alertas': motor.alertas}
+
+
+def reproducir(ruta_libro, prefijos, lecturas, ritmo, tick=0.001):
+    """
+    Envia las lecturas al proceso consumidor en tandas cada tick segundos al
+    ritmo pedido (lecturas/s) y retorna el resumen del motor
+    """
+    consumidor = subprocess.Popen([sys.executable, '-c', CONSUMIDOR, ruta_libro], stdin=subprocess.PIPE,
+                                  stdout=subprocess.PIPE)
+    # Espera a que el motor este cargado para no medir su arranque
+    time.sleep(2)
+    por_tick = max(1, round(ritmo * tick))
+    enviadas = 0
+    inicio = time.perf_counter()
+    while enviadas < lecturas:
+        tanda = min(por_tick, lecturas - enviadas)
+        marca = f'{time.time():.6f}\n'
+        consumidor.stdin.write(''.join(prefijos[(enviadas + i) % len(prefijos)] + marca
+                                       for i in range(tanda)).encode())
+        consumidor.stdin.flush()
+        enviadas += tanda
+        # Ritmo constante: espera hasta la hora de la proxima tanda
+        espera = inicio + enviadas / ritmo - time.perf_counter()
+        if espera > 0:
+            time.sleep(espera)
+    segundos = time.perf_counter() - inicio
+    consumidor.stdin.close()
+    resumen = json.loads(consumidor.stdout.read())
+    consumidor.wait()
+    resumen['ritmo_logrado'] = round(enviadas / segundos)
+    return resumen
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de reproduccion de lecturas contra el motor de alertas")
+    parser.add_argument('--puntos', type=int, default=500, help="Puntos del libro sintetico")
+    parser.add_argument('--lecturas', type=int, default=1_000_000, help="Lecturas de la prueba de rendimiento")
+    parser.add_argument('--ritmo', type=int, default=100_000, help="Lecturas por segundo de la reproduccion")
+    parser.add_argument('--segundos', type=float, default=5.0, help="Duracion de la reproduccion")
+    parser.add_argument('--salida', default=None, help="Ruta opcional del JSON de resultados")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='villaverde_alertas_') as directorio:
+        with contextlib.redirect_stdout(io.StringIO()):
+            hojas = generar_libro(args.puntos, 12)
+            ruta_libro, _ = escribir_libro(hojas, directorio, 'libro', parquet=False)
+        prefijos = lecturas_del_libro(hojas)
+        with contextlib.redirect_stdout(io.StringIO()):
+            alertas = verificar(hojas, prefijos)
+        print(f"\n=== {len(prefijos)} lecturas por reproduccion del libro ({alertas} alertas, "
+              f"iguales a la evaluacion por lotes) ===")
+
+        rendimiento = medir_rendimiento(hojas, prefijos, args.lecturas)
+        print(f"  rendimiento   {rendimiento['lecturas_por_segundo']:>10,} lecturas/s "
+              f"({rendimiento['lecturas']:,} en {rendimiento['segundos']} s, un nucleo)")
+
+        reproduccion = reproducir(ruta_libro, prefijos, int(args.ritmo * args.segundos), args.ritmo)
+        latencia = reproduccion['latencia_ms']
+        print(f"  reproduccion  {reproduccion['ritmo_logrado']:>10,} lecturas/s durante {args.segundos} s "
+              f"({reproduccion['alertas']} alertas)")
+        print(f"  latencia (ms) p50 {latencia['p50']}  p90 {latencia['p90']}  p99 {latencia['p99']}  "
+              f"p99.9 {latencia['p99.9']}  max {latencia['max']}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            json.dump({'rendimiento': rendimiento, 'reproduccion': reproduccion}, archivo, indent=2)
+        print(f"\nResultados guardados en: {args.salida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+BENCHMARK DE LOS INTERVALOS POR BOOTSTRAP
+Genera un libro sintetico y mide intervalos_medias (todas las medias por
+punto y variable del grupo) e intervalos_porcentajes con 10k remuestreos:
+
+    python -m benchmarks.benchmark_bootstrap --escala 2000x4 --remuestreos 10000
+
+Tambien compara el intervalo de una serie con un bootstrap de referencia
+hecho con un ciclo de Python (deben diferir solo por el azar del muestreo).
+"""
+
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from benchmarks.benchmark_pipeline import leer_escala, medir
+from benchmarks.datos_sinteticos import generar_libro
+from modules.bootstrap import NIVEL_CONFIANZA, intervalos_medias, intervalos_porcentajes
+from modules.data_loader import VARIABLES_GRUPO, organizar_datos
+from modules.lmp_analysis import calcular_porcentajes
+
+
+def bootstrap_con_ciclo(valores, remuestreos, nivel=NIVEL_CONFIANZA, semilla=1):
+    """
+    Referencia: un remuestreo por iteracion
+    """
+    rng = np.random.default_rng(semilla)
+    medias = [rng.choice(valores, len(valores)).mean() for _ in range(remuestreos)]
+    alfa = (1 - nivel) / 2
+    return np.quantile(medias, [alfa, 1 - alfa])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de intervalos de confianza por bootstrap")
+    parser.add_argument('--escala', type=leer_escala, default=leer_escala('2000x4'), metavar='PUNTOSxCAMPANAS',
+                        help="Tamaño del libro sintetico (por defecto: 2000x4)")
+    parser.add_argument('--remuestreos', type=int, default=10_000, help="Remuestreos por intervalo")
+    parser.add_argument('--salida', default=None, help="Ruta opcional del JSON de resultados")
+    args = parser.parse_args(argv)
+
+    puntos, campanas = args.escala
+    hojas, _, _ = medir(lambda: generar_libro(puntos, campanas), memoria=False)
+    datos_organizados, _, _ = medir(lambda: organizar_datos(hojas['Datos'], hojas['Coordenadas']), memoria=False)
+    porcentajes = calcular_porcentajes(datos_organizados, hojas['Limites'], VARIABLES_GRUPO)
+
+    print(f"\n=== {puntos}x{campanas}, {args.remuestreos} remuestreos ===")
+    medias, segundos_medias, _ = medir(lambda: intervalos_medias(datos_organizados, VARIABLES_GRUPO,
+                                                                 args.remuestreos), memoria=False)
+    print(f"  {'medias':<12} {segundos_medias:>8.3f} s  ({len(medias)} intervalos)")
+    _, segundos_porcentajes, _ = medir(lambda: intervalos_porcentajes(porcentajes, args.remuestreos),
+                                       memoria=False)
+    print(f"  {'porcentajes':<12} {segundos_porcentajes:>8.3f} s  ({len(porcentajes)} intervalos)")
+
+    primera = medias.iloc[0]
+    df = datos_organizados[primera['TipoSistema']]
+    valores = df.loc[df['Punto'] == primera['Punto'], primera['Variable']].dropna().to_numpy()
+    referencia = bootstrap_con_ciclo(valores, args.remuestreos)
+    print(f"  {primera['Punto']}/{primera['Variable']}: [{primera['IC_inf']:.4g}, {primera['IC_sup']:.4g}] "
+          f"vs ciclo [{referencia[0]:.4g}, {referencia[1]:.4g}]")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            json.dump({'escala': f'{puntos}x{campanas}', 'remuestreos': args.remuestreos,
+                       'intervalos_medias': len(medias), 'segundos_medias': segundos_medias,
+                       'segundos_porcentajes': segundos_porcentajes}, archivo, indent=2)
+        print(f"\nResultados guardados en: {args.salida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+BENCHMARK DE LA CARGA DE VARIOS LIBROS
+Escribe un libro sintetico por zona y mide cargar_libros (sin cache, es decir
+parseando cada libro con openpyxl) en serie y con pools de distinto tamaño:
+
+    python -m benchmarks.benchmark_carga --zonas 8 --escala 100x20 --trabajadores 1 2 4
+
+El rendimiento (libros por segundo) deberia crecer con los trabajadores hasta
+el numero de nucleos.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+
+from benchmarks.benchmark_pipeline import leer_escala, medir
+from benchmarks.datos_sinteticos import escribir_libro, generar_libro
+from modules.data_loader import cargar_libros
+
+
+def main(argv=None):
+    nucleos = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Benchmark de la carga concurrente de un libro por zona")
+    parser.add_argument('--zonas', type=int, default=8, help="Libros a generar (uno por zona)")
+    parser.add_argument('--escala', type=leer_escala, default=leer_escala('100x20'), metavar='PUNTOSxCAMPANAS',
+                        help="Tamaño de cada libro (por defecto: 100x20)")
+    parser.add_argument('--trabajadores', type=int, nargs='+', default=sorted({1, nucleos}),
+                        help="Tamaños de pool a medir (por defecto: 1 y el numero de nucleos)")
+    parser.add_argument('--repeticiones', type=int, default=1, help="Corridas por medicion; se reporta la menor")
+    parser.add_argument('--salida', default=None, help="Ruta opcional del JSON de resultados")
+    args = parser.parse_args(argv)
+
+    puntos, campanas = args.escala
+    resultado = {'zonas': args.zonas, 'escala': f'{puntos}x{campanas}', 'nucleos': nucleos, 'mediciones': {}}
+    with tempfile.TemporaryDirectory(prefix='villaverde_carga_') as directorio:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for zona in range(args.zonas):
+                escribir_libro(generar_libro(puntos, campanas, semilla=zona), directorio, f'zona_{zona:03d}',
+                               parquet=False)
+        print(f"\n=== {args.zonas} libros de {puntos}x{campanas} ({nucleos} nucleos) ===")
+
+        for trabajadores in args.trabajadores:
+            hojas, segundos, _ = medir(lambda: cargar_libros(directorio, trabajadores=trabajadores, usar_cache=False),
+                                       args.repeticiones, memoria=False)
+            libros_por_segundo = round(args.zonas / segundos, 2)
+            resultado['mediciones'][trabajadores] = {'segundos': segundos, 'libros_por_segundo': libros_por_segundo,
+                                                     'filas': len(hojas['Datos'])}
+            print(f"  {trabajadores:>3} trabajadores  {segundos:>8.3f} s  {libros_por_segundo:>7.2f} libros/s")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en: {args.salida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
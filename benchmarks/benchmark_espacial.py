@@ -0,0 +1,84 @@
+"""
+BENCHMARK DEL INDICE ESPACIAL
+Estaciones al azar (con un cumulo denso para probar celdas llenas) y mide la
+construccion del indice, las k mas cercanas de muchas consultas y una
+superficie IDW de alta resolucion:
+
+    python -m benchmarks.benchmark_espacial --estaciones 5000 --resolucion 1000
+
+Las k mas cercanas de una muestra de consultas se verifican contra fuerza bruta.
+"""
+
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from benchmarks.benchmark_pipeline import medir
+from modules.spatial_index import VECINOS_IDW, IndiceEspacial, interpolar_idw
+
+LADO = 50_000.0
+
+
+def estaciones_sinteticas(cantidad, semilla=0):
+    rng = np.random.default_rng(semilla)
+    x = rng.uniform(0, LADO, cantidad)
+    y = rng.uniform(0, LADO, cantidad)
+    # Un 10% de las estaciones en un cumulo de 100 m
+    cumulo = cantidad // 10
+    x[:cumulo] = rng.normal(LADO / 4, 100, cumulo)
+    y[:cumulo] = rng.normal(LADO / 4, 100, cumulo)
+    return x, y, rng.lognormal(2, 1, cantidad)
+
+
+def verificar(indice, x, y, k, consultas=2000, semilla=1):
+    """
+    Falla con AssertionError si cercanas difiere de la busqueda por fuerza bruta
+    (las consultas incluyen puntos fuera de la extension de las estaciones)
+    """
+    rng = np.random.default_rng(semilla)
+    qx = rng.uniform(-0.2 * LADO, 1.2 * LADO, consultas)
+    qy = rng.uniform(-0.2 * LADO, 1.2 * LADO, consultas)
+    distancias, _indices = indice.cercanas(qx, qy, k)
+    todas = np.hypot(qx[:, None] - x, qy[:, None] - y)
+    np.testing.assert_allclose(distancias, np.sort(todas, axis=1)[:, :k])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del indice espacial y la interpolacion IDW")
+    parser.add_argument('--estaciones', type=int, default=5000, help="Estaciones sinteticas")
+    parser.add_argument('--consultas', type=int, default=100_000, help="Consultas de k mas cercanas")
+    parser.add_argument('--resolucion', type=int, default=1000, help="Nodos por lado de la superficie IDW")
+    parser.add_argument('--vecinos', type=int, default=VECINOS_IDW, help="k de las consultas y de IDW")
+    parser.add_argument('--salida', default=None, help="Ruta opcional del JSON de resultados")
+    args = parser.parse_args(argv)
+
+    x, y, valores = estaciones_sinteticas(args.estaciones)
+    indice, segundos_indice, _ = medir(lambda: IndiceEspacial(np.arange(len(x)), x, y), memoria=False)
+    verificar(indice, x, y, args.vecinos)
+
+    rng = np.random.default_rng(2)
+    qx, qy = rng.uniform(0, LADO, args.consultas), rng.uniform(0, LADO, args.consultas)
+    _, segundos_cercanas, _ = medir(lambda: indice.cercanas(qx, qy, args.vecinos), memoria=False)
+
+    malla_x, malla_y = np.meshgrid(np.linspace(0, LADO, args.resolucion), np.linspace(0, LADO, args.resolucion))
+    _, segundos_idw, _ = medir(lambda: interpolar_idw(indice, valores, malla_x, malla_y, args.vecinos),
+                               memoria=False)
+
+    print(f"\n=== {args.estaciones} estaciones ({indice.nx}x{indice.ny} celdas), k={args.vecinos} ===")
+    print(f"  {'indice':<28} {segundos_indice:>8.3f} s")
+    print(f"  {f'{args.consultas} consultas':<28} {segundos_cercanas:>8.3f} s  (verificadas con fuerza bruta)")
+    print(f"  {f'IDW {args.resolucion}x{args.resolucion}':<28} {segundos_idw:>8.3f} s")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            json.dump({'estaciones': args.estaciones, 'vecinos': args.vecinos, 'segundos_indice': segundos_indice,
+                       'consultas': args.consultas, 'segundos_cercanas': segundos_cercanas,
+                       'resolucion': args.resolucion, 'segundos_idw': segundos_idw}, archivo, indent=2)
+        print(f"\nResultados guardados en: {args.salida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
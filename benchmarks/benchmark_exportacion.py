@@ -0,0 +1,75 @@
+"""
+BENCHMARK DE LA EXPORTACION A EXCEL
+Compara el escritor anterior (pd.ExcelWriter con openpyxl, una hoja a la vez)
+con modules.export (openpyxl write-only y, si esta instalado, xlsxwriter en
+constant_memory) sobre las tablas de estadisticas de un libro sintetico:
+
+    python -m benchmarks.benchmark_exportacion --escalas 100x20 1000x100
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+from benchmarks.benchmark_pipeline import leer_escala, medir
+from benchmarks.datos_sinteticos import generar_libro
+from modules.data_loader import organizar_datos
+from modules.descriptive_stats import construir_tablas_estadisticas
+from modules.export import escribir_excel, motor_excel
+
+ESCALAS = ['100x20', '500x20']
+
+
+def escribir_con_pandas(hojas, ruta):
+    """
+    Escritor de referencia: pd.ExcelWriter con el motor openpyxl
+    """
+    with pd.ExcelWriter(ruta, engine='openpyxl') as writer:
+        for nombre, df in hojas:
+            df.to_excel(writer, sheet_name=nombre, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de la exportacion de estadisticas a Excel")
+    parser.add_argument('--escalas', nargs='+', type=leer_escala, default=[leer_escala(e) for e in ESCALAS],
+                        metavar='PUNTOSxCAMPANAS', help=f"Escalas a medir (por defecto: {' '.join(ESCALAS)})")
+    parser.add_argument('--salida', default=None, help="Ruta opcional del JSON de resultados")
+    args = parser.parse_args(argv)
+
+    escritores = {'pandas_openpyxl': escribir_con_pandas,
+                  'openpyxl_write_only': lambda hojas, ruta: escribir_excel(hojas, ruta, 'openpyxl')}
+    if motor_excel() == 'xlsxwriter':
+        escritores['xlsxwriter_constant_memory'] = lambda hojas, ruta: escribir_excel(hojas, ruta, 'xlsxwriter')
+
+    resultado = {}
+    with tempfile.TemporaryDirectory(prefix='villaverde_export_') as directorio:
+        for puntos, campanas in args.escalas:
+            with contextlib.redirect_stdout(io.StringIO()):
+                hojas = generar_libro(puntos, campanas)
+                tablas = construir_tablas_estadisticas(organizar_datos(hojas['Datos'], hojas['Coordenadas']))
+            escala = f'{puntos}x{campanas}'
+            print(f"\n=== {escala}: {len(tablas)} hojas, {sum(len(df) for _, df in tablas)} filas ===")
+
+            resultado[escala] = {}
+            for nombre, escribir in escritores.items():
+                ruta = os.path.join(directorio, f'{nombre}_{escala}.xlsx')
+                _, segundos, pico = medir(lambda: escribir(tablas, ruta))
+                resultado[escala][nombre] = {'segundos': segundos, 'memoria_pico_mb': pico,
+                                             'bytes_archivo': os.path.getsize(ruta)}
+                print(f"  {nombre:<28} {segundos:>8.3f} s  {pico:>8.2f} MB")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en: {args.salida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+BENCHMARK DE LA EJECUCION POR FRAGMENTOS
+Genera un libro sintetico, calcula las estadisticas por punto y la evaluacion
+de LMP en un solo proceso y por fragmentos (por TipoSistema) con pools de
+distinto tamaño, verifica que las tablas sean iguales y reporta los tiempos:
+
+    python -m benchmarks.benchmark_fragmentos --escala 300x20 --trabajadores 1 2 4
+
+Con un solo nucleo el pool no acelera; la ganancia aparece con tantos
+nucleos como sistemas.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from pandas.testing import assert_frame_equal
+
+from benchmarks.benchmark_pipeline import leer_escala, medir
+from benchmarks.datos_sinteticos import generar_libro
+from modules.data_loader import organizar_datos
+from modules.descriptive_stats import construir_tablas_estadisticas
+from modules.lmp_analysis import calcular_porcentajes, identificar_incumplimientos
+from modules.schema import descubrir_esquema
+from modules.sharding import analizar_por_fragmentos
+
+
+def en_un_proceso(datos_organizados, limites, variables):
+    """
+    Referencia: estadisticas por punto, incumplimientos y porcentajes sin fragmentar
+    """
+    hojas = [(nombre, df) for nombre, df in construir_tablas_estadisticas(datos_organizados, variables)
+             if nombre.endswith('_Puntos')]
+    return {'estadisticas': hojas,
+            'incumplimientos': identificar_incumplimientos(datos_organizados, limites, variables),
+            'porcentajes': calcular_porcentajes(datos_organizados, limites, variables)}
+
+
+def verificar(esperado, obtenido):
+    """
+    Falla con AssertionError si los resultados por fragmentos difieren de la referencia
+    """
+    assert [n for n, _ in esperado['estadisticas']] == [n for n, _ in obtenido['estadisticas']]
+    for (nombre, df_esperado), (_, df_obtenido) in zip(esperado['estadisticas'], obtenido['estadisticas']):
+        assert_frame_equal(df_esperado, df_obtenido, check_dtype=False, obj=nombre)
+    for tabla in ('incumplimientos', 'porcentajes'):
+        assert_frame_equal(esperado[tabla].reset_index(drop=True), obtenido[tabla].reset_index(drop=True),
+                           check_dtype=False, obj=tabla)
+
+
+def main(argv=None):
+    nucleos = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Benchmark de estadisticas y LMP por fragmentos")
+    parser.add_argument('--escala', type=leer_escala, default=leer_escala('300x20'), metavar='PUNTOSxCAMPANAS',
+                        help="Tamaño del libro sintetico (por defecto: 300x20)")
+    parser.add_argument('--trabajadores', type=int, nargs='+', default=sorted({1, nucleos}),
+                        help="Tamaños de pool a medir (por defecto: 1 y el numero de nucleos)")
+    parser.add_argument('--repeticiones', type=int, default=1, help="Corridas por medicion; se reporta la menor")
+    parser.add_argument('--salida', default=None, help="Ruta opcional del JSON de resultados")
+    args = parser.parse_args(argv)
+
+    puntos, campanas = args.escala
+    hojas, _, _ = medir(lambda: generar_libro(puntos, campanas), memoria=False)
+    datos_organizados, _, _ = medir(lambda: organizar_datos(hojas['Datos'], hojas['Coordenadas']), memoria=False)
+    limites = hojas['Limites']
+    variables = descubrir_esquema(datos_organizados, limites).variables_grupo
+
+    print(f"\n=== {puntos}x{campanas}, {len(datos_organizados)} sistemas ({nucleos} nucleos) ===")
+    esperado, segundos, _ = medir(lambda: en_un_proceso(datos_organizados, limites, variables),
+                                  args.repeticiones, memoria=False)
+    resultado = {'escala': f'{puntos}x{campanas}', 'nucleos': nucleos,
+                 'un_proceso': {'segundos': segundos}, 'fragmentos': {}}
+    print(f"  {'un proceso':<16} {segundos:>8.3f} s")
+
+    for trabajadores in args.trabajadores:
+        obtenido, segundos, _ = medir(lambda: analizar_por_fragmentos(datos_organizados, limites, variables,
+                                                                      trabajadores=trabajadores),
+                                      args.repeticiones, memoria=False)
+        verificar(esperado, obtenido)
+        resultado['fragmentos'][trabajadores] = {'segundos': segundos}
+        print(f"  {f'{trabajadores} trabajadores':<16} {segundos:>8.3f} s  (tablas iguales)")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en: {args.salida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
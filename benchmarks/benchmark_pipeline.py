@@ -0,0 +1,231 @@
+"""
+BENCHMARK DEL PIPELINE POR ETAPAS
+Genera libros sinteticos a varias escalas (puntos x campañas) y mide tiempo
+y memoria pico de cada etapa: carga, organizacion, consultas puntuales,
+estadisticas, graficas, evaluacion de LMP y exportacion a Excel. El resultado se guarda en JSON para
+comparar versiones:
+
+    python -m benchmarks.benchmark_pipeline
+    python -m benchmarks.benchmark_pipeline --escalas 8x4 3000x300 --comparar anterior.json
+
+El tiempo se toma en una corrida sin tracemalloc (el rastreo agrega overhead)
+y la memoria pico en otra corrida rastreada. La memoria de las graficas solo
+cuenta el proceso principal; los procesos del pool no se rastrean.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.datos_sinteticos import escribir_libro, generar_libro
+from modules.data_loader import HOJAS, cargar_hojas, organizar_datos
+from modules.descriptive_stats import construir_tablas_estadisticas, exportar_estadisticas
+from modules.lmp_analysis import (calcular_porcentajes, exportar_resultados_lmp, graficar_limites,
+                                  identificar_incumplimientos)
+from modules.measurement_store import AlmacenMediciones, construir_almacen
+from modules.visualization import generar_graficas_patrones
+
+ESCALAS = ['8x4', '100x20', '1000x100']
+DIRECTORIO_BENCHMARKS = 'results/benchmarks'
+TOLERANCIA = 0.25
+# Diferencias por debajo de este piso son ruido de medicion
+PISO_SEGUNDOS = 0.05
+PISO_MEMORIA_MB = 1.0
+
+
+def leer_escala(texto):
+    """
+    Convierte '100x20' en (100, 20)
+    """
+    try:
+        puntos, campanas = (int(parte) for parte in texto.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Escala invalida: {texto} (formato PUNTOSxCAMPANAS)")
+    if puntos < 1 or campanas < 1:
+        raise argparse.ArgumentTypeError(f"Escala invalida: {texto}")
+    return puntos, campanas
+
+
+def medir(funcion, repeticiones=1, memoria=True):
+    """
+    Ejecuta funcion() en silencio y retorna (resultado, segundos, memoria_pico_mb).
+    segundos es el minimo de las repeticiones; la memoria sale de una corrida aparte.
+    """
+    segundos = []
+    for _ in range(repeticiones):
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            resultado = funcion()
+            segundos.append(time.perf_counter() - inicio)
+
+    pico = None
+    if memoria:
+        tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                funcion()
+            pico = round(tracemalloc.get_traced_memory()[1] / 1024 ** 2, 2)
+        finally:
+            tracemalloc.stop()
+    return resultado, round(min(segundos), 4), pico
+
+
+def medir_escala(puntos, campanas, directorio, trabajadores=None, repeticiones=1, memoria=True,
+                 graficas=True):
+    """
+    Corre todas las etapas sobre un libro sintetico de puntos x campañas.
+    Retorna {etapa: {'segundos': s, 'memoria_pico_mb': mb}}.
+    """
+    nombre = f'villaverde_{puntos}x{campanas}'
+    with contextlib.redirect_stdout(io.StringIO()):
+        hojas = generar_libro(puntos, campanas)
+        ruta_xlsx, rutas_parquet = escribir_libro(hojas, directorio, nombre)
+    directorio_cache = os.path.join(directorio, '.cache')
+    directorio_graficas = os.path.join(directorio, 'graficas')
+
+    etapas = {}
+
+    def registrar(etapa, funcion):
+        resultado, segundos, pico = medir(funcion, repeticiones, memoria)
+        etapas[etapa] = {'segundos': segundos, 'memoria_pico_mb': pico}
+        print(f"  {etapa:<16} {segundos:>9.3f} s" + (f"  {pico:>9.2f} MB" if pico is not None else ''))
+        return resultado
+
+    cargadas = registrar('carga', lambda: cargar_hojas(ruta_xlsx, HOJAS, usar_cache=False))
+    # La primera lectura llena la cache; la etapa mide la lectura ya en caliente
+    cargar_hojas(ruta_xlsx, HOJAS, directorio_cache=directorio_cache)
+    registrar('carga_cache', lambda: cargar_hojas(ruta_xlsx, HOJAS, directorio_cache=directorio_cache))
+    if rutas_parquet:
+        registrar('carga_parquet', lambda: {hoja: pd.read_parquet(ruta) for hoja, ruta in rutas_parquet.items()})
+
+    datos, coordenadas, limites = cargadas['Datos'], cargadas['Coordenadas'], cargadas['Limites']
+    organizados = registrar('organizacion', lambda: organizar_datos(datos, coordenadas))
+    # Consulta puntual (una variable de un punto): releyendo la cache del libro vs el almacen mapeado
+    directorio_almacen = os.path.join(directorio_cache, f'{nombre}-mediciones')
+    registrar('almacen', lambda: construir_almacen(organizados, directorio_almacen))
+    punto = coordenadas['Punto'].iloc[-1]
+    def consultar_cache():
+        datos_cache = cargar_hojas(ruta_xlsx, ['Datos'], directorio_cache=directorio_cache)['Datos']
+        return datos_cache.loc[datos_cache['Punto'] == punto, ['Punto', 'Campaña', 'Turb_NTU']]
+
+    registrar('consulta_cache', consultar_cache)
+    registrar('consulta_almacen', lambda: AlmacenMediciones(directorio_almacen).consultar(['Turb_NTU'], [punto]))
+    tablas = registrar('estadisticas', lambda: construir_tablas_estadisticas(organizados))
+    df_inc, df_por = registrar('lmp', lambda: (identificar_incumplimientos(organizados, limites),
+                                                calcular_porcentajes(organizados, limites)))
+    if graficas:
+        registrar('graficas', lambda: (
+            generar_graficas_patrones(organizados, limites, trabajadores, incremental=False,
+                                      directorio=directorio_graficas),
+            graficar_limites(organizados, limites, trabajadores, incremental=False,
+                             directorio=directorio_graficas)))
+    registrar('exportacion', lambda: (
+        exportar_estadisticas(tablas, os.path.join(directorio, 'estadisticas.xlsx')),
+        exportar_resultados_lmp(df_inc, df_por, os.path.join(directorio, 'resultados_lmp.xlsx'))))
+
+    return {'filas': len(datos), 'etapas': etapas}
+
+
+def _commit_actual():
+    """
+    Hash corto del commit actual, o None fuera de un repositorio git
+    """
+    try:
+        salida = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return salida.stdout.strip()
+
+
+def comparar_resultados(actual, anterior, tolerancia=TOLERANCIA):
+    """
+    Retorna la lista de (escala, etapa, metrica, antes, ahora) que empeoraron
+    mas que la tolerancia relativa (y mas que el piso absoluto de la metrica)
+    """
+    pisos = {'segundos': PISO_SEGUNDOS, 'memoria_pico_mb': PISO_MEMORIA_MB}
+    regresiones = []
+    for escala, medicion in actual['escalas'].items():
+        previa = anterior.get('escalas', {}).get(escala)
+        if previa is None:
+            continue
+        for etapa, valores in medicion['etapas'].items():
+            valores_previos = previa['etapas'].get(etapa, {})
+            for metrica, ahora in valores.items():
+                antes = valores_previos.get(metrica)
+                if (antes and ahora is not None and ahora > antes * (1 + tolerancia)
+                        and ahora - antes > pisos.get(metrica, 0)):
+                    regresiones.append((escala, etapa, metrica, antes, ahora))
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark por etapas con datos sinteticos de Villa Verde")
+    parser.add_argument('--escalas', nargs='+', type=leer_escala, default=[leer_escala(e) for e in ESCALAS],
+                        metavar='PUNTOSxCAMPANAS', help=f"Escalas a medir (por defecto: {' '.join(ESCALAS)})")
+    parser.add_argument('--repeticiones', type=int, default=1,
+                        help="Corridas por etapa; se reporta el menor tiempo")
+    parser.add_argument('--trabajadores', type=int, default=None,
+                        help="Procesos para renderizar graficas (por defecto, todos los nucleos)")
+    parser.add_argument('--sin-memoria', action='store_true', help="No medir memoria pico (mas rapido)")
+    parser.add_argument('--sin-graficas', action='store_true', help="Omitir la etapa de graficas")
+    parser.add_argument('--salida', default=None, help="Ruta del JSON de resultados")
+    parser.add_argument('--comparar', metavar='ANTERIOR.json', default=None,
+                        help="JSON de una corrida anterior para detectar regresiones")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA,
+                        help="Empeoramiento relativo tolerado al comparar (por defecto: %(default)s)")
+    args = parser.parse_args(argv)
+
+    resultado = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit_actual(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'nucleos': os.cpu_count(),
+        'escalas': {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix='villaverde_bench_') as directorio:
+        for puntos, campanas in args.escalas:
+            print(f"\n=== {puntos} puntos x {campanas} campañas ({puntos * campanas} filas) ===")
+            resultado['escalas'][f'{puntos}x{campanas}'] = medir_escala(
+                puntos, campanas, os.path.join(directorio, f'{puntos}x{campanas}'), args.trabajadores,
+                args.repeticiones, not args.sin_memoria, not args.sin_graficas)
+
+    ruta_salida = args.salida or os.path.join(
+        DIRECTORIO_BENCHMARKS, f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(ruta_salida) or '.', exist_ok=True)
+    with open(ruta_salida, 'w', encoding='utf-8') as archivo:
+        json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en: {ruta_salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            anterior = json.load(archivo)
+        regresiones = comparar_resultados(resultado, anterior, args.tolerancia)
+        if not regresiones:
+            print(f"Sin regresiones frente a {args.comparar} (tolerancia {args.tolerancia:.0%})")
+            return 0
+        print(f"Regresiones frente a {args.comparar} (tolerancia {args.tolerancia:.0%}):")
+        for escala, etapa, metrica, antes, ahora in regresiones:
+            print(f"  - {escala} {etapa} {metrica}: {antes} -> {ahora}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
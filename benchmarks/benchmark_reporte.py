@@ -0,0 +1,77 @@
+"""
+BENCHMARK DEL REPORTE HTML FRENTE A LOS PNG
+Genera un libro sintetico y compara, para las mismas variables y vistas,
+las graficas PNG a 300 dpi (patrones y LMP, renderizado completo sin
+manifiesto) con el reporte HTML: tiempo, archivos y espacio en disco.
+
+    python -m benchmarks.benchmark_reporte --escala 200x20 --trabajadores 1
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from benchmarks.benchmark_pipeline import leer_escala, medir
+from benchmarks.datos_sinteticos import generar_libro
+from modules.data_loader import organizar_datos
+from modules.html_report import generar_reporte
+from modules.lmp_analysis import graficar_limites
+from modules.schema import descubrir_esquema
+from modules.visualization import generar_graficas_patrones
+
+
+def tamano_directorio(directorio):
+    archivos = [os.path.join(directorio, n) for n in os.listdir(directorio) if not n.endswith('.json')]
+    return len(archivos), sum(os.path.getsize(a) for a in archivos)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del reporte HTML frente a las graficas PNG")
+    parser.add_argument('--escala', type=leer_escala, default=leer_escala('200x20'), metavar='PUNTOSxCAMPANAS',
+                        help="Tamaño del libro sintetico (por defecto: 200x20)")
+    parser.add_argument('--trabajadores', type=int, default=None,
+                        help="Procesos para renderizar los PNG (por defecto todos los nucleos)")
+    parser.add_argument('--salida', default=None, help="Ruta opcional del JSON de resultados")
+    args = parser.parse_args(argv)
+
+    puntos, campanas = args.escala
+    hojas, _, _ = medir(lambda: generar_libro(puntos, campanas), memoria=False)
+    datos_organizados, _, _ = medir(lambda: organizar_datos(hojas['Datos'], hojas['Coordenadas']), memoria=False)
+    limites = hojas['Limites']
+    esquema = descubrir_esquema(datos_organizados, limites)
+
+    with tempfile.TemporaryDirectory(prefix='villaverde_reporte_') as directorio:
+        graficas = os.path.join(directorio, 'graficas')
+
+        def png():
+            generar_graficas_patrones(datos_organizados, limites, args.trabajadores, incremental=False,
+                                      directorio=graficas, esquema=esquema)
+            graficar_limites(datos_organizados, limites, args.trabajadores, incremental=False,
+                             directorio=graficas, esquema=esquema)
+
+        ruta_html = os.path.join(directorio, 'reporte.html')
+        _, segundos_png, _ = medir(png, memoria=False)
+        _, segundos_html, _ = medir(lambda: generar_reporte(datos_organizados, limites, ruta_html, esquema),
+                                    memoria=False)
+        archivos_png, bytes_png = tamano_directorio(graficas)
+        bytes_html = os.path.getsize(ruta_html)
+
+    print(f"\n=== {puntos}x{campanas}: {len(esquema.variables_clave)} variables clave, "
+          f"{len(esquema.variables_con_limites)} con LMP ===")
+    print(f"  {'PNG (300 dpi)':<16} {segundos_png:>8.3f} s  {archivos_png:>3} archivos  {bytes_png / 1024 ** 2:>8.2f} MB")
+    print(f"  {'HTML':<16} {segundos_html:>8.3f} s  {1:>3} archivo   {bytes_html / 1024 ** 2:>8.2f} MB")
+    print(f"  {'Mejora':<16} {segundos_png / segundos_html:>7.1f}x  {'':>13} {bytes_png / bytes_html:>7.1f}x")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            json.dump({'escala': f'{puntos}x{campanas}', 'segundos_png': segundos_png, 'bytes_png': bytes_png,
+                       'archivos_png': archivos_png, 'segundos_html': segundos_html, 'bytes_html': bytes_html},
+                      archivo, indent=2)
+        print(f"\nResultados guardados en: {args.salida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+BENCHMARK DEL SERVICIO DE CONSULTAS
+Levanta el servicio HTTP sobre un libro sintetico y mide la latencia de las
+consultas con varios clientes concurrentes (una conexion HTTP/1.1 por
+cliente), y luego reescribe el libro para medir cuanto tarda la recarga en
+caliente mientras los clientes siguen consultando. La escritura del libro
+nuevo corre en este mismo proceso y tambien compite por el GIL con los
+clientes, por eso se mide aparte: la recarga se cuenta desde que el libro
+nuevo esta completo hasta que se sirve la version 2.
+
+    python -m benchmarks.benchmark_servicio --escala 200x12 --clientes 8 --consultas 500
+
+Ninguna consulta deberia fallar durante la recarga.
+"""
+
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.benchmark_pipeline import leer_escala
+from benchmarks.datos_sinteticos import escribir_libro, generar_libro
+from modules.query_service import ServicioConsultas, crear_servidor
+
+
+def rutas_consulta(estado, semilla=0):
+    """
+    Mezcla de consultas sobre los puntos, sistemas y variables cargados
+    """
+    rng = random.Random(semilla)
+    rutas = []
+    for _ in range(200):
+        punto = rng.choice(estado['puntos'])
+        rutas.append(rng.choice([
+            f"/cumplimiento?punto={punto}",
+            f"/estadisticas?punto={punto}",
+            f"/estadisticas?sistema={rng.choice(estado['sistemas'])}&variable={rng.choice(estado['variables'])}",
+            f"/incumplimientos?punto={punto}",
+            "/limites",
+        ]))
+    return rutas
+
+
+def cliente(puerto, rutas, consultas, latencias, errores, hasta=None):
+    """
+    Hace consultas (o consulta hasta que hasta este activo) y anota cada latencia
+    """
+    conexion = http.client.HTTPConnection('127.0.0.1', puerto)
+    hechas = 0
+    while (hechas < consultas) if hasta is None else not hasta.is_set():
+        inicio = time.perf_counter()
+        conexion.request('GET', rutas[hechas % len(rutas)])
+        respuesta = conexion.getresponse()
+        respuesta.read()
+        latencias.append(time.perf_counter() - inicio)
+        if respuesta.status != 200:
+            errores.append(respuesta.status)
+        hechas += 1
+    conexion.close()
+
+
+def en_paralelo(clientes, objetivo, *args):
+    hilos = [threading.Thread(target=objetivo, args=args) for _ in range(clientes)]
+    for hilo in hilos:
+        hilo.start()
+    return hilos
+
+
+def resumen(latencias):
+    ms = np.array(latencias) * 1000
+    return {'consultas': len(ms), 'p50_ms': round(float(np.percentile(ms, 50)), 3),
+            'p99_ms': round(float(np.percentile(ms, 99)), 3), 'max_ms': round(float(ms.max()), 3)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del servicio HTTP de consultas")
+    parser.add_argument('--escala', type=leer_escala, default=leer_escala('200x12'), metavar='PUNTOSxCAMPANAS',
+                        help="Tamaño del libro sintetico (por defecto: 200x12)")
+    parser.add_argument('--clientes', type=int, default=8, help="Clientes concurrentes")
+    parser.add_argument('--consultas', type=int, default=500, help="Consultas por cliente")
+    parser.add_argument('--salida', default=None, help="Ruta opcional del JSON de resultados")
+    args = parser.parse_args(argv)
+
+    puntos, campanas = args.escala
+    with tempfile.TemporaryDirectory(prefix='villaverde_servicio_') as directorio:
+        with contextlib.redirect_stdout(io.StringIO()):
+            ruta, _ = escribir_libro(generar_libro(puntos, campanas), directorio, 'libro', parquet=False)
+            servicio = ServicioConsultas(ruta, intervalo=0.1, usar_cache=False)
+        servidor = crear_servidor(servicio, puerto=0)
+        puerto = servidor.server_address[1]
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        servicio.iniciar_vigilancia()
+        rutas = rutas_consulta(servicio.conjunto.estado())
+        print(f"\n=== {puntos}x{campanas}, {args.clientes} clientes x {args.consultas} consultas ===")
+        print(f"  carga inicial {servicio.conjunto.segundos_carga:>8.3f} s")
+
+        # Consultas con los datos ya en memoria
+        latencias, errores = [], []
+        inicio = time.perf_counter()
+        for hilo in en_paralelo(args.clientes, cliente, puerto, rutas, args.consultas, latencias, errores):
+            hilo.join()
+        segundos = time.perf_counter() - inicio
+        estable = {**resumen(latencias), 'consultas_por_segundo': round(len(latencias) / segundos, 1),
+                   'errores': len(errores)}
+        print(f"  en caliente   p50 {estable['p50_ms']:.2f} ms  p99 {estable['p99_ms']:.2f} ms  "
+              f"{estable['consultas_por_segundo']:.0f} consultas/s  {estable['errores']} errores")
+
+        # Recarga: se reescribe el libro mientras los clientes siguen consultando
+        latencias, errores = [], []
+        fin = threading.Event()
+        hilos = en_paralelo(args.clientes, cliente, puerto, rutas, 0, latencias, errores, fin)
+        with contextlib.redirect_stdout(io.StringIO()):
+            hojas = generar_libro(puntos, campanas, semilla=1)
+            inicio = time.perf_counter()
+            escribir_libro(hojas, directorio, 'libro', parquet=False)
+            escrito = time.perf_counter()
+            while servicio.conjunto.version == 1:
+                time.sleep(0.01)
+            segundos_recarga = time.perf_counter() - escrito
+        fin.set()
+        for hilo in hilos:
+            hilo.join()
+        recarga = {**resumen(latencias), 'segundos_escritura': round(escrito - inicio, 3),
+                   'segundos_recarga': round(segundos_recarga, 3), 'errores': len(errores)}
+        print(f"  escritura     {recarga['segundos_escritura']:>8.3f} s del libro nuevo (en este proceso)")
+        print(f"  recarga       {recarga['segundos_recarga']:>8.3f} s desde el libro escrito hasta servir la version 2 "
+              f"(p99 {recarga['p99_ms']:.2f} ms, {recarga['errores']} errores en {recarga['consultas']} consultas)")
+
+        servicio.detener()
+        servidor.shutdown()
+        servidor.server_close()
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            json.dump({'escala': f'{puntos}x{campanas}', 'clientes': args.clientes, 'en_caliente': estable,
+                       'recarga': recarga}, archivo, indent=2)
+        print(f"\nResultados guardados en: {args.salida}")
+    return 0 if not estable['errores'] and not recarga['errores'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+DATOS SINTETICOS CON EL ESQUEMA DE VILLA VERDE
+Genera libros con las hojas Datos, Coordenadas y Limites a cualquier escala
+(puntos x campañas). Los valores de cada (TipoSistema, variable) se sortean
+alrededor de la media y desviacion del libro de muestra, y las variables que
+no se miden en un sistema (todo NaN en la muestra) quedan vacias.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from modules.data_loader import RUTA_DATOS, cargar_hojas
+
+
+def generar_libro(puntos, campanas, semilla=0, ruta_muestra=RUTA_DATOS):
+    """
+    Retorna {hoja: DataFrame} con puntos x campañas filas en Datos
+    """
+    muestra = cargar_hojas(ruta_muestra)
+    datos_muestra = muestra['Datos']
+    rng = np.random.default_rng(semilla)
+
+    sistemas_muestra = muestra['Coordenadas']['TipoSistema'].to_numpy()
+    nombres_puntos = [f'P{i}' for i in range(1, puntos + 1)]
+    sistemas = sistemas_muestra[np.arange(puntos) % len(sistemas_muestra)]
+    nombres_campanas = [f'C{j}' for j in range(1, campanas + 1)]
+
+    coordenadas = pd.DataFrame({
+        'Punto': nombres_puntos,
+        'TipoSistema': sistemas,
+        'X_UTM': 850000 + rng.integers(0, 50_000, puntos),
+        'Y_UTM': 1180000 + rng.integers(0, 50_000, puntos),
+        'Descripcion': [f'Estacion sintetica {i}' for i in range(1, puntos + 1)],
+    })
+
+    filas = puntos * campanas
+    sistema_fila = np.repeat(sistemas, campanas)
+    datos = pd.DataFrame({
+        'Punto': np.repeat(nombres_puntos, campanas),
+        'TipoSistema': sistema_fila,
+        'Campaña': np.tile(nombres_campanas, puntos),
+    })
+
+    variables = [c for c in datos_muestra.columns if c not in datos.columns]
+    for variable in variables:
+        valores = np.full(filas, np.nan)
+        for sistema, grupo in datos_muestra.groupby('TipoSistema')[variable]:
+            grupo = grupo.dropna()
+            mascara = sistema_fila == sistema
+            if grupo.empty or not mascara.any():
+                continue
+            media = grupo.mean()
+            desviacion = grupo.std(ddof=0) or abs(media) * 0.1
+            valores[mascara] = np.clip(rng.normal(media, desviacion, mascara.sum()), 0, None)
+        if datos_muestra[variable].dtype.kind in 'iu':
+            datos[variable] = np.round(np.nan_to_num(valores)).astype('int64')
+        else:
+            datos[variable] = np.round(valores, 2)
+
+    return {'Datos': datos, 'Coordenadas': coordenadas, 'Limites': muestra['Limites']}
+
+
+def escribir_libro(hojas, directorio, nombre, parquet=True):
+    """
+    Escribe el libro .xlsx y, si pyarrow esta disponible, un .parquet por hoja.
+    Retorna (ruta_xlsx, {hoja: ruta_parquet}).
+    """
+    os.makedirs(directorio, exist_ok=True)
+    ruta_xlsx = os.path.join(directorio, f'{nombre}.xlsx')
+    with pd.ExcelWriter(ruta_xlsx) as writer:
+        for hoja, df in hojas.items():
+            df.to_excel(writer, sheet_name=hoja, index=False)
+
+    rutas_parquet = {}
+    if parquet:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("  - pyarrow no esta instalado: se omiten los archivos Parquet")
+        else:
+            for hoja, df in hojas.items():
+                rutas_parquet[hoja] = os.path.join(directorio, f'{nombre}_{hoja}.parquet')
+                df.to_parquet(rutas_parquet[hoja], index=False)
+
+    return ruta_xlsx, rutas_parquet
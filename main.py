@@ -8,17 +8,41 @@ Requerimiento i: Lectura y organizacion de datos
 Requerimiento ii: Estadistica descriptiva
 """
 
-from modules.data_loader import cargar_datos, organizar_datos, explorar_datos, validar_estructura_datos
-from modules.descriptive_stats import calcular_estadisticas, mostrar_resumen_estadisticas
-from modules.lmp_analysis import evaluar_limites_permitidos
-from modules.visualization import generar_graficas_patrones
+import argparse
 
-def main():
+# pandas, matplotlib y los modulos de analisis se importan dentro de cada
+# etapa: cada subcomando solo carga lo que usa
+from modules.export import FORMATOS_TABULARES, validar_formato_tabular
+from modules.profiling import PerfilEjecucion
+
+COMANDOS = {
+    'load': "lectura, organizacion y validacion de datos (requerimiento i)",
+    'stats': "estadistica descriptiva (requerimiento ii)",
+    'plots': "graficas de patrones y de limites (requerimiento iii)",
+    'lmp': "evaluacion de limites maximos permisibles, sin graficas (requerimiento iv)",
+    'all': "todo el analisis (por defecto)",
+}
+
+# Igual que modules.sharding.FRAGMENTACIONES (no se importa para no cargar pandas)
+FRAGMENTACIONES = ('TipoSistema', 'Zona')
+
+
+def cargar_y_organizar(perfil, ruta_datos=None, trabajadores=None, compacto=False):
     """
-    Funcion principal que ejecuta todo el analisis de calidad del agua
+    Requerimiento i: carga, organiza, explora y valida los datos, y obtiene el
+    esquema (puntos, campañas y variables) que recorren las demas etapas.
+    ruta_datos: libro, directorio o patron glob de libros (uno por zona).
+    compacto: organiza los datos con el modelo compacto (claves categoricas).
+    Retorna (datos_organizados, limites, esquema) o (None, None, None) si algo falla.
     """
-    print("=== INICIANDO ANALISIS DE CALIDAD DEL AGUA - VILLA VERDE ===\n")
-    
+    import os
+
+    from modules.data_loader import (RUTA_DATOS, cargar_datos, organizar_datos, explorar_datos,
+                                     validar_estructura_datos)
+    from modules.schema import cargar_esquema
+
+    ruta_datos = ruta_datos or RUTA_DATOS
+
     # i. LECTURA Y ORGANIZACION DE DATOS
     print("=" * 60)
     print("REQUERIMIENTO i: LECTURA Y ORGANIZACION DE DATOS")
@@ -26,29 +50,44 @@ def main():
     
     # 1. Cargar datos desde archivos Excel
     print("\n1. Cargando datos desde archivos Excel...")
-    datos, coordenadas, limites = cargar_datos()
+    with perfil.etapa('carga'):
+        datos, coordenadas, limites = cargar_datos(ruta_datos, trabajadores=trabajadores)
     
     if datos is None:
         print("No se pudieron cargar los datos. Verifica los archivos.")
-        return
+        return None, None, None
+
+    # Esquema descubierto una sola vez (cacheado junto al libro; con varios libros se descubre)
+    with perfil.etapa('esquema'):
+        esquema = cargar_esquema(ruta_datos, hojas={'Datos': datos, 'Limites': limites},
+                                 usar_cache=os.path.isfile(ruta_datos))
+    esquema.mostrar()
     
     # 2. Organizar datos por punto, variable, campaña y tipo de sistema
     print("\n2. Organizando datos por tipo de sistema...")
-    datos_organizados = organizar_datos(datos, coordenadas)
+    with perfil.etapa('organizacion'):
+        datos_organizados = organizar_datos(datos, coordenadas, compacto)
     
     if not datos_organizados:
         print("No se pudieron organizar los datos.")
-        return
-    
+        return None, None, None
+
+    # Almacen en disco (solo con un libro): lo abren --consultar y la etapa plots sin releer el libro
+    if os.path.isfile(ruta_datos):
+        from modules.measurement_store import abrir_almacen
+
+        with perfil.etapa('almacen'):
+            abrir_almacen(ruta_datos, datos_organizados)
+
     # 3. Explorar estructura de datos
-    explorar_datos(datos_organizados)
+    explorar_datos(datos_organizados, esquema.variables_grupo)
     
-    # 4. Validar estructura de datos
-    estructura_valida = validar_estructura_datos(datos_organizados)
+    # 4. Validar estructura de datos (contra las variables configuradas)
+    estructura_valida = validar_estructura_datos(datos_organizados, esquema.configuracion['variables_grupo'])
     
     if not estructura_valida:
         print("La estructura de datos no es valida para el analisis.")
-        return
+        return None, None, None
     
     print("\n" + "=" * 60)
     print("REQUERIMIENTO i COMPLETADO EXITOSAMENTE")
@@ -59,7 +98,7 @@ def main():
     for tipo_sistema, df in datos_organizados.items():
         if not df.empty:
             print(f"\n{tipo_sistema} (primeras 3 filas):")
-            print(df[['Punto', 'TipoSistema', 'Campaña', 'Turb_NTU', 'DBO5_mgL', 'Coli_fec_NMP100mL']].head(3))
+            print(df[['Punto', 'TipoSistema', 'Campaña'] + esquema.variables_grupo[:3]].head(3))
     
     # Mostrar informacion de limites cargados
     if limites is not None and not limites.empty:
@@ -81,48 +120,472 @@ def main():
         print("\n--- INFORMACION DE LIMITES CARGADOS ---")
         print("No se pudieron cargar los limites permisibles")    
 
-    # ii. ESTADISTICA DESCRIPTIVA
+    return datos_organizados, limites, esquema
+
+
+def cargar_desde_almacen(perfil, ruta_datos=None):
+    """
+    Datos de la etapa de graficas desde el almacen de mediciones vigente del
+    libro, sin leer el Excel: las columnas se mapean desde disco y los limites
+    salen de la cache del libro.
+    Retorna (datos_organizados, limites, esquema) o (None, None, None) si no hay almacen.
+    """
+    import os
+
+    from modules.data_loader import RUTA_DATOS, cargar_hojas
+    from modules.measurement_store import abrir_almacen
+    from modules.schema import cargar_esquema
+
+    ruta_datos = ruta_datos or RUTA_DATOS
+    if not os.path.isfile(ruta_datos):
+        return None, None, None
+    with perfil.etapa('almacen'):
+        almacen = abrir_almacen(ruta_datos, construir=False)
+        if almacen is None:
+            return None, None, None
+        datos_organizados = almacen.datos_organizados()
+        limites = cargar_hojas(ruta_datos, ['Limites'])['Limites']
+        esquema = cargar_esquema(ruta_datos, hojas={'Datos': datos_organizados, 'Limites': limites})
+
+    print("=" * 60)
+    print("DATOS TOMADOS DEL ALMACEN DE MEDICIONES")
+    print("=" * 60)
+    almacen.mostrar()
+    return datos_organizados, limites, esquema
+
+
+def estadistica_descriptiva(datos_organizados, esquema, perfil, formato_tabular=None, cache=None,
+                            fragmentos=None, trabajadores=None):
+    """
+    Requerimiento ii: estadisticas por punto y por campaña
+    """
+    from modules.descriptive_stats import calcular_estadisticas, mostrar_resumen_estadisticas
+
     print("\n" + "=" * 60)
     print("REQUERIMIENTO ii: ESTADISTICA DESCRIPTIVA")
     print("=" * 60)
     
     # 5. Calcular estadisticas descriptivas
     print("\n5. Calculando estadisticas descriptivas...")
-    resultados_estadisticas = calcular_estadisticas(datos_organizados)
+    with perfil.etapa('estadisticas'):
+        resultados_estadisticas = calcular_estadisticas(datos_organizados, formato_tabular=formato_tabular,
+                                                        variables=esquema.variables_grupo, cache=cache,
+                                                        fragmentos=fragmentos, trabajadores=trabajadores)
     
     # 6. Mostrar resumen de estadisticas
-    mostrar_resumen_estadisticas(resultados_estadisticas)
+    mostrar_resumen_estadisticas(resultados_estadisticas, esquema.variables_grupo)
     
     print("\n" + "=" * 60)
     print("REQUERIMIENTO ii COMPLETADO EXITOSAMENTE")
     print("=" * 60)
-    
-    # iii. ANALISIS GRAFICO
+
+
+def analisis_grafico(datos_organizados, limites, esquema, perfil, trabajadores=None, incremental=True,
+                     con_limites=False, paneles=False, reporte=False):
+    """
+    Requerimiento iii: graficas de patrones. con_limites agrega las graficas
+    con LMP (en el flujo completo las genera el requerimiento iv).
+    paneles: una figura por familia con todas las variables como subplots.
+    reporte: en vez de los PNG, un HTML interactivo con todas las vistas (tambien las de LMP).
+    """
+    from modules.visualization import generar_graficas_patrones
+
     print("\n" + "=" * 60)
     print("REQUERIMIENTO iii: ANALISIS GRAFICO")
     print("=" * 60)
+
+    if reporte:
+        from modules.html_report import generar_reporte
+
+        print("\n7. Generando reporte HTML interactivo...")
+        with perfil.etapa('reporte'):
+            generar_reporte(datos_organizados, limites, esquema=esquema)
+        print("\n" + "=" * 60)
+        print("REQUERIMIENTO iii COMPLETADO EXITOSAMENTE")
+        print("=" * 60)
+        return
     
     # 7. Generar graficas de patrones espaciales y temporales
     print("\n7. Generando graficas de analisis...")
-    generar_graficas_patrones(datos_organizados, limites)
+    with perfil.etapa('graficas'):
+        generar_graficas_patrones(datos_organizados, limites, trabajadores=trabajadores,
+                                  incremental=incremental, paneles=paneles, esquema=esquema)
+        if con_limites and limites is not None and not limites.empty:
+            from modules.lmp_analysis import graficar_limites
+
+            print("\n  - Generando graficas con limites maximos permisibles...")
+            graficar_limites(datos_organizados, limites, trabajadores, incremental, esquema=esquema)
     
     print("\n" + "=" * 60)
     print("REQUERIMIENTO iii COMPLETADO EXITOSAMENTE")
     print("=" * 60)
-    
+
+
+def evaluacion_limites(datos_organizados, limites, esquema, perfil, trabajadores=None, incremental=True,
+                       formato_tabular=None, graficas=True, cache=None, fragmentos=None):
+    """
+    Requerimiento iv: incumplimientos y porcentajes por variable
+    """
+    from modules.lmp_analysis import evaluar_limites_permitidos
+
     print("\n" + "=" * 60)
     print("REQUERIMIENTO iv: EVALUACION LIMITES MAXIMOS PERMISIBLES")
     print("=" * 60)
     
     # 8. Evaluar cumplimiento de limites
     print("\n8. Evaluando cumplimiento de limites...")
-    evaluar_limites_permitidos(datos_organizados, limites)
+    with perfil.etapa('lmp'):
+        evaluar_limites_permitidos(datos_organizados, limites, trabajadores=trabajadores,
+                                   incremental=incremental, formato_tabular=formato_tabular,
+                                   graficas=graficas, esquema=esquema, cache=cache,
+                                   fragmentos=fragmentos)
     
     print("\n" + "=" * 60)
     print("REQUERIMIENTO iv COMPLETADO EXITOSAMENTE")
     print("=" * 60)
-    
+
+
+def intervalos_confianza(datos_organizados, limites, esquema, perfil, remuestreos, formato_tabular=None):
+    """
+    Intervalos de confianza por bootstrap de las medias por punto y de los
+    porcentajes de incumplimiento
+    """
+    from modules.bootstrap import RUTA_INTERVALOS, intervalos_medias, intervalos_porcentajes, mostrar_intervalos
+    from modules.export import exportar_hojas
+    from modules.lmp_analysis import calcular_porcentajes
+
+    print(f"\n9. Calculando intervalos de confianza ({remuestreos} remuestreos)...")
+    with perfil.etapa('intervalos'):
+        medias = intervalos_medias(datos_organizados, esquema.variables_grupo, remuestreos)
+        hojas = [('Medias', medias)]
+        porcentajes = None
+        if limites is not None and not limites.empty:
+            porcentajes = intervalos_porcentajes(
+                calcular_porcentajes(datos_organizados, limites, esquema.variables_grupo), remuestreos)
+            hojas.append(('Porcentajes', porcentajes))
+        exportar_hojas(hojas, RUTA_INTERVALOS, formato_tabular)
+    mostrar_intervalos(medias, porcentajes)
+    print(f"Intervalos guardados en: {RUTA_INTERVALOS}")
+
+
+def main(comando='all', trabajadores=None, incremental=True, formato_tabular=None, perfil=None,
+         paneles=False, memoizar=True, ruta_datos=None, fragmentos=None, remuestreos=None, reporte=False,
+         compacto=False):
+    """
+    Funcion principal que ejecuta el analisis de calidad del agua.
+    comando: 'load', 'stats', 'plots', 'lmp' o 'all' (ver COMANDOS).
+    trabajadores: procesos para cargar libros, procesar fragmentos y renderizar graficas
+    (None = todos los nucleos).
+    incremental: solo redibuja las graficas cuyos datos cambiaron.
+    formato_tabular: 'parquet' o 'csv' para exportar tambien los resultados en tablas.
+    perfil: PerfilEjecucion que mide cada etapa (por defecto solo tiempos).
+    paneles: graficas de patrones como una figura por familia con todas las variables.
+    memoizar: reutiliza las tablas de estadisticas y LMP si sus datos no cambiaron.
+    ruta_datos: libro, directorio o patron glob de libros (por defecto data/VillaVerde_WaterSystemData.xlsx).
+    fragmentos: 'TipoSistema' o 'Zona' para calcular estadisticas y LMP por fragmentos en paralelo.
+    remuestreos: si se da, agrega intervalos de confianza por bootstrap con esa cantidad de remuestreos.
+    reporte: reemplaza los PNG de los requerimientos iii y iv por results/reporte.html.
+    compacto: corre las etapas sobre el modelo compacto de datos_completos (menos memoria).
+    """
+    if comando not in COMANDOS:
+        raise ValueError(f"Comando no reconocido: {comando} (opciones: {', '.join(COMANDOS)})")
+    if formato_tabular:
+        validar_formato_tabular(formato_tabular)
+    print("=== INICIANDO ANALISIS DE CALIDAD DEL AGUA - VILLA VERDE ===\n")
+
+    # Tiempo de reloj de cada etapa (y memoria/cProfile con --profile)
+    perfil = perfil or PerfilEjecucion()
+    cache = None
+    if memoizar:
+        from modules.result_cache import CacheResultados
+
+        cache = CacheResultados()
+
+    datos_organizados = None
+    if comando == 'plots':
+        # Las graficas solo necesitan las mediciones: si el almacen esta vigente no se lee el libro
+        datos_organizados, limites, esquema = cargar_desde_almacen(perfil, ruta_datos)
+    if datos_organizados is None:
+        datos_organizados, limites, esquema = cargar_y_organizar(perfil, ruta_datos, trabajadores, compacto)
+    if datos_organizados is None:
+        return
+
+    if comando in ('stats', 'all'):
+        estadistica_descriptiva(datos_organizados, esquema, perfil, formato_tabular, cache, fragmentos,
+                                trabajadores)
+    if comando in ('plots', 'all'):
+        analisis_grafico(datos_organizados, limites, esquema, perfil, trabajadores, incremental,
+                         con_limites=comando == 'plots', paneles=paneles, reporte=reporte)
+    if comando in ('lmp', 'all'):
+        evaluacion_limites(datos_organizados, limites, esquema, perfil, trabajadores, incremental, formato_tabular,
+                           graficas=comando == 'all' and not reporte, cache=cache, fragmentos=fragmentos)
+    if remuestreos and comando in ('stats', 'lmp', 'all'):
+        intervalos_confianza(datos_organizados, limites, esquema, perfil, remuestreos, formato_tabular)
+
     print("Resultados guardados en la carpeta 'results/'")
 
+    perfil.mostrar()
+    if cache is not None and (cache.aciertos or cache.fallos):
+        cache.mostrar()
+    if perfil.activo:
+        print(f"Reporte de perfil guardado en: {perfil.guardar()}")
+
+def main_streaming(ruta, tamano_bloque, ruta_datos=None):
+    """
+    Analiza una exportacion grande (xlsx/csv/parquet) en bloques, con memoria acotada.
+    Los limites se toman de la hoja Limites del libro de datos (--datos).
+    """
+    import os
+
+    from modules.data_loader import RUTA_DATOS, cargar_hojas, cargar_libros
+    from modules.export import exportar_hojas
+    from modules.streaming import analizar_en_streaming
+
+    ruta_datos = ruta_datos or RUTA_DATOS
+    print(f"=== ANALISIS EN STREAMING: {ruta} ===\n")
+    if os.path.isfile(ruta_datos):
+        limites = cargar_hojas(ruta_datos, ['Limites'])['Limites']
+    else:
+        limites = cargar_libros(ruta_datos, ['Limites'])['Limites']
+    estadisticas, conteo, porcentajes = analizar_en_streaming(ruta, limites, tamano_bloque=tamano_bloque)
+
+    print(f"\nEstadisticas calculadas para {len(estadisticas)} puntos")
+    print(f"Incumplimientos: {int(conteo['Incumplimientos'].sum())}")
+    for _index, p in porcentajes.iterrows():
+        print(f"  - {p['Variable']}: {p['Porcentaje_Incumplimiento']}% ({p['Incumplimientos']}/{p['Total_Mediciones']})")
+
+    exportar_hojas([('Estadisticas', estadisticas), ('Incumplimientos', conteo), ('Porcentajes', porcentajes)],
+                   'results/resultados_streaming.xlsx')
+    print("Resultados guardados en 'results/resultados_streaming.xlsx'")
+
+
+def main_consultar(variables, puntos=None, campanas=None, sistemas=None, ruta_datos=None):
+    """
+    Consulta mediciones desde el almacen en disco (se construye si no existe),
+    por ejemplo la turbiedad de P7 en todas las campañas
+    """
+    import os
+
+    from modules.data_loader import RUTA_DATOS
+    from modules.measurement_store import abrir_almacen
+
+    ruta_datos = ruta_datos or RUTA_DATOS
+    if not os.path.isfile(ruta_datos):
+        print(f"El almacen de mediciones requiere un solo libro: {ruta_datos}")
+        return
+    almacen = abrir_almacen(ruta_datos)
+    if almacen is None:
+        return
+    try:
+        consulta = almacen.consultar(variables, puntos, campanas, sistemas)
+    except KeyError as error:
+        print(f"Consulta invalida: {error}")
+        return
+    print(f"=== CONSULTA: {', '.join(variables)} ({len(consulta)} filas) ===\n")
+    print(consulta.to_string(index=False))
+
+
+def main_superficies(resolucion, ruta_datos=None):
+    """
+    Mapas de interpolacion IDW de las variables con LMP (turbiedad y coliformes)
+    a partir de las coordenadas de las estaciones
+    """
+    from modules.data_loader import RUTA_DATOS, cargar_datos, organizar_datos
+    from modules.schema import descubrir_esquema
+    from modules.spatial_index import generar_superficies
+
+    print(f"=== SUPERFICIES IDW ({resolucion}x{resolucion}) ===\n")
+    datos, coordenadas, limites = cargar_datos(ruta_datos or RUTA_DATOS)
+    if datos is None:
+        return
+    datos_organizados = organizar_datos(datos, coordenadas)
+    esquema = descubrir_esquema(datos_organizados, limites)
+    generar_superficies(datos_organizados, coordenadas, esquema.variables_con_limites, resolucion=resolucion)
+
+
+def main_cercanas(x, y, radio=None, cantidad=3, ruta_datos=None):
+    """
+    Estaciones mas cercanas a (x, y), o todas las que estan a menos de radio
+    """
+    from modules.data_loader import RUTA_DATOS, cargar_datos
+    from modules.spatial_index import IndiceEspacial
+
+    _datos, coordenadas, _limites = cargar_datos(ruta_datos or RUTA_DATOS)
+    if coordenadas is None:
+        return
+    indice = IndiceEspacial.desde_coordenadas(coordenadas)
+    if radio is not None:
+        print(f"\n=== ESTACIONES A MENOS DE {radio} m DE ({x}, {y}) ===\n")
+        estaciones = indice.en_radio(x, y, radio)
+    else:
+        print(f"\n=== {cantidad} ESTACIONES MAS CERCANAS A ({x}, {y}) ===\n")
+        estaciones = indice.mas_cercanas(x, y, cantidad)
+    descripciones = coordenadas.drop_duplicates('Punto').set_index('Punto')['Descripcion']
+    estaciones.insert(1, 'Descripcion', estaciones['Punto'].map(descripciones))
+    print(estaciones.round({'Distancia': 1}).to_string(index=False) if not estaciones.empty else "Ninguna")
+
+
+def main_servir(puerto, host=None, ruta_datos=None):
+    """
+    Servicio HTTP/JSON local con los datos cargados en memoria; se recarga
+    solo cuando cambia el libro
+    """
+    from modules.data_loader import RUTA_DATOS
+    from modules.query_service import HOST, servir
+
+    print("=== SERVICIO DE CONSULTAS ===\n")
+    try:
+        servir(ruta_datos or RUTA_DATOS, host or HOST, puerto)
+    except ValueError as error:
+        print(error)
+
+
+def main_alertas(fuente, ruta_eventos=None, desde_inicio=False, ruta_datos=None):
+    """
+    Evalua lecturas (Punto,Variable,Valor,Marca) a medida que llegan y emite
+    una linea JSON por incumplimiento; al terminar muestra rendimiento y latencias
+    """
+    import sys
+
+    from modules.data_loader import RUTA_DATOS
+    from modules.limit_alerts import abrir_fuente, cargar_motor, mostrar_resumen, vigilar
+
+    motor = cargar_motor(ruta_datos or RUTA_DATOS)
+    print(f"=== ALERTAS DE LMP: {fuente} ({len(motor.reglas)} pares punto-variable con limites) ===",
+          file=sys.stderr)
+    salida = open(ruta_eventos, 'a', encoding='utf-8') if ruta_eventos else sys.stdout
+    try:
+        vigilar(motor, abrir_fuente(fuente, desde_inicio), salida)
+    except FileNotFoundError as error:
+        print(error, file=sys.stderr)
+        return
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if ruta_eventos:
+            salida.close()
+    mostrar_resumen(motor.resumen())
+
+
+def main_agregar_campana(ruta):
+    """
+    Agrega las filas de una campaña nueva al estado acumulado de estadisticas
+    """
+    from modules.descriptive_stats import actualizar_estadisticas_acumuladas
+
+    print(f"=== ACTUALIZACION INCREMENTAL DE ESTADISTICAS: {ruta} ===\n")
+    actualizar_estadisticas_acumuladas(ruta)
+
+
+def main_reporte_memoria():
+    """
+    Compara la memoria del layout actual con el modelo compacto
+    """
+    from modules.compact_model import mostrar_reporte_memoria, reporte_memoria
+    from modules.data_loader import cargar_hojas
+
+    print("=== REPORTE DE MEMORIA: LAYOUT ACTUAL vs COMPACTO ===\n")
+    hojas = cargar_hojas(hojas=['Datos', 'Coordenadas'])
+    mostrar_reporte_memoria(reporte_memoria(hojas['Datos'], hojas['Coordenadas']))
+
+
+def _opciones_flujo(parser, con_defecto=True):
+    """
+    Opciones del flujo principal. En los subcomandos van sin valor por defecto
+    para no pisar las que se dieron antes del subcomando.
+    """
+    def defecto(valor):
+        return valor if con_defecto else argparse.SUPPRESS
+
+    parser.add_argument('--datos', metavar='RUTA', default=defecto(None),
+                        help="libro, directorio o patron glob de libros (uno por zona) a analizar juntos")
+    parser.add_argument('--trabajadores', type=int, default=defecto(None),
+                        help="procesos para cargar libros, procesar fragmentos y renderizar graficas "
+                             "(por defecto todos los nucleos, 1 = en serie)")
+    parser.add_argument('--fragmentos', choices=FRAGMENTACIONES, default=defecto(None),
+                        help="calcula estadisticas y LMP por fragmentos (por sistema o por zona) "
+                             "en un pool de procesos y combina los resultados")
+    parser.add_argument('--intervalos', metavar='REMUESTREOS', type=int, nargs='?', const=10_000,
+                        default=defecto(None),
+                        help="agrega intervalos de confianza por bootstrap de medias y porcentajes "
+                             "(por defecto 10000 remuestreos) en results/intervalos_confianza.xlsx")
+    parser.add_argument('--redibujar', action='store_true', default=defecto(False),
+                        help="redibuja todas las graficas aunque sus datos no hayan cambiado")
+    parser.add_argument('--paneles', action='store_true', default=defecto(False),
+                        help="dibuja cada familia de graficas como una figura con todas las variables en subplots")
+    parser.add_argument('--reporte', action='store_true', default=defecto(False),
+                        help="en vez de los PNG, un solo HTML interactivo (results/reporte.html) con las vistas "
+                             "espacial, temporal, comparativa, boxplot y LMP dibujadas en el navegador")
+    parser.add_argument('--compacto', action='store_true', default=defecto(False),
+                        help="organiza los datos con claves categoricas y la descripcion de cada punto "
+                             "compartida (modelo compacto, ver --reporte-memoria) para usar menos memoria")
+    parser.add_argument('--tablas', choices=FORMATOS_TABULARES, default=defecto(None),
+                        help="exporta tambien cada hoja de resultados como parquet o csv en results/tablas/")
+    parser.add_argument('--sin-cache', action='store_true', default=defecto(False),
+                        help="recalcula estadisticas y LMP aunque sus datos no hayan cambiado")
+    parser.add_argument('--profile', action='store_true', default=defecto(False),
+                        help="mide memoria pico y cProfile por etapa y guarda el reporte en results/perfil/")
+
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Analisis de calidad del agua - Villa Verde")
+    _opciones_flujo(parser)
+    parser.add_argument('--streaming', metavar='RUTA',
+                        help="analiza una exportacion grande (xlsx/csv/parquet) por bloques en vez del flujo completo")
+    parser.add_argument('--tamano-bloque', type=int, default=50_000,
+                        help="filas por bloque en modo --streaming")
+    parser.add_argument('--agregar-campana', metavar='RUTA',
+                        help="incorpora las filas de RUTA al estado acumulado de estadisticas sin recalcular el historico")
+    parser.add_argument('--consultar', metavar='VARIABLE', nargs='+',
+                        help="muestra esas variables desde el almacen de mediciones, sin correr el analisis")
+    parser.add_argument('--puntos', nargs='+', help="puntos a consultar con --consultar (por defecto todos)")
+    parser.add_argument('--campanas', nargs='+', help="campañas a consultar con --consultar (por defecto todas)")
+    parser.add_argument('--sistemas', nargs='+', help="sistemas a consultar con --consultar (por defecto todos)")
+    parser.add_argument('--superficies', metavar='RESOLUCION', type=int, nargs='?', const=200,
+                        help="mapas IDW de turbiedad y coliformes en una grilla (por defecto 200x200) "
+                             "en results/graficas/")
+    parser.add_argument('--cercanas', metavar=('X', 'Y'), type=float, nargs=2,
+                        help="estaciones mas cercanas a la coordenada UTM (X, Y)")
+    parser.add_argument('--radio', type=float, help="con --cercanas, todas las estaciones a menos de RADIO metros")
+    parser.add_argument('--alertas', metavar='FUENTE',
+                        help="evalua lecturas Punto,Variable,Valor,Marca contra los LMP a medida que llegan: "
+                             "'-' (stdin), un archivo que se sigue mientras crece o tcp:PUERTO")
+    parser.add_argument('--eventos', metavar='RUTA',
+                        help="con --alertas, agrega las alertas (JSON por linea) a RUTA en vez de stdout")
+    parser.add_argument('--desde-inicio', action='store_true',
+                        help="con --alertas y un archivo, lee tambien las lineas que ya tenia")
+    parser.add_argument('--servir', metavar='PUERTO', type=int, nargs='?', const=8765,
+                        help="atiende consultas HTTP/JSON de estadisticas y LMP con los datos en memoria "
+                             "(por defecto en el puerto 8765), recargando cuando cambia el libro")
+    parser.add_argument('--host', help="con --servir, interfaz donde escuchar (por defecto 127.0.0.1)")
+    parser.add_argument('--reporte-memoria', action='store_true',
+                        help="compara la memoria del layout actual con el modelo compacto")
+    subcomandos = parser.add_subparsers(dest='comando', metavar='COMANDO',
+                                        title="etapas (sin comando se ejecuta 'all')")
+    for nombre, ayuda in COMANDOS.items():
+        _opciones_flujo(subcomandos.add_parser(nombre, help=ayuda, description=ayuda), con_defecto=False)
+    argumentos = parser.parse_args()
+    if argumentos.reporte_memoria:
+        main_reporte_memoria()
+    elif argumentos.alertas:
+        main_alertas(argumentos.alertas, argumentos.eventos, argumentos.desde_inicio, argumentos.datos)
+    elif argumentos.servir is not None:
+        main_servir(argumentos.servir, argumentos.host, argumentos.datos)
+    elif argumentos.superficies:
+        main_superficies(argumentos.superficies, argumentos.datos)
+    elif argumentos.cercanas:
+        main_cercanas(*argumentos.cercanas, radio=argumentos.radio, ruta_datos=argumentos.datos)
+    elif argumentos.consultar:
+        main_consultar(argumentos.consultar, argumentos.puntos, argumentos.campanas, argumentos.sistemas,
+                       argumentos.datos)
+    elif argumentos.agregar_campana:
+        main_agregar_campana(argumentos.agregar_campana)
+    elif argumentos.streaming:
+        main_streaming(argumentos.streaming, argumentos.tamano_bloque, argumentos.datos)
+    else:
+        main(comando=argumentos.comando or 'all', trabajadores=argumentos.trabajadores,
+             incremental=not argumentos.redibujar, formato_tabular=argumentos.tablas,
+             perfil=PerfilEjecucion(memoria=True, cprofile=True) if argumentos.profile else None,
+             paneles=argumentos.paneles, memoizar=not argumentos.sin_cache, ruta_datos=argumentos.datos,
+             fragmentos=argumentos.fragmentos, remuestreos=argumentos.intervalos, reporte=argumentos.reporte,
+             compacto=argumentos.compacto)
@@ -0,0 +1,3 @@
+"""
+Modulos del analisis de calidad del agua Villa Verde
+"""
@@ -0,0 +1,134 @@
+"""
+INTERVALOS DE CONFIANZA POR BOOTSTRAP
+Con pocas campañas por punto, una media o un porcentaje de incumplimiento
+solo no dice cuanto puede variar. Este modulo calcula intervalos de
+confianza por bootstrap (percentiles) para todas las medias por
+(punto, variable) y todos los porcentajes de incumplimiento a la vez:
+
+  - Medias: las series se agrupan por cantidad de mediciones n en una matriz
+    (series x n). Cada remuestreo es un vector de conteos multinomial(n, 1/n)
+    (cuantas veces sale cada medicion), asi todas las medias remuestreadas
+    son un solo producto de matrices: series @ conteos.T / n.
+  - Porcentajes: el indicador "supera el LMP" es 0/1, y la cantidad de
+    incumplimientos en un remuestreo de N mediciones es Binomial(N, p), la
+    distribucion exacta del bootstrap; se sortean todos los remuestreos juntos.
+"""
+
+import numpy as np
+import pandas as pd
+
+from modules.data_loader import VARIABLES_GRUPO
+
+RUTA_INTERVALOS = 'results/intervalos_confianza.xlsx'
+REMUESTREOS = 10_000
+NIVEL_CONFIANZA = 0.95
+SEMILLA = 0
+
+# Tope de elementos de la matriz (series x remuestreos) que se arma por bloque
+MAX_ELEMENTOS = 8_000_000
+
+
+def _cuantiles(nivel):
+    alfa = (1 - nivel) / 2
+    return [alfa, 1 - alfa]
+
+
+def remuestrear_medias(matriz, remuestreos=REMUESTREOS, nivel=NIVEL_CONFIANZA, rng=None):
+    """
+    Intervalos por percentiles de la media de cada fila de matriz (series x n,
+    sin nulos). Todas las filas usan los mismos remuestreos.
+    Retorna un arreglo (series x 2) con los limites inferior y superior.
+    """
+    rng = rng or np.random.default_rng(SEMILLA)
+    filas, n = matriz.shape
+    intervalos = np.empty((filas, 2))
+    if n == 0:
+        intervalos.fill(np.nan)
+        return intervalos
+
+    conteos = rng.multinomial(n, np.full(n, 1 / n), size=remuestreos).astype(np.float64)
+    por_bloque = max(1, MAX_ELEMENTOS // remuestreos)
+    for inicio in range(0, filas, por_bloque):
+        medias = matriz[inicio:inicio + por_bloque] @ conteos.T / n
+        intervalos[inicio:inicio + por_bloque] = np.quantile(medias, _cuantiles(nivel), axis=1).T
+    return intervalos
+
+
+def _series_por_punto(datos_organizados, variables):
+    """
+    Mediciones de todas las variables con los grupos (TipoSistema, Punto) en
+    el orden en que aparecen, como en estadisticas_por_grupo
+    """
+    partes = [df for df in datos_organizados.values() if not df.empty]
+    if not partes:
+        return None, None
+    datos = pd.concat([df[['TipoSistema', 'Punto'] + variables] for df in partes], ignore_index=True)
+    grupos = datos.groupby(['TipoSistema', 'Punto'], sort=False, observed=True)
+    return datos, grupos
+
+
+def intervalos_medias(datos_organizados, variables=VARIABLES_GRUPO, remuestreos=REMUESTREOS,
+                      nivel=NIVEL_CONFIANZA, semilla=SEMILLA):
+    """
+    Intervalo de confianza de la media de cada (punto, variable).
+    Retorna un DataFrame con TipoSistema, Punto, Variable, N, Media, IC_inf, IC_sup.
+    """
+    variables = list(variables)
+    datos, grupos = _series_por_punto(datos_organizados, variables)
+    columnas = ['TipoSistema', 'Punto', 'Variable', 'N', 'Media', 'IC_inf', 'IC_sup']
+    if datos is None:
+        return pd.DataFrame(columns=columnas)
+
+    rng = np.random.default_rng(semilla)
+    claves = grupos.size().index
+    codigo_grupo = grupos.ngroup().to_numpy()
+    tablas = []
+    for variable in variables:
+        valores = datos[variable].to_numpy(dtype=np.float64)
+        validos = np.flatnonzero(~np.isnan(valores))
+        # Mediciones validas ordenadas por grupo: cada grupo es un tramo contiguo
+        validos = validos[np.argsort(codigo_grupo[validos], kind='stable')]
+        tamanos = np.bincount(codigo_grupo[validos], minlength=len(claves))
+        inicios = np.concatenate([[0], np.cumsum(tamanos)[:-1]])
+
+        medias = np.full(len(claves), np.nan)
+        intervalos = np.full((len(claves), 2), np.nan)
+        for n in np.unique(tamanos[tamanos > 0]):
+            con_n = np.flatnonzero(tamanos == n)
+            matriz = valores[validos[inicios[con_n, None] + np.arange(n)]]
+            medias[con_n] = matriz.mean(axis=1)
+            intervalos[con_n] = remuestrear_medias(matriz, remuestreos, nivel, rng)
+
+        tablas.append(pd.DataFrame({
+            'TipoSistema': claves.get_level_values(0), 'Punto': claves.get_level_values(1),
+            'Variable': variable, 'N': tamanos, 'Media': medias,
+            'IC_inf': intervalos[:, 0], 'IC_sup': intervalos[:, 1],
+        }))
+    return pd.concat(tablas, ignore_index=True)[columnas]
+
+
+def intervalos_porcentajes(porcentajes, remuestreos=REMUESTREOS, nivel=NIVEL_CONFIANZA, semilla=SEMILLA):
+    """
+    Intervalo de confianza de cada Porcentaje_Incumplimiento de la tabla de
+    calcular_porcentajes (se usan sus columnas Total_Mediciones e Incumplimientos).
+    Retorna la tabla con las columnas IC_inf e IC_sup agregadas (en %).
+    """
+    rng = np.random.default_rng(semilla)
+    totales = porcentajes['Total_Mediciones'].to_numpy(dtype=np.int64)
+    proporciones = porcentajes['Incumplimientos'].to_numpy(dtype=np.float64) / np.maximum(totales, 1)
+    # (remuestreos x variables) conteos de incumplimientos en una sola llamada
+    sorteos = rng.binomial(totales, proporciones, size=(remuestreos, len(totales))) / np.maximum(totales, 1)
+    inferior, superior = np.quantile(sorteos * 100, _cuantiles(nivel), axis=0) if len(totales) else ([], [])
+    return porcentajes.assign(IC_inf=np.round(inferior, 2), IC_sup=np.round(superior, 2))
+
+
+def mostrar_intervalos(medias, porcentajes, nivel=NIVEL_CONFIANZA):
+    print(f"\n--- INTERVALOS DE CONFIANZA ({nivel:.0%}, BOOTSTRAP) ---")
+    if porcentajes is not None and not porcentajes.empty:
+        print("Porcentaje de incumplimiento:")
+        for _index, p in porcentajes.iterrows():
+            print(f"  - {p['Variable']}: {p['Porcentaje_Incumplimiento']}% "
+                  f"[{p['IC_inf']}%, {p['IC_sup']}%] ({p['Total_Mediciones']} mediciones)")
+    anchos = (medias['IC_sup'] - medias['IC_inf']) / medias['Media'].abs()
+    amplios = medias[anchos > 1]
+    print(f"Medias por punto: {len(medias)} intervalos, {len(amplios)} con ancho mayor a la media")
@@ -0,0 +1,120 @@
+"""
+MODELO COMPACTO DE MEDICIONES
+Las columnas clave (Punto, TipoSistema, Campaña) se guardan como categorias,
+las mediciones en float32 cuando la precision de los datos lo permite (o en el
+entero mas pequeño que las contiene), y la descripcion y coordenadas de cada
+punto quedan en una tabla de puntos aparte que solo se une cuando se pide.
+"""
+
+import numpy as np
+import pandas as pd
+
+from modules.data_loader import COLUMNAS_CLAVE, VARIABLES_GRUPO
+
+MAX_DECIMALES = 6
+
+
+def _decimales(valores):
+    """
+    Menor numero de decimales (hasta MAX_DECIMALES) que representa todos los valores
+    """
+    validos = valores[~np.isnan(valores)]
+    for decimales in range(MAX_DECIMALES + 1):
+        if np.allclose(np.round(validos, decimales), validos, rtol=0, atol=1e-12):
+            return decimales
+    return None
+
+
+def _columna_compacta(serie, flotantes=True):
+    """
+    Baja la columna al tipo mas chico que conserva sus valores:
+    enteros -> entero minimo, flotantes -> float32 si redondean igual
+    (con flotantes=False se dejan en float64)
+    """
+    if serie.dtype.kind in 'iu':
+        return pd.to_numeric(serie, downcast='integer')
+    if serie.dtype.kind != 'f' or not flotantes:
+        return serie
+
+    valores = serie.to_numpy(dtype=np.float64)
+    decimales = _decimales(valores)
+    if decimales is None:
+        return serie
+    reducidos = valores.astype(np.float32)
+    if np.array_equal(np.round(reducidos.astype(np.float64), decimales), valores, equal_nan=True):
+        return pd.Series(reducidos, index=serie.index, name=serie.name)
+    return serie
+
+
+def compactar_mediciones(datos, coordenadas, variables=VARIABLES_GRUPO, flotantes=True):
+    """
+    Construye el modelo compacto. flotantes=False deja las mediciones en
+    float64: float32 conserva el valor redondeado a sus decimales, pero no el
+    float64 exacto que se exporta y se compara contra los LMP.
+    Retorna (mediciones, tabla_puntos):
+      - mediciones: claves categoricas + variables en tipos reducidos
+      - tabla_puntos: una fila por punto (Descripcion, coordenadas), indexada por
+        las mismas categorias de Punto
+    """
+    puntos = pd.Categorical(datos['Punto'])
+    mediciones = pd.DataFrame({
+        'Punto': puntos,
+        'TipoSistema': pd.Categorical(datos['TipoSistema']),
+        'Campaña': pd.Categorical(datos['Campaña']),
+    })
+    for variable in variables:
+        mediciones[variable] = _columna_compacta(datos[variable], flotantes).to_numpy()
+
+    tabla_puntos = coordenadas.drop(columns=['TipoSistema'], errors='ignore').drop_duplicates('Punto')
+    tabla_puntos = tabla_puntos.set_index('Punto').reindex(puntos.categories)
+    return mediciones, tabla_puntos
+
+
+def unir_puntos(mediciones, tabla_puntos, columnas=('Descripcion',)):
+    """
+    Une columnas de la tabla de puntos bajo demanda, usando los codigos de
+    categoria como posiciones (sin merge por texto)
+    """
+    codigos = mediciones['Punto'].cat.codes.to_numpy()
+    unidas = {}
+    for columna in columnas:
+        valores = tabla_puntos[columna].to_numpy()
+        unidas[columna] = np.where(codigos >= 0, valores[codigos], None)
+    return mediciones.assign(**unidas)
+
+
+def reporte_memoria(datos, coordenadas, variables=VARIABLES_GRUPO):
+    """
+    Compara la memoria de datos_completos (merge de Descripcion en cada fila,
+    texto y float64) con el modelo compacto. Retorna un DataFrame por columna.
+    """
+    columnas = COLUMNAS_CLAVE + list(variables)
+    actual = datos[columnas].merge(coordenadas[['Punto', 'Descripcion']], on='Punto', how='left')
+    mediciones, tabla_puntos = compactar_mediciones(datos, coordenadas, variables)
+
+    bytes_actual = actual.memory_usage(deep=True, index=False)
+    bytes_compacto = mediciones.memory_usage(deep=True, index=False)
+    bytes_compacto['Descripcion'] = 0
+
+    reporte = pd.DataFrame({
+        'Tipo_actual': actual.dtypes.astype(str),
+        'Bytes_actual': bytes_actual,
+        'Tipo_compacto': mediciones.dtypes.astype(str).reindex(actual.columns).fillna('tabla de puntos'),
+        'Bytes_compacto': bytes_compacto.reindex(actual.columns),
+    })
+    reporte.loc['(tabla de puntos)'] = ['', 0, 'DataFrame', tabla_puntos.memory_usage(deep=True).sum()]
+    reporte.loc['TOTAL'] = ['', reporte['Bytes_actual'].sum(), '', reporte['Bytes_compacto'].sum()]
+    reporte['Bytes_actual'] = reporte['Bytes_actual'].astype('int64')
+    reporte['Bytes_compacto'] = reporte['Bytes_compacto'].astype('int64')
+    return reporte
+
+
+def mostrar_reporte_memoria(reporte):
+    """
+    Imprime el reporte de memoria y la reduccion total
+    """
+    print(reporte.to_string())
+    total = reporte.loc['TOTAL']
+    if total['Bytes_compacto'] > 0:
+        print(f"\nReduccion: {total['Bytes_actual'] / total['Bytes_compacto']:.1f}x "
+              f"({total['Bytes_actual'] / 1024:.1f} KiB -> {total['Bytes_compacto'] / 1024:.1f} KiB)")
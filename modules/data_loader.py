@@ -0,0 +1,381 @@
+"""
+REQUERIMIENTO i: LECTURA Y ORGANIZACION DE DATOS
+El libro de Excel se parsea una sola vez con openpyxl y cada hoja se guarda
+como columnas tipadas en un archivo .npz. Las siguientes ejecuciones cargan
+desde ese archivo mientras el libro no cambie (mtime y hash de contenido).
+
+Con un libro por zona de monitoreo, cargar_libros lee un directorio o patron
+glob de libros en un pool de procesos (el parseo con openpyxl usa CPU) y los
+une en un solo conjunto con la columna Zona.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+RUTA_DATOS = 'data/VillaVerde_WaterSystemData.xlsx'
+DIRECTORIO_CACHE = 'data/.cache'
+HOJAS = ['Datos', 'Coordenadas', 'Limites']
+
+# Variables de nuestro grupo
+VARIABLES_GRUPO = ['Turb_NTU', 'Color_PtCo', 'Coli_tot_NMP100mL', 'Coli_fec_NMP100mL', 'Caudal_Ls', 'Precip_mm_d']
+COLUMNAS_CLAVE = ['Punto', 'TipoSistema', 'Campaña']
+
+
+def hash_archivo(ruta, bloque=1 << 20):
+    """
+    Calcula el hash SHA-256 del contenido de un archivo leyendo por bloques
+    """
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        for trozo in iter(lambda: archivo.read(bloque), b''):
+            h.update(trozo)
+    return h.hexdigest()
+
+
+def _rutas_cache(ruta, directorio_cache):
+    """
+    Devuelve la ruta del indice (mtime/hash) y el prefijo de los .npz del libro
+    """
+    nombre = os.path.splitext(os.path.basename(ruta))[0]
+    return (os.path.join(directorio_cache, f'{nombre}.json'),
+            os.path.join(directorio_cache, nombre))
+
+
+def _huella_vigente(ruta, ruta_indice):
+    """
+    Devuelve el hash del libro si la cache sigue siendo valida, si no None.
+    Si solo cambio el mtime pero el contenido es el mismo, se actualiza el indice.
+    """
+    if not os.path.exists(ruta_indice):
+        return None
+
+    with open(ruta_indice, encoding='utf-8') as archivo:
+        indice = json.load(archivo)
+
+    estado = os.stat(ruta)
+    if indice.get('mtime') == estado.st_mtime_ns and indice.get('tamano') == estado.st_size:
+        return indice.get('sha256')
+
+    # El mtime cambio: solo se reutiliza si el contenido es identico
+    sha = hash_archivo(ruta)
+    if sha != indice.get('sha256'):
+        return None
+
+    _escribir_indice(ruta_indice, estado, sha)
+    return sha
+
+
+def _escribir_indice(ruta_indice, estado, sha):
+    """
+    Guarda el mtime, tamano y hash con el que se construyo la cache
+    """
+    with open(ruta_indice, 'w', encoding='utf-8') as archivo:
+        json.dump({'mtime': estado.st_mtime_ns, 'tamano': estado.st_size, 'sha256': sha}, archivo)
+
+
+def arreglos_desde_tabla(df, prefijo=''):
+    """
+    Convierte un DataFrame en arreglos tipados para un .npz (sin pickle).
+    Las columnas de texto se guardan como unicode con una mascara de nulos.
+    prefijo permite guardar varias tablas en el mismo archivo.
+    """
+    arreglos = {f'{prefijo}columnas': np.array([str(c) for c in df.columns], dtype=str)}
+    for i, columna in enumerate(df.columns):
+        serie = df[columna]
+        if serie.dtype.kind in 'biufM':
+            arreglos[f'{prefijo}c{i}'] = serie.to_numpy()
+        else:
+            nulos = serie.isna().to_numpy()
+            arreglos[f'{prefijo}c{i}'] = serie.astype(str).where(~nulos, '').to_numpy(dtype=str)
+            arreglos[f'{prefijo}n{i}'] = nulos
+    return arreglos
+
+
+def tabla_desde_arreglos(arreglos, prefijo=''):
+    """
+    Reconstruye el DataFrame guardado con arreglos_desde_tabla
+    """
+    columnas = [str(c) for c in arreglos[f'{prefijo}columnas']]
+    datos = {}
+    for i, columna in enumerate(columnas):
+        valores = arreglos[f'{prefijo}c{i}']
+        if f'{prefijo}n{i}' in arreglos:
+            serie = pd.Series(valores, dtype='str')
+            datos[columna] = serie.where(~arreglos[f'{prefijo}n{i}'])
+        else:
+            datos[columna] = valores
+    return pd.DataFrame(datos, columns=columnas)
+
+
+def _guardar_hoja(df, ruta_npz):
+    temporal = ruta_npz + '.tmp.npz'
+    np.savez(temporal, **arreglos_desde_tabla(df))
+    os.replace(temporal, ruta_npz)
+
+
+def _leer_hoja(ruta_npz):
+    with np.load(ruta_npz, allow_pickle=False) as arreglos:
+        return tabla_desde_arreglos(arreglos)
+
+
+def cargar_hojas(ruta=RUTA_DATOS, hojas=HOJAS, directorio_cache=DIRECTORIO_CACHE, usar_cache=True):
+    """
+    Carga las hojas indicadas del libro, usando la cache columnar si es valida.
+    Retorna un diccionario {hoja: DataFrame}.
+    """
+    if not usar_cache:
+        return pd.read_excel(ruta, sheet_name=list(hojas))
+
+    os.makedirs(directorio_cache, exist_ok=True)
+    ruta_indice, prefijo = _rutas_cache(ruta, directorio_cache)
+
+    sha = _huella_vigente(ruta, ruta_indice)
+    if sha is not None:
+        rutas = {hoja: f'{prefijo}-{sha[:16]}-{hoja}.npz' for hoja in hojas}
+        if all(os.path.exists(r) for r in rutas.values()):
+            return {hoja: _leer_hoja(r) for hoja, r in rutas.items()}
+
+    # Cache invalida o incompleta: parsear el libro una sola vez (todas las hojas)
+    estado = os.stat(ruta)
+    sha = hash_archivo(ruta)
+    hojas_leidas = pd.read_excel(ruta, sheet_name=list(hojas))
+    for hoja, df in hojas_leidas.items():
+        _guardar_hoja(df, f'{prefijo}-{sha[:16]}-{hoja}.npz')
+
+    # Eliminar hojas (y esquemas y almacenes) cacheados de versiones anteriores del libro
+    for antiguo in glob.glob(f'{glob.escape(prefijo)}-*'):
+        if f'-{sha[:16]}-' not in os.path.basename(antiguo):
+            if os.path.isdir(antiguo):
+                shutil.rmtree(antiguo)
+            else:
+                os.remove(antiguo)
+    _escribir_indice(ruta_indice, estado, sha)
+
+    return hojas_leidas
+
+
+def listar_libros(origen):
+    """
+    Rutas de los libros de origen: un archivo, un directorio (todos sus .xlsx)
+    o un patron glob, en orden alfabetico
+    """
+    if os.path.isdir(origen):
+        rutas = glob.glob(os.path.join(glob.escape(origen), '*.xlsx'))
+    elif any(caracter in origen for caracter in '*?['):
+        rutas = glob.glob(origen)
+    else:
+        rutas = [origen]
+    # Excel deja archivos ~$ de bloqueo mientras un libro esta abierto
+    return sorted(r for r in rutas if not os.path.basename(r).startswith('~$'))
+
+
+def _zonas(rutas):
+    """
+    Nombre de zona de cada libro: el nombre del archivo o, si se repite en
+    varias carpetas, la ruta relativa a la carpeta comun (sin el nombre del
+    archivo cuando todos se llaman igual)
+    """
+    nombres = [os.path.splitext(os.path.basename(r))[0] for r in rutas]
+    if len(set(nombres)) == len(nombres):
+        return nombres
+    base = os.path.commonpath([os.path.dirname(os.path.abspath(r)) for r in rutas])
+    relativas = [os.path.splitext(os.path.relpath(os.path.abspath(r), base))[0] for r in rutas]
+    if len(set(nombres)) == 1:
+        relativas = [os.path.dirname(r) for r in relativas]
+    return [r.replace(os.sep, '_') for r in relativas]
+
+
+def _cargar_libro(trabajo):
+    """
+    Carga las hojas de un libro; se ejecuta en el trabajador
+    """
+    ruta, hojas, directorio_cache, usar_cache = trabajo
+    return cargar_hojas(ruta, hojas, directorio_cache, usar_cache)
+
+
+def _unir_libros(libros, zonas, hojas):
+    """
+    Concatena las hojas de cada libro con la columna Zona. Con varios libros
+    los puntos se renombran <zona>-<punto> para que no se mezclen entre zonas.
+    Limites es comun a todas las zonas: se quitan las regulaciones repetidas.
+    """
+    unidas = {}
+    for hoja in hojas:
+        partes = []
+        for zona, libro in zip(zonas, libros):
+            df = libro[hoja].copy()
+            if hoja != 'Limites':
+                if len(libros) > 1 and 'Punto' in df.columns:
+                    df['Punto'] = (zona + '-' + df['Punto'].astype(str)).where(df['Punto'].notna())
+                df.insert(0, 'Zona', zona)
+            partes.append(df)
+        unidas[hoja] = pd.concat(partes, ignore_index=True)
+
+    if 'Limites' in unidas:
+        limites = unidas['Limites'].drop_duplicates(ignore_index=True)
+        regulacion = [c for c in ('TipoSistema', 'Uso', 'Variable') if c in limites.columns]
+        distintas = limites.duplicated(regulacion)
+        if distintas.any():
+            print(f"  Aviso: {int(distintas.sum())} limites difieren entre zonas; se usan los del primer libro")
+        unidas['Limites'] = limites[~distintas].reset_index(drop=True)
+    return unidas
+
+
+def cargar_libros(origen, hojas=HOJAS, trabajadores=None, directorio_cache=DIRECTORIO_CACHE, usar_cache=True):
+    """
+    Carga las hojas de todos los libros de origen (archivo, directorio o glob)
+    en paralelo, cada uno con su cache columnar, y las une por hoja.
+    trabajadores: procesos del pool (None = todos los nucleos, 1 = en serie).
+    Retorna un diccionario {hoja: DataFrame} con la columna Zona.
+    """
+    rutas = listar_libros(origen)
+    if not rutas:
+        raise FileNotFoundError(f"No se encontraron libros .xlsx en {origen}")
+    zonas = _zonas(rutas)
+
+    # Libros con el mismo nombre en distintas carpetas no comparten cache
+    repetidos = len({os.path.basename(r) for r in rutas}) < len(rutas)
+    trabajos = [(ruta, list(hojas), os.path.join(directorio_cache, 'zonas', zona) if repetidos else directorio_cache,
+                 usar_cache) for ruta, zona in zip(rutas, zonas)]
+
+    if trabajadores is None:
+        trabajadores = os.cpu_count() or 1
+    trabajadores = min(trabajadores, len(trabajos))
+    if trabajadores <= 1:
+        libros = [_cargar_libro(trabajo) for trabajo in trabajos]
+    else:
+        with ProcessPoolExecutor(max_workers=trabajadores) as pool:
+            libros = list(pool.map(_cargar_libro, trabajos))
+
+    return _unir_libros(libros, zonas, hojas)
+
+
+def huella_libro(ruta=RUTA_DATOS, directorio_cache=DIRECTORIO_CACHE):
+    """
+    Hash SHA-256 del libro; usa el indice de la cache para no releerlo si no cambio
+    """
+    ruta_indice, _prefijo = _rutas_cache(ruta, directorio_cache)
+    return _huella_vigente(ruta, ruta_indice) or hash_archivo(ruta)
+
+
+def ruta_en_cache(ruta, sha, sufijo, directorio_cache=DIRECTORIO_CACHE):
+    """
+    Ruta de un artefacto derivado del libro (p. ej. 'esquema.json') dentro de la
+    cache; se borra junto con las hojas cuando el libro cambia
+    """
+    _indice, prefijo = _rutas_cache(ruta, directorio_cache)
+    return f'{prefijo}-{sha[:16]}-{sufijo}'
+
+
+def cargar_datos(ruta=RUTA_DATOS, usar_cache=True, trabajadores=None):
+    """
+    Carga las hojas Datos, Coordenadas y Limites del archivo Excel. ruta
+    tambien puede ser un directorio o patron glob con un libro por zona
+    (ver cargar_libros); trabajadores es el tamaño del pool en ese caso.
+    Retorna (datos, coordenadas, limites) o (None, None, None) si hay error.
+    """
+    try:
+        if os.path.isfile(ruta):
+            hojas = cargar_hojas(ruta, HOJAS, usar_cache=usar_cache)
+        else:
+            hojas = cargar_libros(ruta, HOJAS, trabajadores, usar_cache=usar_cache)
+    except (OSError, ValueError, KeyError) as error:
+        print(f"Error al cargar datos desde {ruta}: {error}")
+        return None, None, None
+
+    datos = hojas['Datos']
+    coordenadas = hojas['Coordenadas']
+    limites = hojas['Limites']
+
+    print("Datos cargados exitosamente")
+    if 'Zona' in datos.columns:
+        print(f"  - Libros (zonas): {datos['Zona'].nunique()}")
+    print(f"  - Datos principales: {datos.shape[0]} filas, {datos.shape[1]} columnas")
+    print(f"  - Coordenadas: {coordenadas.shape[0]} puntos")
+    print(f"  - Limites: {limites.shape[0]} regulaciones")
+
+    return datos, coordenadas, limites
+
+
+def organizar_datos(datos, coordenadas, compacto=False):
+    """
+    Une los datos con la descripcion de cada punto y los organiza por tipo de sistema.
+    El DataFrame unido (datos_completos) se construye una sola vez; cada sistema es
+    un corte contiguo de ese mismo DataFrame, no una copia.
+    compacto: datos_completos con el modelo compacto (ver modules.compact_model):
+    claves y Descripcion categoricas, mediciones en float64 como las del libro.
+    Retorna un diccionario {tipo_sistema: DataFrame}.
+    """
+    faltantes = [c for c in COLUMNAS_CLAVE if c not in datos.columns]
+    if faltantes:
+        print(f"Faltan columnas clave en la hoja Datos: {faltantes}")
+        return {}
+
+    if compacto:
+        from modules.compact_model import compactar_mediciones, unir_puntos
+
+        otras = [c for c in datos.columns if c not in COLUMNAS_CLAVE]
+        datos_completos = unir_puntos(*compactar_mediciones(datos, coordenadas, otras, flotantes=False))
+        datos_completos['Descripcion'] = datos_completos['Descripcion'].astype('category')
+        datos_completos = datos_completos[list(datos.columns) + ['Descripcion']]
+    else:
+        datos_completos = datos.merge(coordenadas[['Punto', 'Descripcion']], on='Punto', how='left')
+
+    # Ordenar una vez por sistema para que cada grupo quede en filas contiguas
+    datos_completos = datos_completos.sort_values('TipoSistema', kind='stable', ignore_index=True)
+    sistemas = datos_completos['TipoSistema'].to_numpy()
+
+    # Todos los sistemas presentes, en orden alfabetico (ninguno queda afuera)
+    datos_organizados = {}
+    for sistema in pd.unique(sistemas[pd.notna(sistemas)]):
+        inicio = sistemas.searchsorted(sistema, side='left')
+        fin = sistemas.searchsorted(sistema, side='right')
+        datos_organizados[sistema] = datos_completos.iloc[inicio:fin]
+
+    for sistema, df in datos_organizados.items():
+        print(f"  - {sistema}: {len(df)} registros")
+
+    return datos_organizados
+
+
+def explorar_datos(datos_organizados, variables=VARIABLES_GRUPO):
+    """
+    Muestra informacion basica de los datos organizados
+    """
+    print("\n3. Informacion de datos:")
+    for tipo_sistema, df in datos_organizados.items():
+        if df.empty:
+            print(f"  - {tipo_sistema}: sin registros")
+            continue
+        print(f"  - {tipo_sistema}: puntos {list(df['Punto'].unique())}, "
+              f"campañas {list(df['Campaña'].unique())}")
+    print(f"Variables de nuestro grupo: {list(variables)}")
+
+
+def validar_estructura_datos(datos_organizados, variables=VARIABLES_GRUPO):
+    """
+    Verifica que cada sistema tenga las columnas clave y las variables del grupo.
+    Retorna True si la estructura es valida para el analisis.
+    """
+    print("\n4. Validando estructura de datos...")
+    if not any(len(df) > 0 for df in datos_organizados.values()):
+        print("  - No hay registros para ningun tipo de sistema")
+        return False
+
+    valida = True
+    for tipo_sistema, df in datos_organizados.items():
+        faltantes = [c for c in COLUMNAS_CLAVE + list(variables) if c not in df.columns]
+        if faltantes:
+            print(f"  - {tipo_sistema}: faltan columnas {faltantes}")
+            valida = False
+
+    if valida:
+        print("  - Estructura valida")
+    return valida
@@ -0,0 +1,111 @@
+"""
+INDICE DENSO PUNTO x CAMPAÑA x VARIABLE
+Arreglo de NumPy con el primer valor no nulo de cada (punto, campaña) para
+cada variable, mas la media y la desviacion poblacional de cada punto. Se
+construye una sola vez con todas las variables; las graficas temporales,
+comparativas, espaciales y de LMP leen de aca sus series y resumenes en vez
+de filtrar y pivotear datos_completos por variable, asi preparar los datos
+de las graficas depende del tamaño de la salida y no del de la entrada.
+"""
+
+import numpy as np
+import pandas as pd
+
+from modules.schema import descubrir_esquema
+
+
+class IndicePuntoCampana:
+    """
+    valores[p, c, v]: primer valor no nulo del punto p en la campaña c (NaN si no hay)
+    medias[p, v], desviaciones[p, v]: resumen de todas las mediciones del punto
+    """
+
+    def __init__(self, puntos, campanas, variables, valores, medias, desviaciones, sistemas, presentes):
+        self.puntos = list(puntos)
+        self.campanas = list(campanas)
+        self.variables = list(variables)
+        self.valores = valores
+        self.medias = medias
+        self.desviaciones = desviaciones
+        # Sistema de cada punto
+        self.sistemas = list(sistemas)
+        # Puntos con alguna fila en los datos
+        self.presentes = presentes
+        self._posicion_punto = {p: i for i, p in enumerate(self.puntos)}
+        self._posicion_campana = {c: j for j, c in enumerate(self.campanas)}
+        self._posicion_variable = {v: k for k, v in enumerate(self.variables)}
+
+    def valor(self, punto, campana, variable):
+        """
+        Valor de (punto, campaña, variable) en O(1), o None si no hay medicion
+        """
+        v = self.valores[self._posicion_punto[punto], self._posicion_campana[campana],
+                         self._posicion_variable[variable]]
+        return None if np.isnan(v) else float(v)
+
+    def series(self, variable, puntos=None):
+        """
+        {punto: [valor por campaña o None]} de los puntos presentes en los datos
+        """
+        k = self._posicion_variable[variable]
+        indices = (range(len(self.puntos)) if puntos is None else
+                   [self._posicion_punto[p] for p in puntos if p in self._posicion_punto])
+        return {self.puntos[i]: [None if v != v else v for v in self.valores[i, :, k].tolist()]
+                for i in indices if self.presentes[i]}
+
+    def resumen(self, variable):
+        """
+        {punto: (tipo_sistema, media, desviacion)} de los puntos con media valida
+        """
+        k = self._posicion_variable[variable]
+        medias = self.medias[:, k].tolist()
+        desviaciones = self.desviaciones[:, k].tolist()
+        return {punto: (self.sistemas[i], medias[i], desviaciones[i])
+                for i, punto in enumerate(self.puntos) if medias[i] == medias[i]}
+
+
+def construir_indice(datos_organizados, variables, esquema=None):
+    """
+    Construye el indice de las variables dadas con un solo recorrido de los datos.
+    Los puntos y campañas (y su orden) salen del esquema.
+    """
+    esquema = esquema or descubrir_esquema(datos_organizados)
+    variables = list(variables)
+    partes = [df for df in datos_organizados.values() if not df.empty] or list(datos_organizados.values())[:1]
+    datos = pd.concat([df[['TipoSistema', 'Punto', 'Campaña'] + variables] for df in partes], ignore_index=True)
+
+    puntos = list(esquema.puntos)
+    conocidos = set(puntos)
+    puntos += [p for p in pd.unique(datos['Punto'].dropna()) if p not in conocidos]
+    campanas = list(esquema.campanas)
+    codigo_punto = pd.Categorical(datos['Punto'], categories=puntos).codes.astype(np.int64)
+    codigo_campana = pd.Categorical(datos['Campaña'], categories=campanas).codes.astype(np.int64)
+    con_clave = (codigo_punto >= 0) & (codigo_campana >= 0)
+
+    forma = (len(puntos), len(campanas))
+    valores = np.full(forma + (len(variables),), np.nan)
+    mediciones = datos[variables].to_numpy(dtype=np.float64)
+    celdas = codigo_punto * len(campanas) + codigo_campana
+    for k in range(len(variables)):
+        validos = np.flatnonzero(con_clave & ~np.isnan(mediciones[:, k]))
+        # return_index da la primera aparicion de cada celda en el orden de los datos
+        unicas, primeras = np.unique(celdas[validos], return_index=True)
+        valores[..., k].flat[unicas] = mediciones[validos[primeras], k]
+
+    # Resumen por punto: la misma agregacion de pandas que el resumen por sistema
+    grupos = datos.groupby(['TipoSistema', 'Punto'], sort=False, observed=True)[variables]
+    tabla_medias = grupos.mean()
+    tabla_desviaciones = grupos.std(ddof=0)
+    medias = np.full((len(puntos), len(variables)), np.nan)
+    desviaciones = np.full((len(puntos), len(variables)), np.nan)
+    sistemas = [esquema.sistema_punto.get(p, 'Desconocido') for p in puntos]
+    posicion = {p: i for i, p in enumerate(puntos)}
+    filas = [posicion[punto] for _sistema, punto in tabla_medias.index]
+    medias[filas] = tabla_medias.to_numpy(dtype=np.float64)
+    desviaciones[filas] = tabla_desviaciones.to_numpy(dtype=np.float64)
+    for i, (sistema, _punto) in zip(filas, tabla_medias.index):
+        sistemas[i] = sistema
+
+    presentes = np.zeros(len(puntos), dtype=bool)
+    presentes[codigo_punto[codigo_punto >= 0]] = True
+    return IndicePuntoCampana(puntos, campanas, variables, valores, medias, desviaciones, sistemas, presentes)
@@ -0,0 +1,244 @@
+"""
+REQUERIMIENTO ii: ESTADISTICA DESCRIPTIVA
+Estadisticas por punto de muestreo y valores por campaña para cada punto.
+"""
+
+import os
+
+import pandas as pd
+
+from modules.data_loader import COLUMNAS_CLAVE, RUTA_DATOS, VARIABLES_GRUPO, cargar_hojas, hash_archivo
+from modules.export import exportar_hojas
+from modules.stats_accumulator import CLAVES_FILA, AcumuladorEstadisticas
+
+RUTA_ESTADISTICAS = 'results/estadisticas.xlsx'
+RUTA_ESTADISTICAS_ACUMULADAS = 'results/estadisticas_acumuladas.xlsx'
+RUTA_ESTADO = 'results/estado_estadisticas.npz'
+
+# Excel limita los nombres de hoja a 31 caracteres
+LARGO_NOMBRE_HOJA = 31
+HOJA_INDICE = 'Indice_Hojas'
+
+ESTADISTICAS_BASICAS = ['min', 'max', 'mean', 'std']
+ESTADISTICAS_DISPONIBLES = ['count', 'min', 'max', 'mean', 'std', 'median', 'cv']
+
+
+def estadisticas_por_grupo(df, variables=VARIABLES_GRUPO, claves=('TipoSistema', 'Punto'),
+                           estadisticas=ESTADISTICAS_BASICAS, percentiles=(), decimales=3):
+    """
+    Calcula las estadisticas de cada variable con una sola agrupacion por claves.
+    La desviacion estandar es poblacional (ddof=0) y cv = std / mean.
+    Los percentiles se piden en escala 0-100 y generan columnas {variable}_p{n}.
+    Retorna un DataFrame con las claves y columnas {variable}_{estadistica}.
+    """
+    desconocidas = [e for e in estadisticas if e not in ESTADISTICAS_DISPONIBLES]
+    if desconocidas:
+        raise ValueError(f"Estadisticas no soportadas: {desconocidas}")
+
+    agrupado = df.groupby(list(claves), sort=False, observed=True)[list(variables)]
+
+    calculadas = {}
+    if 'mean' in estadisticas or 'cv' in estadisticas:
+        calculadas['mean'] = agrupado.mean()
+    if 'std' in estadisticas or 'cv' in estadisticas:
+        calculadas['std'] = agrupado.std(ddof=0)
+
+    partes = {}
+    for estadistica in estadisticas:
+        if estadistica == 'cv':
+            partes['cv'] = calculadas['std'] / calculadas['mean']
+        elif estadistica in calculadas:
+            partes[estadistica] = calculadas[estadistica]
+        else:
+            partes[estadistica] = getattr(agrupado, estadistica)()
+    for percentil in percentiles:
+        partes[f'p{percentil:g}'] = agrupado.quantile(percentil / 100)
+
+    columnas = {f'{variable}_{nombre}': tabla[variable]
+                for variable in variables for nombre, tabla in partes.items()}
+    resultado = pd.DataFrame(columnas)
+    if decimales is not None:
+        resultado = resultado.round(decimales)
+    return resultado.reset_index()
+
+
+def _nombre_hoja_unico(nombre, usados, largo=LARGO_NOMBRE_HOJA):
+    """
+    nombre recortado al largo maximo de Excel; si ya esta en usados (sin
+    distinguir mayusculas, como Excel) se le agrega ~2, ~3, ...
+    """
+    candidato = nombre[:largo]
+    numero = 1
+    while candidato.lower() in usados:
+        numero += 1
+        sufijo = f'~{numero}'
+        candidato = nombre[:largo - len(sufijo)] + sufijo
+    usados.add(candidato.lower())
+    return candidato
+
+
+def construir_tablas_estadisticas(datos_organizados, variables=VARIABLES_GRUPO, fragmentos=None,
+                                  trabajadores=None):
+    """
+    Calcula las estadisticas por punto y por campaña de cada sistema.
+    fragmentos: 'TipoSistema' o 'Zona' para calcular las estadisticas por punto
+    en un pool de procesos, un fragmento por trabajo (ver modules.sharding).
+    Retorna una lista de (nombre_hoja, DataFrame). Si algun nombre de hoja
+    por punto se recorta o se repite (p. ej. puntos <zona>-<punto> de zonas con
+    nombres largos) se agrega la hoja Indice_Hojas con el punto de cada hoja.
+    """
+    variables = list(variables)
+    resultados = []
+
+    # a. Estadisticas por puntos de muestreo
+    print("\n  a. Estadisticas por punto de muestreo:")
+    if fragmentos:
+        from modules.sharding import analizar_por_fragmentos
+
+        resultados.extend(analizar_por_fragmentos(datos_organizados, variables=variables, por=fragmentos,
+                                                  trabajadores=trabajadores,
+                                                  tareas=('estadisticas',))['estadisticas'])
+    else:
+        for sistema, datos_sistema in datos_organizados.items():
+            if datos_sistema.empty:
+                continue
+            print(f"    - Calculando {sistema}...")
+            df_puntos = estadisticas_por_grupo(datos_sistema, variables, claves=['Punto'])
+            resultados.append((f'{sistema}_Puntos', df_puntos))
+
+    # b. Valores por campaña para cada punto
+    print("\n  b. Estadisticas por campaña para cada punto:")
+    usados = {nombre.lower() for nombre, _ in resultados} | {HOJA_INDICE.lower()}
+    indice = []
+    for sistema, datos_sistema in datos_organizados.items():
+        if datos_sistema.empty:
+            continue
+        print(f"    - Calculando {sistema}...")
+        for punto, datos_punto in datos_sistema.groupby('Punto', sort=False, observed=True):
+            df_campanas = datos_punto[['Campaña'] + variables].reset_index(drop=True)
+            nombre = _nombre_hoja_unico(f'{sistema}_P{punto}', usados)
+            indice.append((nombre, sistema, punto))
+            resultados.append((nombre, df_campanas))
+
+    if any(nombre != f'{sistema}_P{punto}' for nombre, sistema, punto in indice):
+        resultados.append((HOJA_INDICE, pd.DataFrame(indice, columns=['Hoja', 'TipoSistema', 'Punto'])))
+
+    return resultados
+
+
+def exportar_estadisticas(resultados, ruta_salida=RUTA_ESTADISTICAS, formato_tabular=None):
+    """
+    Guarda cada (nombre_hoja, DataFrame) como una hoja del archivo Excel.
+    formato_tabular: 'parquet' o 'csv' para escribir tambien una tabla por hoja.
+    """
+    if not resultados:
+        print("\n  No se pudieron calcular estadisticas")
+        return
+
+    exportar_hojas(resultados, ruta_salida, formato_tabular)
+    print(f"\n  Archivo guardado: {ruta_salida}")
+
+
+def calcular_estadisticas(datos_organizados, ruta_salida=RUTA_ESTADISTICAS, formato_tabular=None,
+                          variables=VARIABLES_GRUPO, cache=None, fragmentos=None, trabajadores=None):
+    """
+    Calcula las estadisticas por punto y por campaña de cada sistema y las
+    guarda en Excel. Retorna una lista de (nombre_hoja, DataFrame).
+    cache: CacheResultados; si los datos no cambiaron se reutilizan las tablas
+    y el libro ya exportado.
+    fragmentos, trabajadores: ejecucion por fragmentos (ver construir_tablas_estadisticas).
+    """
+    def construir():
+        return construir_tablas_estadisticas(datos_organizados, variables, fragmentos, trabajadores)
+
+    if cache is None:
+        resultados = construir()
+        exportar_estadisticas(resultados, ruta_salida, formato_tabular)
+        return resultados
+
+    variables = list(variables)
+    entradas = [df[COLUMNAS_CLAVE + variables] for df in datos_organizados.values()]
+    clave, resultados, acierto = cache.memorizar(
+        'estadisticas', construir, entradas,
+        {'variables': variables, 'sistemas': list(datos_organizados), 'fragmentos': fragmentos})
+    if acierto:
+        print("\n  Estadisticas tomadas de la cache de resultados")
+
+    if not formato_tabular and cache.salida_vigente(ruta_salida, clave):
+        print(f"\n  Archivo sin cambios: {ruta_salida}")
+    else:
+        exportar_estadisticas(resultados, ruta_salida, formato_tabular)
+        if os.path.exists(ruta_salida):
+            cache.registrar_salida(ruta_salida, clave)
+    return resultados
+
+
+def mostrar_resumen_estadisticas(resultados, variables=VARIABLES_GRUPO):
+    """
+    Muestra los promedios por punto de las dos primeras variables del grupo
+    """
+    print("\n6. Resumen de promedios por punto:")
+    for nombre_hoja, df in resultados:
+        if not nombre_hoja.endswith('_Puntos'):
+            continue
+        print(f"\n{nombre_hoja.replace('_Puntos', '')}:")
+        for variable in list(variables)[:2]:
+            columna = f'{variable}_mean'
+            if columna in df.columns:
+                promedios = ', '.join(f"{p}={v:.2f}" for p, v in zip(df['Punto'], df[columna]))
+                print(f"  - {variable}: {promedios}")
+
+
+def actualizar_estadisticas_acumuladas(ruta_nuevos, ruta_estado=RUTA_ESTADO, ruta_base=RUTA_DATOS,
+                                       percentiles=(50, 90), ruta_salida=RUTA_ESTADISTICAS_ACUMULADAS):
+    """
+    Incorpora las filas de un archivo nuevo (p. ej. la campaña C5) al estado
+    persistente por (TipoSistema, Punto, variable) sin recalcular el historico.
+    Si no hay estado se construye una vez desde la hoja Datos de ruta_base. Las
+    filas cuya (TipoSistema, Punto, Campaña) ya se incorporo se omiten, asi el
+    mismo libro con una campaña agregada al final solo suma la campaña nueva;
+    un archivo identico (mismo hash) ni siquiera se lee.
+    Retorna el DataFrame de estadisticas por punto con percentiles aproximados.
+    """
+    from modules.streaming import leer_por_bloques
+
+    if os.path.exists(ruta_estado):
+        acumulador = AcumuladorEstadisticas.cargar(ruta_estado)
+        if not acumulador.incorporadas:
+            print(f"  - Advertencia: {ruta_estado} no registra las campañas incorporadas; "
+                  f"borrelo para reconstruirlo si el archivo repite campañas")
+    else:
+        print(f"  - Construyendo estado inicial desde {ruta_base}...")
+        datos = cargar_hojas(ruta_base, ['Datos'])['Datos']
+        acumulador = AcumuladorEstadisticas().actualizar(datos).registrar_filas(datos)
+        acumulador.fuentes.append(hash_archivo(ruta_base))
+
+    huella = hash_archivo(ruta_nuevos)
+    if huella in acumulador.fuentes:
+        print(f"  - {ruta_nuevos} ya fue incorporado, no se suma de nuevo")
+    else:
+        filas_previas = acumulador.filas
+        repetidas = 0
+        nuevas = []
+        for bloque in leer_por_bloques(ruta_nuevos, COLUMNAS_CLAVE + acumulador.variables):
+            # Se compara contra lo incorporado antes de este archivo, no contra sus propios bloques
+            bloque_nuevo = acumulador.filas_nuevas(bloque)
+            repetidas += len(bloque) - len(bloque_nuevo)
+            for variable in acumulador.variables:
+                bloque_nuevo[variable] = pd.to_numeric(bloque_nuevo[variable], errors='coerce')
+            acumulador.actualizar(bloque_nuevo)
+            nuevas.append(bloque_nuevo[CLAVES_FILA])
+        for claves in nuevas:
+            acumulador.registrar_filas(claves)
+        acumulador.fuentes.append(huella)
+        acumulador.guardar(ruta_estado)
+        if repetidas:
+            print(f"  - {repetidas} filas de campañas ya incorporadas se omiten")
+        print(f"  - {acumulador.filas - filas_previas} filas nuevas incorporadas "
+              f"({acumulador.filas} en total)")
+
+    estadisticas = acumulador.resultado(percentiles=percentiles)
+    exportar_hojas(((f'{sistema}_Puntos'[:LARGO_NOMBRE_HOJA], df.drop(columns='TipoSistema'))
+                    for sistema, df in estadisticas.groupby('TipoSistema', sort=False)), ruta_salida)
+    print(f"  Archivo guardado: {ruta_salida}")
+    return estadisticas
@@ -0,0 +1,184 @@
+"""
+EXPORTACION MASIVA DE RESULTADOS
+Escribe libros Excel en modo streaming: con xlsxwriter (constant_memory) si
+esta instalado, o con openpyxl en modo write-only. Cada hoja se vuelca por
+lotes de filas y se libera antes de pasar a la siguiente, asi la memoria no
+crece con el numero de hojas. Las hojas pueden llegar como generador.
+Para consumo por otros programas se puede escribir la misma informacion como
+un Parquet o CSV por hoja.
+"""
+
+import os
+
+DIRECTORIO_TABLAS = 'results/tablas'
+FORMATOS_TABULARES = ('parquet', 'csv')
+FILAS_POR_LOTE = 10_000
+
+# Mismo estilo de encabezado que pd.ExcelWriter
+ESTILO_ENCABEZADO = {'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'}
+
+
+def motor_excel():
+    """
+    'xlsxwriter' si esta instalado, si no 'openpyxl'
+    """
+    try:
+        import xlsxwriter  # noqa: F401
+    except ImportError:
+        return 'openpyxl'
+    return 'xlsxwriter'
+
+
+def _lotes_filas(df, filas_por_lote=FILAS_POR_LOTE):
+    """
+    Genera listas de filas (tuplas de tipos Python, NaN -> None) de a filas_por_lote
+    """
+    for inicio in range(0, len(df), filas_por_lote):
+        lote = df.iloc[inicio:inicio + filas_por_lote]
+        columnas = [lote[c].astype(object).where(lote[c].notna(), None).tolist() for c in lote.columns]
+        yield list(zip(*columnas))
+
+
+def _escribir_xlsxwriter(hojas, ruta):
+    import xlsxwriter
+
+    libro = xlsxwriter.Workbook(ruta, {'constant_memory': True})
+    encabezado = libro.add_format(ESTILO_ENCABEZADO)
+    escritas = []
+    try:
+        for nombre, df in hojas:
+            hoja = libro.add_worksheet(nombre)
+            hoja.write_row(0, 0, [str(c) for c in df.columns], encabezado)
+            fila = 1
+            for lote in _lotes_filas(df):
+                for valores in lote:
+                    hoja.write_row(fila, 0, valores)
+                    fila += 1
+            escritas.append(nombre)
+    finally:
+        # Siempre se cierra para liberar sus temporales; sin hojas, escribir_excel borra el archivo
+        libro.close()
+    return escritas
+
+
+def _escribir_openpyxl(hojas, ruta):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+
+    libro = Workbook(write_only=True)
+    fuente = Font(bold=True)
+    delgado = Side(style='thin')
+    borde = Border(left=delgado, right=delgado, top=delgado, bottom=delgado)
+    alineacion = Alignment(horizontal='center', vertical='top')
+
+    escritas = []
+    for nombre, df in hojas:
+        hoja = libro.create_sheet(nombre)
+        celdas = []
+        for columna in df.columns:
+            celda = WriteOnlyCell(hoja, value=str(columna))
+            celda.font, celda.border, celda.alignment = fuente, borde, alineacion
+            celdas.append(celda)
+        hoja.append(celdas)
+        for lote in _lotes_filas(df):
+            for valores in lote:
+                hoja.append(valores)
+        # Cierra el XML de la hoja ahora y no al guardar, para no acumular hojas abiertas
+        hoja.close()
+        escritas.append(nombre)
+
+    if escritas:
+        libro.save(ruta)
+    return escritas
+
+
+def escribir_excel(hojas, ruta, motor=None):
+    """
+    Escribe (nombre_hoja, DataFrame) en un libro Excel, hoja por hoja y sin indice.
+    El archivo se reemplaza solo al terminar. Si no hay hojas no se escribe nada.
+    Retorna la lista de hojas escritas.
+    """
+    motor = motor or motor_excel()
+    if motor not in ('xlsxwriter', 'openpyxl'):
+        raise ValueError(f"Motor de Excel no soportado: {motor}")
+
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    temporal = ruta + '.tmp.xlsx'
+    escribir = _escribir_xlsxwriter if motor == 'xlsxwriter' else _escribir_openpyxl
+    try:
+        escritas = escribir(hojas, temporal)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    if escritas:
+        os.replace(temporal, ruta)
+    elif os.path.exists(temporal):
+        os.remove(temporal)
+    return escritas
+
+
+def directorio_tabular(ruta_excel, directorio=DIRECTORIO_TABLAS):
+    """
+    Carpeta de las tablas de un libro: results/tablas/<nombre del libro>
+    """
+    return os.path.join(directorio, os.path.splitext(os.path.basename(ruta_excel))[0])
+
+
+def validar_formato_tabular(formato):
+    """
+    Falla temprano si el formato no existe o si falta pyarrow para Parquet
+    """
+    if formato not in FORMATOS_TABULARES:
+        raise ValueError(f"Formato no soportado: {formato} (opciones: {', '.join(FORMATOS_TABULARES)})")
+    if formato == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as error:
+            raise ImportError("Exportar a Parquet requiere pyarrow (pip install pyarrow)") from error
+
+
+def _escribir_tabla(nombre, df, directorio, formato):
+    ruta = os.path.join(directorio, f'{nombre}.{formato}')
+    if formato == 'parquet':
+        df.to_parquet(ruta, index=False)
+    else:
+        df.to_csv(ruta, index=False)
+    return ruta
+
+
+def escribir_tabular(hojas, directorio, formato='parquet'):
+    """
+    Escribe cada (nombre_hoja, DataFrame) como <directorio>/<nombre_hoja>.<formato>.
+    Parquet requiere pyarrow. Retorna la lista de rutas escritas.
+    """
+    validar_formato_tabular(formato)
+    os.makedirs(directorio, exist_ok=True)
+    return [_escribir_tabla(nombre, df, directorio, formato) for nombre, df in hojas]
+
+
+def exportar_hojas(hojas, ruta_excel, formato_tabular=None, motor=None):
+    """
+    Escribe el libro Excel y, si se pide, cada hoja tambien como Parquet/CSV en
+    directorio_tabular(ruta_excel), en la misma pasada (las hojas se consumen
+    una sola vez). Retorna la lista de hojas escritas.
+    """
+    if formato_tabular:
+        validar_formato_tabular(formato_tabular)
+        directorio = directorio_tabular(ruta_excel)
+        os.makedirs(directorio, exist_ok=True)
+
+        def con_copia(hojas):
+            for nombre, df in hojas:
+                _escribir_tabla(nombre, df, directorio, formato_tabular)
+                yield nombre, df
+
+        hojas = con_copia(hojas)
+
+    escritas = escribir_excel(hojas, ruta_excel, motor)
+    if formato_tabular:
+        print(f"  Tablas {formato_tabular} guardadas en: {directorio}")
+    return escritas
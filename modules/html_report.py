@@ -0,0 +1,337 @@
+"""
+REPORTE HTML INTERACTIVO
+Alternativa a los PNG de los requerimientos iii y iv: un solo archivo HTML
+autocontenido con las vistas espacial, temporal, comparativa, boxplot y LMP
+de cada variable. El proceso principal solo agrega las series (los mismos
+preparadores de modules.visualization, leidos del indice denso) y las guarda
+como un JSON compacto dentro del HTML; el navegador dibuja las graficas en
+SVG al elegir la variable. No se rasteriza nada, asi el reporte tarda y pesa
+una fraccion de las graficas a 300 dpi y crece con los datos agregados, no
+con variables x familias de imagenes.
+"""
+
+import json
+import math
+import os
+from datetime import datetime
+
+from modules.schema import descubrir_esquema
+from modules.visualization import COLORES_SISTEMA, PREPARADORES, agregar_variable, disposicion_grafica
+
+RUTA_REPORTE = 'results/reporte.html'
+
+# Cifras significativas de los valores guardados en el JSON
+CIFRAS = 6
+
+# Claves de cbook.boxplot_stats que dibuja ax.bxp por defecto
+CLAVES_CAJA = ('label', 'med', 'q1', 'q3', 'whislo', 'whishi', 'fliers')
+
+
+def _compactar(valor):
+    """
+    Convierte escalares y arreglos de NumPy a tipos de JSON, con NaN -> None
+    y los reales redondeados a CIFRAS significativas
+    """
+    if isinstance(valor, dict):
+        return {str(k): _compactar(v) for k, v in valor.items()}
+    if hasattr(valor, 'tolist'):
+        valor = valor.tolist()
+    if isinstance(valor, (list, tuple)):
+        return [_compactar(v) for v in valor]
+    if isinstance(valor, float):
+        return None if math.isnan(valor) or math.isinf(valor) else float(f'{valor:.{CIFRAS}g}')
+    return valor
+
+
+def _color_css(color):
+    from matplotlib.colors import to_hex
+
+    return to_hex(color)
+
+
+def datos_reporte(datos_organizados, limites=None, esquema=None):
+    """
+    Series agregadas de todas las vistas, sin repetir la disposicion por grafica:
+      - disposicion: puntos, campañas, puntos clave y colores (hex)
+      - variables: {variable: {unidad, resumen, series, medias, cajas, lmp_max}}
+      - porcentajes: filas de calcular_porcentajes (si hay limites)
+    """
+    from modules.dense_index import construir_indice
+
+    esquema = esquema or descubrir_esquema(datos_organizados, limites)
+    clave = esquema.variables_clave
+    con_limites = esquema.variables_con_limites if limites is not None and not limites.empty else []
+    variables = list(dict.fromkeys(clave + con_limites))
+
+    disposicion = disposicion_grafica(esquema)
+    for colores in ('colores_punto', 'colores_clave'):
+        disposicion[colores] = [_color_css(c) for c in disposicion[colores]]
+    disposicion['colores_sistema'] = {s: _color_css(c) for s, c in COLORES_SISTEMA.items()}
+
+    indice = construir_indice(datos_organizados, variables, esquema) if variables else None
+    por_variable = {}
+    for variable in variables:
+        agregado = agregar_variable(datos_organizados, variable, esquema, indice)
+        entrada = {'unidad': esquema.unidad(variable), 'familias': []}
+        if variable in clave:
+            entrada['familias'] += ['espacial', 'temporal', 'comparativa', 'boxplot']
+            entrada['resumen'] = agregado['resumen']
+            entrada['series'] = agregado['series']
+            entrada['medias'] = PREPARADORES['comparativa'](datos_organizados, variable, agregado, esquema)['medias']
+            cajas = PREPARADORES['boxplot'](datos_organizados, variable, agregado, esquema)['cajas']
+            entrada['cajas'] = [{k: caja[k] for k in CLAVES_CAJA} for caja in cajas]
+        if variable in con_limites:
+            lmp_variable = limites.loc[limites['Variable'] == variable, 'LMP_max']
+            entrada['familias'].append('lmp')
+            entrada['resumen'] = agregado['resumen']
+            entrada['lmp_max'] = lmp_variable.iloc[0] if not lmp_variable.empty else None
+        por_variable[variable] = entrada
+
+    porcentajes = []
+    if con_limites:
+        from modules.lmp_analysis import calcular_porcentajes
+
+        porcentajes = calcular_porcentajes(datos_organizados, limites, esquema.variables_grupo).to_dict('records')
+    return _compactar({'disposicion': disposicion, 'variables': por_variable, 'porcentajes': porcentajes})
+
+
+def escribir_reporte(datos, ruta_salida=RUTA_REPORTE, titulo="Calidad del Agua - Villa Verde"):
+    """
+    Escribe el HTML con los datos embebidos. Retorna el tamaño en bytes.
+    """
+    contenido = json.dumps(datos, ensure_ascii=False, separators=(',', ':'), allow_nan=False)
+    # Un "</" dentro del JSON cerraria la etiqueta <script>
+    contenido = contenido.replace('</', '<\\/')
+    html = (PLANTILLA_HTML.replace('__TITULO__', titulo)
+            .replace('__GENERADO__', datetime.now().strftime('%Y-%m-%d %H:%M'))
+            .replace('__DATOS__', contenido))
+    os.makedirs(os.path.dirname(ruta_salida) or '.', exist_ok=True)
+    with open(ruta_salida + '.tmp', 'w', encoding='utf-8') as archivo:
+        archivo.write(html)
+    os.replace(ruta_salida + '.tmp', ruta_salida)
+    return os.path.getsize(ruta_salida)
+
+
+def generar_reporte(datos_organizados, limites=None, ruta_salida=RUTA_REPORTE, esquema=None):
+    """
+    Agrega las series y escribe el reporte HTML en ruta_salida
+    """
+    datos = datos_reporte(datos_organizados, limites, esquema)
+    tamano = escribir_reporte(datos, ruta_salida)
+    print(f"  - Reporte con {len(datos['variables'])} variables guardado en: {ruta_salida} "
+          f"({tamano / 1024:.0f} KB)")
+    return ruta_salida
+
+
+PLANTILLA_HTML = r"""<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="utf-8">
+<title>__TITULO__</title>
+<style>
+  body { font-family: system-ui, sans-serif; margin: 1.5rem auto; max-width: 1200px; color: #222; }
+  h1 { font-size: 1.5rem; margin-bottom: .2rem; }
+  .generado { color: #666; margin-top: 0; }
+  select { font-size: 1rem; padding: .2rem; }
+  section { margin: 1.5rem 0; }
+  h2 { font-size: 1.15rem; border-bottom: 1px solid #ddd; padding-bottom: .2rem; }
+  .fila { display: flex; gap: 1rem; flex-wrap: wrap; }
+  .fila > svg { flex: 1 1 480px; }
+  svg { width: 100%; height: auto; background: #fff; }
+  svg text { font-size: 11px; fill: #222; }
+  svg .titulo { font-size: 13px; font-weight: 600; }
+  svg .rejilla { stroke: #000; stroke-opacity: .1; }
+  svg .eje { stroke: #222; }
+  table { border-collapse: collapse; }
+  th, td { border: 1px solid #ddd; padding: .25rem .6rem; text-align: right; }
+  th:first-child, td:first-child { text-align: left; }
+</style>
+</head>
+<body>
+<h1>__TITULO__</h1>
+<p class="generado">Generado el __GENERADO__</p>
+<section id="porcentajes"></section>
+<label>Variable: <select id="variable"></select></label>
+<div id="vistas"></div>
+<script id="datos" type="application/json">__DATOS__</script>
+<script>
+"use strict";
+const DATOS = JSON.parse(document.getElementById('datos').textContent);
+const D = DATOS.disposicion;
+const MAX_LEYENDA = 20, MAX_ETIQUETAS_EJE = 40;
+const ANCHO = 900, ALTO = 420, M = {izq: 70, der: 20, sup: 40, inf: 60};
+
+function esc(texto) {
+  return String(texto).replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;').replace(/"/g, '&quot;');
+}
+function fmt(v) { return v === null || v === undefined ? 's/d' : (+v.toPrecision(4)).toString(); }
+
+// Marcas "redondas" del eje y entre min y max
+function marcas(min, max) {
+  if (min === max) { min -= 1; max += 1; }
+  const paso0 = (max - min) / 6, base = Math.pow(10, Math.floor(Math.log10(paso0)));
+  const paso = [1, 2, 5, 10].map(f => f * base).find(p => p >= paso0);
+  const inicio = Math.floor(min / paso) * paso, fin = Math.ceil(max / paso) * paso, lista = [];
+  for (let v = inicio; v <= fin + paso / 2; v += paso) lista.push(+v.toPrecision(12));
+  return lista;
+}
+
+// Lienzo con ejes, rejilla, titulo y etiquetas; x por categorias
+function lienzo(titulo, xlabel, ylabel, categorias, valores, ancho = ANCHO) {
+  const finitos = valores.filter(v => v !== null && isFinite(v));
+  // reduce y no Math.max(...valores): con miles de series se pasaria del limite de argumentos
+  const ticks = marcas(finitos.reduce((a, b) => Math.min(a, b), 0),
+                       finitos.length ? finitos.reduce((a, b) => Math.max(a, b), -Infinity) : 1);
+  const ymin = ticks[0], ymax = ticks[ticks.length - 1];
+  const w = ancho - M.izq - M.der, h = ALTO - M.sup - M.inf, banda = w / Math.max(categorias.length, 1);
+  const x = i => M.izq + banda * (i + .5), y = v => M.sup + h * (1 - (v - ymin) / (ymax - ymin));
+  const partes = [`<text class="titulo" x="${ancho / 2}" y="20" text-anchor="middle">${esc(titulo)}</text>`];
+  for (const t of ticks) {
+    partes.push(`<line class="rejilla" x1="${M.izq}" x2="${M.izq + w}" y1="${y(t)}" y2="${y(t)}"/>`,
+                `<text x="${M.izq - 6}" y="${y(t) + 4}" text-anchor="end">${fmt(t)}</text>`);
+  }
+  const cada = Math.ceil(categorias.length / MAX_ETIQUETAS_EJE), vertical = categorias.length > MAX_ETIQUETAS_EJE;
+  categorias.forEach((c, i) => {
+    if (i % cada) return;
+    partes.push(vertical
+      ? `<text transform="translate(${x(i) + 4},${M.sup + h + 6}) rotate(90)">${esc(c)}</text>`
+      : `<text x="${x(i)}" y="${M.sup + h + 16}" text-anchor="middle">${esc(c)}</text>`);
+  });
+  partes.push(`<line class="eje" x1="${M.izq}" x2="${M.izq}" y1="${M.sup}" y2="${M.sup + h}"/>`,
+              `<line class="eje" x1="${M.izq}" x2="${M.izq + w}" y1="${M.sup + h}" y2="${M.sup + h}"/>`,
+              `<text x="${M.izq + w / 2}" y="${ALTO - 8}" text-anchor="middle">${esc(xlabel)}</text>`,
+              `<text transform="translate(16,${M.sup + h / 2}) rotate(-90)" text-anchor="middle">${esc(ylabel)}</text>`);
+  return {partes, x, y, banda, ancho,
+          svg: () => `<svg viewBox="0 0 ${ancho} ${ALTO}">${partes.join('')}</svg>`};
+}
+
+function leyenda(l, entradas, trazo = false) {
+  if (entradas.length > MAX_LEYENDA) return;
+  entradas.forEach(([nombre, color], i) => {
+    const yy = M.sup + 8 + i * 16, xx = l.ancho - M.der - 110;
+    l.partes.push(trazo
+      ? `<line x1="${xx}" x2="${xx + 18}" y1="${yy}" y2="${yy}" stroke="${color}" stroke-width="2"${trazo === 'guion' ? ' stroke-dasharray="6 3"' : ''}/>`
+      : `<rect x="${xx + 4}" y="${yy - 5}" width="10" height="10" fill="${color}" fill-opacity=".7"/>`,
+      `<text x="${xx + 24}" y="${yy + 4}">${esc(nombre)}</text>`);
+  });
+}
+
+function barras(l, valores, colores, errores) {
+  valores.forEach((v, i) => {
+    if (v === null) return;
+    const y0 = l.y(0), y1 = l.y(v), ancho = l.banda * .8;
+    l.partes.push(`<rect x="${l.x(i) - ancho / 2}" y="${Math.min(y0, y1)}" width="${ancho}" height="${Math.abs(y0 - y1)}" fill="${colores[i]}" fill-opacity=".7"><title>${esc(D.puntos[i])}: ${fmt(v)}${errores ? ' ± ' + fmt(errores[i]) : ''}</title></rect>`);
+    if (errores && errores[i] !== null) {
+      const a = l.y(v - errores[i]), b = l.y(v + errores[i]), c = Math.min(5, l.banda * .3);
+      l.partes.push(`<path d="M${l.x(i)},${a}V${b}M${l.x(i) - c},${a}h${2 * c}M${l.x(i) - c},${b}h${2 * c}" stroke="#000" fill="none"/>`);
+    }
+  });
+}
+
+function lineas(l, series, marcador, nulosEnCero) {
+  for (const {nombre, color, valores} of series) {
+    let d = '', abierta = false;
+    valores.forEach((v, i) => {
+      if (v === null && nulosEnCero) v = 0;
+      if (v === null) { abierta = false; return; }
+      d += (abierta ? 'L' : 'M') + l.x(i) + ',' + l.y(v);
+      abierta = true;
+      l.partes.push(marcador === 's'
+        ? `<rect x="${l.x(i) - 4}" y="${l.y(v) - 4}" width="8" height="8" fill="${color}"><title>${esc(nombre)} ${esc(D.campanas[i])}: ${fmt(v)}</title></rect>`
+        : `<circle cx="${l.x(i)}" cy="${l.y(v)}" r="3.5" fill="${color}"><title>${esc(nombre)} ${esc(D.campanas[i])}: ${fmt(v)}</title></circle>`);
+    });
+    l.partes.push(`<path d="${d}" stroke="${color}" stroke-width="2" fill="none"/>`);
+  }
+}
+
+function resumenPorPunto(v) {
+  return D.puntos.map(p => v.resumen[p] || null);
+}
+
+const VISTAS = {
+  espacial(variable, v, eje) {
+    const r = resumenPorPunto(v), medias = r.map(e => e && e[1]), desv = r.map(e => e && e[2]);
+    const colores = r.map(e => D.colores_sistema[e ? e[0] : ''] || 'gray');
+    const l = lienzo(`Patron Espacial - ${variable}: comparacion entre TODOS los puntos de muestreo`,
+                     'Puntos de Muestreo', eje, D.puntos,
+                     medias.map((m, i) => m === null ? null : m + (desv[i] || 0)).concat(medias.map((m, i) => m === null ? null : m - (desv[i] || 0))));
+    barras(l, medias, colores, desv);
+    const sistemas = [...new Set(r.filter(e => e).map(e => e[0]))];
+    leyenda(l, sistemas.map(s => [s, D.colores_sistema[s] || 'gray']));
+    return l.svg();
+  },
+  temporal(variable, v, eje) {
+    const series = D.puntos.map((p, i) => ({nombre: p, color: D.colores_punto[i], valores: v.series[p]}))
+      .filter(s => s.valores && s.valores.some(x => x !== null));
+    const l = lienzo(`Patron Temporal - ${variable}: evolucion por campañas - TODOS los puntos`, 'Campaña', eje,
+                     D.campanas, series.flatMap(s => s.valores));
+    lineas(l, series, 'o', false);
+    leyenda(l, series.map(s => [s.nombre, s.color]), true);
+    return l.svg();
+  },
+  comparativa(variable, v, eje) {
+    const series = D.puntos_clave.map((p, i) => ({nombre: p, color: D.colores_clave[i], valores: v.series[p]}))
+      .filter(s => s.valores);
+    const l1 = lienzo(`Puntos Clave - ${variable}`, 'Campaña', eje, D.campanas,
+                      series.flatMap(s => s.valores.map(x => x === null ? 0 : x)), ANCHO * .6);
+    lineas(l1, series, 's', true);
+    leyenda(l1, series.map(s => [s.nombre, s.color]), true);
+    const medias = D.puntos.map(p => p in v.medias ? v.medias[p] : null);
+    const l2 = lienzo(`Todos los Puntos - ${variable}`, 'Puntos de Muestreo', eje, D.puntos, medias, ANCHO * .6);
+    barras(l2, medias, D.colores_punto);
+    return `<div class="fila">${l1.svg()}${l2.svg()}</div>`;
+  },
+  boxplot(variable, v, eje) {
+    const cajas = v.cajas;
+    const l = lienzo(`Distribucion de ${variable} por Campaña`, 'Campaña', eje, cajas.map(c => c.label),
+                     cajas.flatMap(c => [c.whislo, c.whishi, ...c.fliers]));
+    cajas.forEach((c, i) => {
+      if (c.med === null) return;
+      const x = l.x(i), a = Math.min(20, l.banda * .25);
+      l.partes.push(`<g stroke="#000" fill="none"><title>${esc(c.label)}: mediana ${fmt(c.med)}, Q1 ${fmt(c.q1)}, Q3 ${fmt(c.q3)}</title>`,
+        `<rect x="${x - a}" y="${l.y(c.q3)}" width="${2 * a}" height="${l.y(c.q1) - l.y(c.q3)}"/>`,
+        `<path d="M${x},${l.y(c.q3)}V${l.y(c.whishi)}M${x - a / 2},${l.y(c.whishi)}h${a}M${x},${l.y(c.q1)}V${l.y(c.whislo)}M${x - a / 2},${l.y(c.whislo)}h${a}"/>`,
+        `<path d="M${x - a},${l.y(c.med)}h${2 * a}" stroke="orange" stroke-width="2"/>`,
+        ...c.fliers.map(f => `<circle cx="${x}" cy="${l.y(f)}" r="3"/>`), '</g>');
+    });
+    return l.svg();
+  },
+  lmp(variable, v, eje) {
+    const r = resumenPorPunto(v), medias = r.map(e => e && e[1]);
+    const colores = r.map(e => D.colores_sistema[e ? e[0] : ''] || 'gray');
+    const conLimite = v.lmp_max !== null && v.lmp_max !== undefined;
+    const l = lienzo(`Evaluacion LMP - ${variable}: linea roja = Limite Maximo Permisible`, 'Puntos de Muestreo',
+                     eje, D.puntos, conLimite ? medias.concat([v.lmp_max]) : medias);
+    barras(l, medias, colores);
+    if (conLimite) {
+      const y = l.y(v.lmp_max);
+      l.partes.push(`<line x1="${M.izq}" x2="${l.ancho - M.der}" y1="${y}" y2="${y}" stroke="red" stroke-width="2" stroke-dasharray="6 3"/>`);
+      leyenda(l, [[`LMP Max: ${fmt(v.lmp_max)}`, 'red']], 'guion');
+    }
+    return l.svg();
+  },
+};
+const TITULOS = {espacial: 'Patron espacial', temporal: 'Patron temporal', comparativa: 'Comparativa',
+                 boxplot: 'Distribucion por campaña', lmp: 'Limites maximos permisibles'};
+
+function mostrar(variable) {
+  const v = DATOS.variables[variable], eje = v.unidad ? `${variable} (${v.unidad})` : variable;
+  document.getElementById('vistas').innerHTML = v.familias
+    .map(f => `<section><h2>${TITULOS[f]}</h2>${VISTAS[f](variable, v, eje)}</section>`).join('');
+}
+
+const selector = document.getElementById('variable');
+selector.innerHTML = Object.keys(DATOS.variables).map(v => `<option>${esc(v)}</option>`).join('');
+selector.addEventListener('change', () => mostrar(selector.value));
+if (selector.value) mostrar(selector.value);
+
+if (DATOS.porcentajes.length) {
+  document.getElementById('porcentajes').innerHTML = '<h2>Porcentaje de incumplimiento</h2><table><tr>' +
+    '<th>Variable</th><th>%</th><th>Incumplimientos</th><th>Mediciones</th></tr>' +
+    DATOS.porcentajes.map(p => `<tr><td>${esc(p.Variable)}</td><td>${fmt(p.Porcentaje_Incumplimiento)}</td>` +
+      `<td>${p.Incumplimientos}</td><td>${p.Total_Mediciones}</td></tr>`).join('') + '</table>';
+}
+</script>
+</body>
+</html>
+"""
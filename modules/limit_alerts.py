@@ -0,0 +1,362 @@
+"""
+ALERTAS DE LMP EN STREAMING
+Evalua lecturas de sensores a medida que llegan, en vez de la hoja Datos
+completa. Cada lectura es una linea de texto
+
+    Punto,Variable,Valor,Marca
+
+(Marca en segundos desde epoch o fecha ISO; tambien se acepta una linea JSON
+con esas claves) y puede llegar por stdin, por un archivo que se sigue
+mientras crece o por un socket TCP local. Los limites se precompilan en un
+diccionario (Punto, Variable) -> [(LMP_min, LMP_max, Unidad, TipoSistema)]
+con el sistema de cada punto de la hoja Coordenadas, asi evaluar una lectura
+es una busqueda y dos comparaciones. Cada incumplimiento se emite de
+inmediato como una linea JSON al terminar el bloque leido; las partes fijas
+de esa linea (punto, sistema, variable, LMP, tipo y unidad) tambien se
+precompilan por regla y solo se formatean el valor y las marcas de tiempo.
+
+La latencia de punta a punta de cada lectura (momento de emision menos su
+Marca) se acumula en un histograma logaritmico de tamaño fijo.
+"""
+
+import json
+import math
+import os
+import selectors
+import socket
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from modules.data_loader import RUTA_DATOS, cargar_hojas, cargar_libros
+
+TAMANO_LECTURA = 1 << 16
+ESPERA_ARCHIVO = 0.01
+PUERTO_ALERTAS = 8766
+
+# Histograma de latencias: de 1 us a 1000 s, 20 intervalos por decada
+_BORDES_LATENCIA = np.logspace(-6, 3, 9 * 20 + 1)
+
+
+class HistogramaLatencias:
+    """
+    Conteos por intervalo logaritmico (error relativo de ~12% en los percentiles)
+    """
+
+    def __init__(self):
+        self.conteos = np.zeros(len(_BORDES_LATENCIA) + 1, dtype=np.int64)
+        self.maximo = 0.0
+
+    def agregar(self, latencias):
+        if len(latencias) == 0:
+            return
+        latencias = np.asarray(latencias, dtype=np.float64)
+        self.conteos += np.bincount(np.searchsorted(_BORDES_LATENCIA, latencias),
+                                    minlength=len(self.conteos))
+        self.maximo = max(self.maximo, float(latencias.max()))
+
+    @property
+    def total(self):
+        return int(self.conteos.sum())
+
+    def percentil(self, q):
+        """
+        Borde superior del intervalo que contiene el percentil q (0-100), en segundos
+        """
+        if not self.total:
+            return None
+        posicion = int(np.searchsorted(np.cumsum(self.conteos), math.ceil(q / 100 * self.total)))
+        return float(min(_BORDES_LATENCIA[min(posicion, len(_BORDES_LATENCIA) - 1)], self.maximo))
+
+
+def _compilar_regla(regla, cabecera):
+    """
+    Limites de una regulacion (un limite faltante nunca se incumple) y el
+    resto de la linea JSON de cada tipo de incumplimiento hasta la Marca
+    """
+    unidad = regla.Unidad if regla.Unidad == regla.Unidad else None
+    colas = []
+    for limite, tipo in [(regla.LMP_min, 'Por debajo del minimo'), (regla.LMP_max, 'Por encima del maximo')]:
+        limite = None if limite != limite else float(limite)
+        colas.append(', ' + json.dumps({'LMP': limite, 'Tipo': tipo, 'Unidad': unidad}, ensure_ascii=False)[1:-1]
+                     + ', "Marca": ')
+    minimo = -math.inf if regla.LMP_min != regla.LMP_min else float(regla.LMP_min)
+    maximo = math.inf if regla.LMP_max != regla.LMP_max else float(regla.LMP_max)
+    return minimo, maximo, cabecera, colas[0], colas[1]
+
+
+class MotorAlertas:
+    """
+    Evalua bloques de lecturas contra la tabla de limites precompilada
+    """
+
+    def __init__(self, limites, sistema_punto):
+        """
+        limites: hoja Limites (TipoSistema, Variable, LMP_min, LMP_max, Unidad).
+        sistema_punto: {Punto: TipoSistema}.
+        """
+        reglas_sistema = {}
+        for regla in limites.itertuples(index=False):
+            reglas_sistema.setdefault((regla.TipoSistema, regla.Variable), []).append(regla)
+        # (minimo, maximo, cabecera, cola debajo, cola encima) por regla de cada (punto, variable)
+        self.reglas = {}
+        for punto, sistema in sistema_punto.items():
+            for (sistema_regla, variable), reglas in reglas_sistema.items():
+                if sistema_regla != sistema:
+                    continue
+                cabecera = json.dumps({'Punto': punto, 'TipoSistema': sistema, 'Variable': variable},
+                                      ensure_ascii=False)[:-1] + ', "Valor": '
+                self.reglas[(punto, variable)] = tuple(_compilar_regla(r, cabecera) for r in reglas)
+
+        self.latencias = HistogramaLatencias()
+        self.lecturas = 0
+        self.evaluadas = 0
+        self.sin_limite = 0
+        self.invalidas = 0
+        self.alertas = 0
+        # Tiempo evaluando y emitiendo, sin contar la espera de nuevas lecturas
+        self.segundos_proceso = 0.0
+
+    def procesar(self, texto):
+        """
+        Evalua las lineas completas de texto. Retorna (eventos, marcas): una
+        tupla (cabecera, valor, cola, marca) por incumplimiento (ver
+        formatear_eventos) y la Marca de cada lectura evaluada.
+        """
+        reglas = self.reglas
+        isfinite = math.isfinite
+        eventos = []
+        marcas = []
+        lineas = texto.splitlines()
+        self.lecturas += len(lineas)
+        for linea in lineas:
+            partes = linea.split(',')
+            # Una lectura JSON de cuatro claves tambien se parte en 4 por las comas
+            if len(partes) != 4 or '{' in partes[0]:
+                partes = self._leer_especial(linea)
+                if partes is None:
+                    continue
+            punto, variable, valor, marca = partes
+            regla = reglas.get((punto, variable))
+            if regla is None:
+                # Tambien cae aca el encabezado "Punto,Variable,Valor,Marca"
+                self.sin_limite += 1
+                continue
+            try:
+                v = float(valor)
+                t = float(marca)
+            except (TypeError, ValueError):
+                v, t = self._leer_valores(valor, marca)
+                if v is None:
+                    continue
+            # inf y nan no son JSON valido al emitir la alerta: se cuentan como invalidas
+            if not (isfinite(v) and isfinite(t)):
+                self.invalidas += 1
+                continue
+            marcas.append(t)
+            for minimo, maximo, cabecera, debajo, encima in regla:
+                if v < minimo:
+                    eventos.append((cabecera, v, debajo, t))
+                elif v > maximo:
+                    eventos.append((cabecera, v, encima, t))
+        self.evaluadas += len(marcas)
+        self.alertas += len(eventos)
+        return eventos, marcas
+
+    def _leer_especial(self, linea):
+        """
+        Linea JSON, o None (linea vacia o mal formada)
+        """
+        linea = linea.strip()
+        if linea.startswith('{'):
+            try:
+                lectura = json.loads(linea)
+                return lectura['Punto'], lectura['Variable'], lectura['Valor'], lectura['Marca']
+            except (ValueError, KeyError, TypeError):
+                pass
+        if linea:
+            self.invalidas += 1
+        return None
+
+    def _leer_valores(self, valor, marca):
+        """
+        Valor y Marca cuando no son numeros simples: Marca ISO, o None si es invalida
+        """
+        try:
+            v = float(valor)
+            t = marca if isinstance(marca, (int, float)) else datetime.fromisoformat(marca).timestamp()
+        except (TypeError, ValueError):
+            self.invalidas += 1
+            return None, None
+        return v, t
+
+    def resumen(self):
+        segundos = self.segundos_proceso
+        latencias = {f'p{q:g}': self.latencias.percentil(q) for q in (50, 90, 99, 99.9)}
+        latencias['max'] = self.latencias.maximo if self.latencias.total else None
+        return {
+            'lecturas': self.lecturas, 'evaluadas': self.evaluadas, 'sin_limite': self.sin_limite,
+            'invalidas': self.invalidas, 'alertas': self.alertas, 'segundos_proceso': round(segundos, 3),
+            'lecturas_por_segundo': round(self.lecturas / segundos, 1) if segundos else None,
+            'latencia_ms': {k: None if v is None else round(v * 1000, 3) for k, v in latencias.items()},
+        }
+
+
+def cargar_motor(ruta=RUTA_DATOS, usar_cache=True):
+    """
+    Motor con los limites y el sistema de cada punto (hoja Coordenadas) del
+    libro, o de todos los libros de un directorio o patron glob
+    """
+    hojas = ['Coordenadas', 'Limites']
+    if os.path.isfile(ruta):
+        tablas = cargar_hojas(ruta, hojas, usar_cache=usar_cache)
+    else:
+        tablas = cargar_libros(ruta, hojas, usar_cache=usar_cache)
+    coordenadas = tablas['Coordenadas'].drop_duplicates('Punto')
+    return MotorAlertas(tablas['Limites'], dict(zip(coordenadas['Punto'], coordenadas['TipoSistema'])))
+
+
+def _separar_lineas(pendiente, datos):
+    """
+    (texto con las lineas completas, resto sin salto de linea)
+    """
+    pendiente += datos
+    corte = pendiente.rfind(b'\n') + 1
+    return pendiente[:corte].decode('utf-8', errors='replace'), pendiente[corte:]
+
+
+def bloques_descriptor(descriptor):
+    """
+    Lineas completas de un descriptor (stdin o un pipe) a medida que llegan
+    """
+    pendiente = b''
+    while True:
+        datos = os.read(descriptor, TAMANO_LECTURA)
+        if not datos:
+            break
+        texto, pendiente = _separar_lineas(pendiente, datos)
+        if texto:
+            yield texto
+    if pendiente:
+        yield pendiente.decode('utf-8', errors='replace')
+
+
+def bloques_archivo(ruta, desde_inicio=False, espera=ESPERA_ARCHIVO):
+    """
+    Sigue un archivo como tail -f: entrega las lineas que se le agregan. Si el
+    archivo se trunca (rotacion) se vuelve a leer desde el principio.
+    """
+    with open(ruta, 'rb') as archivo:
+        if not desde_inicio:
+            archivo.seek(0, os.SEEK_END)
+        pendiente = b''
+        while True:
+            datos = archivo.read(TAMANO_LECTURA)
+            if datos:
+                texto, pendiente = _separar_lineas(pendiente, datos)
+                if texto:
+                    yield texto
+                continue
+            if os.stat(ruta).st_size < archivo.tell():
+                archivo.seek(0)
+                pendiente = b''
+            time.sleep(espera)
+
+
+def bloques_socket(host='127.0.0.1', puerto=PUERTO_ALERTAS):
+    """
+    Escucha en un socket TCP local y entrega las lineas completas de cada
+    conexion (varios productores a la vez, en un solo hilo)
+    """
+    selector = selectors.DefaultSelector()
+    servidor = socket.create_server((host, puerto))
+    servidor.setblocking(False)
+    selector.register(servidor, selectors.EVENT_READ)
+    pendientes = {}
+    print(f"Escuchando lecturas en {host}:{servidor.getsockname()[1]}", file=sys.stderr)
+    try:
+        while True:
+            for clave, _eventos in selector.select():
+                if clave.fileobj is servidor:
+                    conexion, _direccion = servidor.accept()
+                    conexion.setblocking(False)
+                    selector.register(conexion, selectors.EVENT_READ)
+                    pendientes[conexion] = b''
+                    continue
+                conexion = clave.fileobj
+                datos = conexion.recv(TAMANO_LECTURA)
+                if not datos:
+                    selector.unregister(conexion)
+                    conexion.close()
+                    resto = pendientes.pop(conexion)
+                    if resto:
+                        yield resto.decode('utf-8', errors='replace')
+                    continue
+                texto, pendientes[conexion] = _separar_lineas(pendientes[conexion], datos)
+                if texto:
+                    yield texto
+    finally:
+        for conexion in pendientes:
+            conexion.close()
+        selector.close()
+        servidor.close()
+
+
+def abrir_fuente(fuente, desde_inicio=False):
+    """
+    '-' = stdin, 'tcp:PUERTO' o 'tcp:HOST:PUERTO' = socket local, otra cosa = archivo a seguir
+    """
+    if fuente == '-':
+        return bloques_descriptor(sys.stdin.fileno())
+    if fuente.startswith('tcp:'):
+        partes = fuente[4:].lstrip('/').rsplit(':', 1)
+        if len(partes) == 1:
+            return bloques_socket(puerto=int(partes[0]))
+        return bloques_socket(partes[0] or '127.0.0.1', int(partes[1]))
+    if not os.path.isfile(fuente):
+        raise FileNotFoundError(f"No existe el archivo de lecturas: {fuente}")
+    return bloques_archivo(fuente, desde_inicio)
+
+
+def formatear_eventos(eventos, ahora):
+    """
+    Lineas JSON con Punto, TipoSistema, Variable, Valor, LMP, Tipo, Unidad,
+    Marca y Latencia_ms (hasta ahora) de cada incumplimiento
+    """
+    return ''.join(f'{cabecera}{valor!r}{cola}{marca!r}, "Latencia_ms": {round((ahora - marca) * 1000, 3)}}}\n'
+                   for cabecera, valor, cola, marca in eventos)
+
+
+def vigilar(motor, bloques, salida=None):
+    """
+    Evalua cada bloque y escribe sus alertas en salida (una linea JSON por
+    incumplimiento) antes de leer el siguiente. Retorna el motor.
+    """
+    salida = salida or sys.stdout
+    for texto in bloques:
+        inicio = time.perf_counter()
+        eventos, marcas = motor.procesar(texto)
+        if eventos:
+            salida.write(formatear_eventos(eventos, time.time()))
+            salida.flush()
+        # La latencia se mide cuando las alertas del bloque ya salieron
+        motor.latencias.agregar(time.time() - np.array(marcas))
+        motor.segundos_proceso += time.perf_counter() - inicio
+    return motor
+
+
+def mostrar_resumen(resumen, archivo=None):
+    archivo = archivo or sys.stderr
+    latencia = resumen['latencia_ms']
+    print("\n--- RESUMEN DE ALERTAS ---", file=archivo)
+    print(f"  - Lecturas: {resumen['lecturas']} ({resumen['evaluadas']} evaluadas, "
+          f"{resumen['sin_limite']} sin limite, {resumen['invalidas']} invalidas)", file=archivo)
+    print(f"  - Alertas: {resumen['alertas']}", file=archivo)
+    if resumen['lecturas_por_segundo']:
+        print(f"  - Rendimiento: {resumen['lecturas_por_segundo']:.0f} lecturas/s "
+              f"({resumen['segundos_proceso']} s de proceso)", file=archivo)
+    if latencia['p50'] is not None:
+        print(f"  - Latencia (ms): p50 {latencia['p50']}  p90 {latencia['p90']}  p99 {latencia['p99']}  "
+              f"p99.9 {latencia['p99.9']}  max {latencia['max']}", file=archivo)
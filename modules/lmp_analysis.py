@@ -0,0 +1,302 @@
+"""
+REQUERIMIENTO iv: EVALUACION DE LIMITES MAXIMOS PERMISIBLES
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from modules.data_loader import VARIABLES_GRUPO
+from modules.dense_index import construir_indice
+from modules.export import exportar_hojas
+from modules.schema import descubrir_esquema
+from modules.visualization import DIRECTORIO_GRAFICAS, agregar_variable, preparar_lmp, renderizar_graficas
+
+RUTA_RESULTADOS_LMP = 'results/resultados_lmp.xlsx'
+
+
+COLUMNAS_INCUMPLIMIENTOS = ['Variable', 'Punto', 'Campaña', 'Valor', 'LMP', 'Tipo', 'Unidad']
+
+
+def indexar_limites(limites, variables=VARIABLES_GRUPO):
+    """
+    Precalcula el indice de limites por (TipoSistema, Variable) para las variables
+    indicadas. La columna Orden conserva la posicion de cada regulacion en la hoja.
+    """
+    indice = limites.loc[limites['Variable'].isin(variables),
+                         ['TipoSistema', 'Variable', 'LMP_min', 'LMP_max', 'Unidad']]
+    indice = indice.assign(Orden=np.arange(len(indice)))
+    return indice.set_index(['TipoSistema', 'Variable'])
+
+
+def marcar_incumplimientos(df, indice_limites):
+    """
+    Busca los limites de cada medicion de df por (TipoSistema, Variable) en el
+    indice y marca los valores por debajo del minimo o por encima del maximo con
+    mascaras vectorizadas. Retorna los incumplimientos con la columna Orden de
+    la regulacion y la etiqueta de indice (Fila) de cada medicion.
+    """
+    variables = [v for v in indice_limites.index.unique('Variable') if v in df.columns]
+    if df.empty or not variables:
+        return None
+
+    # Codigo del sistema de cada fila; el codigo -1 (sistema nulo) cae en la ultima posicion
+    codigos, sistemas = pd.factorize(df['TipoSistema'])
+    puntos = df['Punto'].to_numpy()
+    campanas = df['Campaña'].to_numpy()
+
+    # Regulaciones repetidas para el mismo (TipoSistema, Variable) se evaluan por turnos
+    regulaciones = indice_limites.reset_index()
+    regulaciones['Turno'] = regulaciones.groupby(['TipoSistema', 'Variable']).cumcount()
+
+    partes = []
+    for (variable, _turno), grupo in regulaciones.groupby(['Variable', 'Turno'], sort=False):
+        if variable not in variables:
+            continue
+        # Tablas de busqueda codigo de sistema -> limite (NaN si no hay regulacion)
+        posiciones = sistemas.get_indexer(grupo['TipoSistema'])
+        encontrados = posiciones >= 0
+        tablas = {}
+        for columna, relleno in [('LMP_min', np.nan), ('LMP_max', np.nan), ('Orden', -1)]:
+            tabla = np.full(len(sistemas) + 1, relleno, dtype=float)
+            tabla[posiciones[encontrados]] = grupo[columna].to_numpy(dtype=float)[encontrados]
+            tablas[columna] = tabla[codigos]
+        unidades = np.full(len(sistemas) + 1, None, dtype=object)
+        unidades[posiciones[encontrados]] = grupo['Unidad'].to_numpy()[encontrados]
+
+        valores = df[variable].to_numpy(dtype=float)
+
+        # Las comparaciones con NaN son falsas: ni valores ni limites faltantes cuentan.
+        # Un valor por debajo del minimo no se evalua contra el maximo
+        debajo = valores < tablas['LMP_min']
+        encima = ~debajo & (valores > tablas['LMP_max'])
+        filas = np.flatnonzero(debajo | encima)
+        if len(filas) == 0:
+            continue
+
+        debajo = debajo[filas]
+        partes.append(pd.DataFrame({
+            'Variable': variable,
+            'Punto': puntos[filas],
+            'Campaña': campanas[filas],
+            'Valor': df[variable].to_numpy()[filas],
+            'LMP': np.where(debajo, tablas['LMP_min'][filas], tablas['LMP_max'][filas]),
+            'Tipo': np.where(debajo, 'Por debajo del minimo', 'Por encima del maximo'),
+            'Unidad': unidades[codigos[filas]],
+            'Orden': tablas['Orden'][filas],
+            'Fila': df.index.to_numpy()[filas],
+        }))
+
+    return pd.concat(partes, ignore_index=True) if partes else None
+
+
+def _ordenar_por_regulacion(partes):
+    """
+    Concatena los incumplimientos y los ordena como si se recorriera la hoja de
+    limites y luego las mediciones (orden estable por regulacion)
+    """
+    partes = [p for p in partes if p is not None and not p.empty]
+    if not partes:
+        return pd.DataFrame(columns=COLUMNAS_INCUMPLIMIENTOS)
+
+    incumplimientos = pd.concat(partes, ignore_index=True)
+    orden = np.argsort(incumplimientos['Orden'].to_numpy(), kind='stable')
+    return incumplimientos.iloc[orden][COLUMNAS_INCUMPLIMIENTOS].reset_index(drop=True)
+
+
+def combinar_incumplimientos(partes):
+    """
+    Une incumplimientos marcados por separado (p. ej. por fragmento) en el
+    mismo orden que una sola evaluacion: por regulacion y luego por Fila
+    """
+    partes = [p for p in partes if p is not None and not p.empty]
+    if not partes:
+        return pd.DataFrame(columns=COLUMNAS_INCUMPLIMIENTOS)
+
+    incumplimientos = pd.concat(partes, ignore_index=True)
+    orden = np.lexsort((incumplimientos['Fila'].to_numpy(), incumplimientos['Orden'].to_numpy()))
+    return incumplimientos.iloc[orden][COLUMNAS_INCUMPLIMIENTOS].reset_index(drop=True)
+
+
+def evaluar_incumplimientos(df, indice_limites):
+    """
+    Evalua un DataFrame con columna TipoSistema contra el indice de limites.
+    El costo es lineal en mediciones + regulaciones.
+    Retorna un DataFrame con una fila por incumplimiento.
+    """
+    return _ordenar_por_regulacion([marcar_incumplimientos(df, indice_limites)])
+
+
+def identificar_incumplimientos(datos_organizados, limites, variables=VARIABLES_GRUPO):
+    """
+    Compara cada medicion con los limites de su tipo de sistema.
+    Retorna un DataFrame con una fila por incumplimiento.
+    """
+    indice = indexar_limites(limites, variables)
+    return _ordenar_por_regulacion([marcar_incumplimientos(df, indice)
+                                    for df in datos_organizados.values()])
+
+
+def calcular_porcentajes(datos_organizados, limites, variables=VARIABLES_GRUPO):
+    """
+    Porcentaje de mediciones por encima del primer LMP_max definido para cada
+    variable, sobre todas las mediciones de la variable.
+    """
+    primer_lmp = limites.drop_duplicates('Variable').set_index('Variable')['LMP_max']
+    variables = [v for v in variables if pd.notna(primer_lmp.get(v, np.nan))]
+
+    total_mediciones = pd.Series(0, index=variables)
+    incumplimientos = pd.Series(0, index=variables)
+    for df in datos_organizados.values():
+        valores = df[variables]
+        total_mediciones += valores.notna().sum()
+        incumplimientos += (valores > primer_lmp[variables]).sum()
+    return _tabla_porcentajes(variables, total_mediciones, incumplimientos)
+
+
+def combinar_porcentajes(partes, variables=VARIABLES_GRUPO):
+    """
+    Suma los conteos de varias tablas Porcentajes parciales (p. ej. por
+    fragmento) y recalcula el porcentaje, en el orden de variables
+    """
+    partes = [p.set_index('Variable')[['Total_Mediciones', 'Incumplimientos']] for p in partes]
+    if not partes:
+        return _tabla_porcentajes([], pd.Series(dtype='int64'), pd.Series(dtype='int64'))
+    conteos = pd.concat(partes).groupby(level=0, sort=False).sum()
+    variables = [v for v in variables if v in conteos.index]
+    conteos = conteos.loc[variables]
+    return _tabla_porcentajes(variables, conteos['Total_Mediciones'], conteos['Incumplimientos'])
+
+
+def _tabla_porcentajes(variables, total_mediciones, incumplimientos):
+    porcentajes = pd.DataFrame({
+        'Variable': variables,
+        'Porcentaje_Incumplimiento': (incumplimientos / total_mediciones * 100).round(2).to_numpy(),
+        'Total_Mediciones': total_mediciones.to_numpy(),
+        'Incumplimientos': incumplimientos.to_numpy(),
+    })
+    return porcentajes[porcentajes['Total_Mediciones'] > 0].reset_index(drop=True)
+
+
+def mostrar_incumplimientos(df_incumplimientos, df_porcentajes, datos_organizados):
+    """
+    Muestra los conteos por variable y punto, los porcentajes y los puntos criticos
+    """
+    print("\n  1. Incumplimientos encontrados:")
+    if df_incumplimientos.empty:
+        print("  No se encontraron incumplimientos")
+    else:
+        print(f"  Total de incumplimientos: {len(df_incumplimientos)}")
+        print("\n  Por variable:")
+        for variable, count in df_incumplimientos['Variable'].value_counts(sort=False).items():
+            print(f"    - {variable}: {count} incumplimientos")
+        print("\n  Por punto:")
+        for punto, count in df_incumplimientos['Punto'].value_counts(sort=False).items():
+            print(f"    - {punto}: {count} incumplimientos")
+
+    print("\n  2. Porcentajes de no cumplimiento:")
+    for _index, p in df_porcentajes.iterrows():
+        print(f"    - {p['Variable']}: {p['Porcentaje_Incumplimiento']}% "
+              f"({p['Incumplimientos']}/{p['Total_Mediciones']})")
+
+    print("\n  3. Puntos mas criticos por sistema:")
+    for sistema, df in datos_organizados.items():
+        puntos_sistema = df['Punto'].unique()
+        conteo = df_incumplimientos.loc[df_incumplimientos['Punto'].isin(puntos_sistema), 'Punto']
+        if conteo.empty:
+            print(f"    - {sistema}: Sin incumplimientos")
+            continue
+        conteo = conteo.value_counts(sort=False)
+        print(f"    - {sistema}: {conteo.idxmax()} ({conteo.max()} incumplimientos)")
+
+
+def graficar_limites(datos_organizados, limites, trabajadores=None, incremental=True,
+                     directorio=DIRECTORIO_GRAFICAS, esquema=None):
+    """
+    Genera las graficas de promedio por punto con la linea del LMP maximo
+    para las variables con limites del esquema
+    """
+    esquema = esquema or descubrir_esquema(datos_organizados, limites)
+    variables = esquema.variables_con_limites
+    indice = construir_indice(datos_organizados, variables, esquema) if variables else None
+    trabajos = []
+    for variable in variables:
+        lmp_variable = limites.loc[limites['Variable'] == variable, 'LMP_max']
+        lmp_max = lmp_variable.iloc[0] if not lmp_variable.empty else None
+        agregado = agregar_variable(datos_organizados, variable, esquema, indice)
+        trabajos.append(('lmp', variable, preparar_lmp(datos_organizados, variable, lmp_max, agregado, esquema)))
+    return renderizar_graficas(trabajos, trabajadores, directorio=directorio, incremental=incremental)
+
+
+def exportar_resultados_lmp(df_incumplimientos, df_porcentajes, ruta_salida=RUTA_RESULTADOS_LMP,
+                            formato_tabular=None):
+    """
+    Guarda las hojas Incumplimientos y Porcentajes (solo las que tienen filas).
+    formato_tabular: 'parquet' o 'csv' para escribir tambien una tabla por hoja.
+    """
+    hojas = [(nombre, df) for nombre, df in [('Incumplimientos', df_incumplimientos),
+                                             ('Porcentajes', df_porcentajes)] if not df.empty]
+    for nombre in exportar_hojas(hojas, ruta_salida, formato_tabular):
+        print(f"    - Hoja creada: {nombre}")
+
+
+def evaluar_limites_permitidos(datos_organizados, limites, ruta_salida=RUTA_RESULTADOS_LMP, trabajadores=None,
+                               incremental=True, formato_tabular=None, graficas=True, esquema=None, cache=None,
+                               fragmentos=None):
+    """
+    Evalua el cumplimiento de los limites, genera las graficas con LMP y
+    exporta las hojas Incumplimientos y Porcentajes.
+    trabajadores: procesos para renderizar las graficas (None = todos los nucleos).
+    incremental: solo redibuja las graficas cuyos datos o limites cambiaron.
+    formato_tabular: 'parquet' o 'csv' para exportar tambien tablas por hoja.
+    graficas: False para solo evaluar y exportar, sin cargar matplotlib.
+    esquema: EsquemaDatos con las variables a evaluar (por defecto se descubre).
+    cache: CacheResultados; si los datos y los limites no cambiaron se reutilizan
+    las tablas y el libro ya exportado.
+    fragmentos: 'TipoSistema' o 'Zona' para evaluar cada fragmento en un proceso
+    del pool de trabajadores y reducir los resultados (ver modules.sharding).
+    Retorna (df_incumplimientos, df_porcentajes).
+    """
+    if limites is None or limites.empty:
+        print("No hay limites permisibles para evaluar")
+        return None, None
+
+    esquema = esquema or descubrir_esquema(datos_organizados, limites)
+    variables = esquema.variables_grupo
+
+    def evaluar():
+        if fragmentos:
+            from modules.sharding import analizar_por_fragmentos
+
+            parciales = analizar_por_fragmentos(datos_organizados, limites, variables, fragmentos, trabajadores,
+                                                tareas=('lmp',))
+            return [('Incumplimientos', parciales['incumplimientos']), ('Porcentajes', parciales['porcentajes'])]
+        return [('Incumplimientos', identificar_incumplimientos(datos_organizados, limites, variables)),
+                ('Porcentajes', calcular_porcentajes(datos_organizados, limites, variables))]
+
+    clave = None
+    if cache is None:
+        tablas = evaluar()
+    else:
+        entradas = [df[['TipoSistema', 'Punto', 'Campaña'] + variables] for df in datos_organizados.values()]
+        clave, tablas, acierto = cache.memorizar('lmp', evaluar, entradas + [limites],
+                                                {'variables': variables, 'fragmentos': fragmentos})
+        if acierto:
+            print("\n  Evaluacion tomada de la cache de resultados")
+    (_, df_incumplimientos), (_, df_porcentajes) = tablas
+    mostrar_incumplimientos(df_incumplimientos, df_porcentajes, datos_organizados)
+
+    if graficas:
+        print("\n  4. Generando graficas con limites maximos permisibles...")
+        graficar_limites(datos_organizados, limites, trabajadores, incremental, esquema=esquema)
+
+    print("\n  5. Exportando resultados...")
+    if clave is not None and not formato_tabular and cache.salida_vigente(ruta_salida, clave):
+        print(f"    - Archivo sin cambios: {ruta_salida}")
+    else:
+        exportar_resultados_lmp(df_incumplimientos, df_porcentajes, ruta_salida, formato_tabular)
+        if clave is not None and os.path.exists(ruta_salida):
+            cache.registrar_salida(ruta_salida, clave)
+
+    return df_incumplimientos, df_porcentajes
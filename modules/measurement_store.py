@@ -0,0 +1,248 @@
+"""
+ALMACEN DE MEDICIONES EN DISCO (MEMORY-MAPPED)
+Guarda las columnas de datos_completos (los datos unidos con la descripcion de
+cada punto, ordenados por sistema) como un .npy por columna, mas un indice JSON
+con las categorias de las columnas de texto y las filas de cada sistema y de
+cada punto. Al abrir el almacen cada columna se mapea a memoria (np.load con
+mmap_mode='r'): no se copia nada hasta que una consulta toma sus filas, y solo
+se leen las columnas y paginas que la consulta usa.
+
+El almacen vive en la cache del libro (data/.cache/<libro>-<hash>-mediciones/)
+y se borra junto con ella cuando el libro cambia. El analisis completo lo
+escribe si falta; las consultas (--consultar) y la etapa de graficas
+(plots, tambien con --reporte) lo abren en vez de leer el Excel. Sin filtros
+las columnas numericas quedan como vistas del mapa, sin copiarlas.
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from modules.data_loader import (DIRECTORIO_CACHE, RUTA_DATOS, cargar_hojas, huella_libro, organizar_datos,
+                                 ruta_en_cache)
+from modules.schema import clave_natural
+
+INDICE = 'indice.json'
+ORDEN_PUNTOS = 'orden_puntos.npy'
+
+# Subir al cambiar el formato de los archivos para reconstruir los almacenes guardados
+VERSION_ALMACEN = 1
+
+
+def ruta_almacen(ruta=RUTA_DATOS, directorio_cache=DIRECTORIO_CACHE):
+    """
+    Directorio del almacen del libro en ruta (depende del hash del libro)
+    """
+    return ruta_en_cache(ruta, huella_libro(ruta, directorio_cache), 'mediciones', directorio_cache)
+
+
+def _archivo_columna(i):
+    return f'c{i}.npy'
+
+
+def construir_almacen(datos_completos, directorio):
+    """
+    Escribe el almacen de datos_completos (o de un diccionario {sistema: DataFrame}
+    como el de organizar_datos) en directorio y lo retorna abierto.
+    Las columnas numericas se guardan tal cual; las de texto como codigos int32
+    (-1 = nulo) con sus categorias en el indice.
+    """
+    if isinstance(datos_completos, dict):
+        datos_completos = pd.concat(list(datos_completos.values()), ignore_index=True)
+    datos_completos = datos_completos.sort_values('TipoSistema', kind='stable', ignore_index=True)
+
+    temporal = directorio + '.tmp'
+    shutil.rmtree(temporal, ignore_errors=True)
+    os.makedirs(temporal)
+
+    columnas, categorias, codigos = [], {}, {}
+    for i, columna in enumerate(datos_completos.columns):
+        serie = datos_completos[columna]
+        columnas.append(str(columna))
+        if serie.dtype.kind in 'biuf':
+            valores = serie.to_numpy()
+        else:
+            etiquetas = sorted(serie.dropna().astype(str).unique(), key=clave_natural)
+            valores = pd.Categorical(serie.astype(str).where(serie.notna()), categories=etiquetas).codes
+            valores = valores.astype(np.int32)
+            categorias[str(columna)] = etiquetas
+            codigos[str(columna)] = valores
+        np.save(os.path.join(temporal, _archivo_columna(i)), valores)
+
+    # Filas de cada sistema: un rango contiguo
+    sistemas = {}
+    for codigo, sistema in enumerate(categorias['TipoSistema']):
+        filas = np.flatnonzero(codigos['TipoSistema'] == codigo)
+        if len(filas):
+            sistemas[sistema] = [int(filas[0]), int(filas[-1]) + 1]
+
+    # Filas de cada punto: posiciones ordenadas por punto en ORDEN_PUNTOS
+    orden = np.argsort(codigos['Punto'], kind='stable').astype(np.int64)
+    limites = np.searchsorted(codigos['Punto'][orden], np.arange(len(categorias['Punto']) + 1))
+    np.save(os.path.join(temporal, ORDEN_PUNTOS), orden)
+    puntos = {punto: [int(limites[j]), int(limites[j + 1])] for j, punto in enumerate(categorias['Punto'])}
+
+    indice = {'version': VERSION_ALMACEN, 'filas': len(datos_completos), 'columnas': columnas,
+              'categorias': categorias, 'sistemas': sistemas, 'puntos': puntos}
+    with open(os.path.join(temporal, INDICE), 'w', encoding='utf-8') as archivo:
+        json.dump(indice, archivo, indent=2, ensure_ascii=False)
+
+    shutil.rmtree(directorio, ignore_errors=True)
+    os.replace(temporal, directorio)
+    return AlmacenMediciones(directorio)
+
+
+class AlmacenMediciones:
+    """
+    Vista de solo lectura sobre un almacen en disco; las columnas se mapean al pedirlas
+    """
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        with open(os.path.join(directorio, INDICE), encoding='utf-8') as archivo:
+            indice = json.load(archivo)
+        if indice.get('version') != VERSION_ALMACEN:
+            raise ValueError(f"Version de almacen no soportada en {directorio}: {indice.get('version')}")
+        self.filas = indice['filas']
+        self.columnas = indice['columnas']
+        self.categorias = indice['categorias']
+        self.rangos_sistemas = indice['sistemas']
+        self.rangos_puntos = indice['puntos']
+        self._mapeadas = {}
+
+    @property
+    def puntos(self):
+        return list(self.rangos_puntos)
+
+    @property
+    def sistemas(self):
+        return list(self.rangos_sistemas)
+
+    @property
+    def campanas(self):
+        return list(self.categorias['Campaña'])
+
+    @property
+    def variables(self):
+        """
+        Columnas numericas (las mediciones)
+        """
+        return [c for c in self.columnas if c not in self.categorias]
+
+    def _mapear(self, archivo):
+        if archivo not in self._mapeadas:
+            self._mapeadas[archivo] = np.load(os.path.join(self.directorio, archivo), mmap_mode='r',
+                                              allow_pickle=False)
+        return self._mapeadas[archivo]
+
+    def columna(self, nombre):
+        """
+        Arreglo mapeado de la columna (codigos int32 si es de texto); no copia datos
+        """
+        if nombre not in self.columnas:
+            raise KeyError(f"Columna no encontrada en el almacen: {nombre}")
+        return self._mapear(_archivo_columna(self.columnas.index(nombre)))
+
+    def _codigos(self, columna, valores):
+        etiquetas = self.categorias[columna]
+        faltantes = [v for v in valores if v not in etiquetas]
+        if faltantes:
+            raise KeyError(f"Valores de {columna} no encontrados en el almacen: {faltantes}")
+        return [etiquetas.index(v) for v in valores]
+
+    def seleccionar_filas(self, puntos=None, campanas=None, sistemas=None):
+        """
+        Posiciones (ascendentes) de las filas que cumplen los filtros; None = sin filtro.
+        Los filtros por punto y por sistema usan los rangos del indice, sin recorrer la tabla.
+        """
+        if puntos is not None:
+            orden = self._mapear(ORDEN_PUNTOS)
+            self._codigos('Punto', puntos)
+            filas = np.sort(np.concatenate([orden[slice(*self.rangos_puntos[p])] for p in puntos] or
+                                           [np.empty(0, dtype=np.int64)]))
+        else:
+            filas = np.arange(self.filas)
+        if sistemas is not None:
+            self._codigos('TipoSistema', sistemas)
+            en_sistemas = np.zeros(self.filas, dtype=bool)
+            for sistema in sistemas:
+                en_sistemas[slice(*self.rangos_sistemas.get(sistema, (0, 0)))] = True
+            filas = filas[en_sistemas[filas]]
+        if campanas is not None:
+            codigos = self.columna('Campaña')[filas]
+            filas = filas[np.isin(codigos, self._codigos('Campaña', campanas))]
+        return filas
+
+    def _valores(self, columna, filas):
+        """
+        Valores de la columna en filas (posiciones, o slice(None) para una vista sin copia)
+        """
+        valores = self.columna(columna)[filas]
+        if columna not in self.categorias:
+            return np.asarray(valores)
+        etiquetas = np.asarray(self.categorias[columna] + [''], dtype=str)
+        serie = pd.Series(etiquetas[valores], dtype='str')
+        return serie.where(valores >= 0).to_numpy()
+
+    def consultar(self, variables=None, puntos=None, campanas=None, sistemas=None):
+        """
+        DataFrame con las columnas clave y las variables pedidas (None = todas las
+        columnas) de las filas que cumplen los filtros, en el orden de datos_completos
+        """
+        if puntos is None and campanas is None and sistemas is None:
+            filas = slice(None)
+        else:
+            filas = self.seleccionar_filas(puntos, campanas, sistemas)
+        if variables is None:
+            columnas = self.columnas
+        else:
+            claves = [c for c in ('Zona', 'Punto', 'TipoSistema', 'Campaña') if c in self.columnas]
+            columnas = claves + [v for v in variables if v not in claves]
+        # copy=False: las columnas numericas sin filtros siguen siendo vistas del mapa
+        return pd.DataFrame({c: self._valores(c, filas) for c in columnas}, columns=columnas, copy=False)
+
+    def datos_organizados(self):
+        """
+        Diccionario {tipo_sistema: DataFrame} igual al de organizar_datos
+        """
+        completos = self.consultar()
+        return {sistema: completos.iloc[inicio:fin] for sistema, (inicio, fin) in self.rangos_sistemas.items()}
+
+    def mostrar(self):
+        print("\n--- ALMACEN DE MEDICIONES ---")
+        print(f"  - Directorio: {self.directorio}")
+        print(f"  - Filas: {self.filas}, columnas: {len(self.columnas)} ({len(self.variables)} variables)")
+        print(f"  - Sistemas: {self.sistemas}")
+        print(f"  - Puntos: {len(self.puntos)}, campañas: {len(self.campanas)}")
+
+
+def abrir_almacen(ruta=RUTA_DATOS, datos_organizados=None, directorio_cache=DIRECTORIO_CACHE, construir=True):
+    """
+    Abre el almacen del libro en ruta. Si no existe (o el libro cambio) se
+    construye a partir de datos_organizados o, si no se dan, cargando el libro.
+    Retorna un AlmacenMediciones, o None si no se pudieron cargar los datos
+    (o si no habia un almacen vigente y construir es False).
+    """
+    directorio = ruta_almacen(ruta, directorio_cache)
+    if os.path.exists(os.path.join(directorio, INDICE)):
+        try:
+            return AlmacenMediciones(directorio)
+        except ValueError:
+            pass
+    if not construir:
+        return None
+
+    if datos_organizados is None:
+        try:
+            hojas = cargar_hojas(ruta, ['Datos', 'Coordenadas'], directorio_cache=directorio_cache)
+        except (OSError, ValueError, KeyError) as error:
+            print(f"Error al cargar datos desde {ruta}: {error}")
+            return None
+        datos_organizados = organizar_datos(hojas['Datos'], hojas['Coordenadas'])
+        # La huella pudo cambiar al reconstruir la cache del libro
+        directorio = ruta_almacen(ruta, directorio_cache)
+    os.makedirs(directorio_cache, exist_ok=True)
+    return construir_almacen(datos_organizados, directorio)
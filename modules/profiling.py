@@ -0,0 +1,150 @@
+"""
+INSTRUMENTACION POR ETAPAS
+Mide el tiempo de reloj de cada etapa del analisis y, en modo perfil, la
+memoria pico (tracemalloc) y un cProfile por etapa. El reporte se guarda en
+JSON y los .prof se pueden abrir con pstats o snakeviz.
+
+Las etapas no se anidan (tracemalloc y cProfile son globales al proceso) y
+solo se mide el proceso principal: el trabajo de los procesos del pool de
+graficas aparece como tiempo de espera de la etapa.
+"""
+
+import cProfile
+import functools
+import json
+import os
+import platform
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+DIRECTORIO_PERFIL = 'results/perfil'
+FUNCIONES_POR_ETAPA = 15
+
+
+def _funciones_costosas(perfilador, limite=FUNCIONES_POR_ETAPA):
+    """
+    Las funciones con mas tiempo acumulado de un cProfile, como lista de dicts
+    """
+    estadisticas = pstats.Stats(perfilador)
+    raiz = os.getcwd() + os.sep
+    filas = []
+    for (archivo, linea, funcion), (_, llamadas, propio, acumulado, _) in estadisticas.stats.items():
+        # Rutas del proyecto relativas; las de librerias quedan completas
+        archivo = archivo[len(raiz):] if archivo.startswith(raiz) else archivo
+        filas.append({
+            'funcion': f'{archivo}:{linea}({funcion})',
+            'llamadas': llamadas,
+            'segundos_propios': round(propio, 4),
+            'segundos_acumulados': round(acumulado, 4),
+        })
+    filas.sort(key=lambda fila: fila['segundos_acumulados'], reverse=True)
+    return filas[:limite]
+
+
+class PerfilEjecucion:
+    """
+    Registro de etapas: {nombre: {'segundos', 'memoria_pico_mb', 'perfil', 'funciones'}}
+    """
+
+    def __init__(self, memoria=False, cprofile=False, directorio=DIRECTORIO_PERFIL):
+        self.memoria = memoria
+        self.cprofile = cprofile
+        self.directorio = directorio
+        self.etapas = {}
+
+    @property
+    def activo(self):
+        return self.memoria or self.cprofile
+
+    @contextmanager
+    def etapa(self, nombre):
+        """
+        Mide el bloque como la etapa nombre (si se repite, se acumula el tiempo)
+        """
+        registro = self.etapas.setdefault(nombre, {'segundos': 0.0})
+        iniciado_aqui = False
+        if self.memoria:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                iniciado_aqui = True
+            tracemalloc.reset_peak()
+        perfilador = cProfile.Profile() if self.cprofile else None
+
+        inicio = time.perf_counter()
+        if perfilador is not None:
+            perfilador.enable()
+        try:
+            yield registro
+        finally:
+            if perfilador is not None:
+                perfilador.disable()
+            registro['segundos'] += time.perf_counter() - inicio
+
+            if self.memoria:
+                pico = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+                registro['memoria_pico_mb'] = round(max(pico, registro.get('memoria_pico_mb', 0)), 2)
+                if iniciado_aqui:
+                    tracemalloc.stop()
+            if perfilador is not None:
+                os.makedirs(self.directorio, exist_ok=True)
+                registro['perfil'] = os.path.join(self.directorio, f'{nombre}.prof')
+                perfilador.dump_stats(registro['perfil'])
+                registro['funciones'] = _funciones_costosas(perfilador)
+
+    def medir(self, nombre=None):
+        """
+        Decorador: cada llamada a la funcion se mide como la etapa nombre
+        (por defecto, el nombre de la funcion)
+        """
+        def decorador(funcion):
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                with self.etapa(nombre or funcion.__name__):
+                    return funcion(*args, **kwargs)
+            return envoltura
+        return decorador
+
+    @property
+    def tiempos(self):
+        return {nombre: registro['segundos'] for nombre, registro in self.etapas.items()}
+
+    def reporte(self):
+        """
+        Diccionario serializable con el entorno y el detalle de cada etapa
+        """
+        return {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'comando': sys.argv,
+            'python': platform.python_version(),
+            'memoria': self.memoria,
+            'cprofile': self.cprofile,
+            'total_segundos': round(sum(self.tiempos.values()), 4),
+            'etapas': {nombre: {**registro, 'segundos': round(registro['segundos'], 4)}
+                       for nombre, registro in self.etapas.items()},
+        }
+
+    def guardar(self, ruta=None):
+        """
+        Escribe el reporte JSON (por defecto <directorio>/perfil.json) y retorna la ruta
+        """
+        ruta = ruta or os.path.join(self.directorio, 'perfil.json')
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            json.dump(self.reporte(), archivo, indent=2, ensure_ascii=False)
+        return ruta
+
+    def mostrar(self):
+        """
+        Imprime el tiempo (y la memoria pico, si se midio) de cada etapa
+        """
+        print("\n--- TIEMPOS POR ETAPA ---")
+        for nombre, registro in self.etapas.items():
+            linea = f"  - {nombre}: {registro['segundos']:.3f} s"
+            if 'memoria_pico_mb' in registro:
+                linea += f" (memoria pico {registro['memoria_pico_mb']:.2f} MB)"
+            print(linea)
+        print(f"  - total: {sum(self.tiempos.values()):.3f} s")
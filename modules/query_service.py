@@ -0,0 +1,382 @@
+"""
+SERVICIO LOCAL DE CONSULTAS (HTTP/JSON)
+Carga el libro una sola vez, calcula las tablas de estadisticas y de LMP y
+las deja en memoria ya convertidas a JSON, indexadas por sistema y por punto,
+para responder consultas como "cumplimiento actual de P7" o "estadisticas de
+turbiedad del Rio" sin releer el Excel:
+
+    GET /estado                                  version, ruta y esquema cargados
+    GET /estadisticas?sistema=Rio&variable=Turb_NTU
+    GET /estadisticas?punto=P7
+    GET /limites                                 limites y porcentajes de incumplimiento
+    GET /cumplimiento?punto=P7                   por variable regulada: conteos y ultima campaña
+    GET /incumplimientos?punto=P7&variable=Turb_NTU
+    POST /recargar                               recarga el libro aunque no haya cambiado
+
+Cada consulta lee una instantanea inmutable (ConjuntoConsultas): una recarga
+arma la nueva por completo y luego reemplaza la referencia, asi los clientes
+concurrentes (un hilo por conexion) nunca ven tablas a medio actualizar. Un
+hilo revisa cada INTERVALO_RECARGA segundos la fecha y el tamaño de los
+libros y recarga cuando cambian; la recarga corre en ese mismo hilo.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from modules.data_loader import RUTA_DATOS, cargar_datos, listar_libros, organizar_datos
+from modules.dense_index import construir_indice
+from modules.descriptive_stats import estadisticas_por_grupo
+from modules.lmp_analysis import calcular_porcentajes, identificar_incumplimientos, indexar_limites
+from modules.schema import descubrir_esquema
+
+HOST = '127.0.0.1'
+PUERTO = 8765
+INTERVALO_RECARGA = 1.0
+
+ESTADISTICAS_SERVICIO = ['count', 'min', 'max', 'mean', 'std']
+
+
+def _registros(df):
+    """
+    Filas de df como dicts con tipos de JSON (NaN -> None)
+    """
+    return json.loads(df.to_json(orient='records', force_ascii=False))
+
+
+def _anidar_estadisticas(filas, claves, variables):
+    """
+    Pasa las columnas {variable}_{estadistica} a {variable: {estadistica: valor}}
+    """
+    return [{**{c: fila[c] for c in claves},
+             **{v: {e: fila[f'{v}_{e}'] for e in ESTADISTICAS_SERVICIO} for v in variables}}
+            for fila in filas]
+
+
+def _por_clave(filas, clave):
+    agrupadas = {}
+    for fila in filas:
+        agrupadas.setdefault(fila[clave], []).append(fila)
+    return agrupadas
+
+
+class ConjuntoConsultas:
+    """
+    Datos de un libro con las tablas del servicio precalculadas. No se modifica
+    despues de construirse.
+    """
+
+    def __init__(self, ruta, datos_organizados, limites, version=1):
+        self.ruta = ruta
+        self.version = version
+        self.esquema = descubrir_esquema(datos_organizados, limites)
+        self.variables = self.esquema.variables_grupo
+        partes = [df for df in datos_organizados.values() if not df.empty]
+        datos = pd.concat(partes, ignore_index=True)
+        self.filas = len(datos)
+
+        # Estadisticas por sistema y por punto
+        por_sistema = estadisticas_por_grupo(datos, self.variables, claves=['TipoSistema'],
+                                             estadisticas=ESTADISTICAS_SERVICIO)
+        por_punto = estadisticas_por_grupo(datos, self.variables, estadisticas=ESTADISTICAS_SERVICIO)
+        self._estadisticas_sistema = {f['TipoSistema']: f for f in _anidar_estadisticas(
+            _registros(por_sistema), ['TipoSistema'], self.variables)}
+        self._estadisticas_punto = _anidar_estadisticas(_registros(por_punto), ['TipoSistema', 'Punto'],
+                                                        self.variables)
+        self._estadisticas_por_sistema = _por_clave(self._estadisticas_punto, 'TipoSistema')
+        self._estadisticas_por_punto = _por_clave(self._estadisticas_punto, 'Punto')
+
+        # Tablas de LMP
+        self._limites = []
+        self._porcentajes = []
+        self._incumplimientos = []
+        self._cumplimiento = {}
+        if limites is not None and not limites.empty:
+            incumplimientos = identificar_incumplimientos(datos_organizados, limites, self.variables)
+            self._limites = _registros(limites)
+            self._porcentajes = _registros(calcular_porcentajes(datos_organizados, limites, self.variables))
+            self._incumplimientos = _registros(incumplimientos)
+            self._cumplimiento = self._cumplimiento_por_punto(datos, datos_organizados, limites, incumplimientos)
+        self._incumplimientos_por_punto = _por_clave(self._incumplimientos, 'Punto')
+
+        self.cargado = datetime.now().isoformat(timespec='seconds')
+        # Lectura del libro mas calculo de las tablas (lo fija cargar_conjunto)
+        self.segundos_carga = None
+
+    def _cumplimiento_por_punto(self, datos, datos_organizados, limites, incumplimientos):
+        """
+        Por punto y variable regulada en su sistema: mediciones, incumplimientos
+        y el valor de la ultima campaña medida (del indice punto x campaña)
+        """
+        reglas = indexar_limites(limites, self.variables)
+        reglas = reglas[~reglas.index.duplicated()]
+        # Una medicion cuenta una vez aunque incumpla varias regulaciones
+        fallas = set(zip(incumplimientos['Punto'], incumplimientos['Campaña'], incumplimientos['Variable']))
+        fallas_por_punto = Counter((punto, variable) for punto, _campana, variable in fallas)
+        mediciones = datos.groupby('Punto', sort=False)[self.variables].count()
+        indice = construir_indice(datos_organizados, self.variables, self.esquema)
+
+        cumplimiento = {}
+        for i, punto in enumerate(indice.puntos):
+            sistema = indice.sistemas[i]
+            if not indice.presentes[i]:
+                continue
+            filas = []
+            for k, variable in enumerate(indice.variables):
+                if (sistema, variable) not in reglas.index:
+                    continue
+                regla = reglas.loc[(sistema, variable)]
+                total = int(mediciones.at[punto, variable])
+                fallidas = fallas_por_punto[(punto, variable)]
+                medidas = np.flatnonzero(~np.isnan(indice.valores[i, :, k]))
+                ultima = indice.campanas[medidas[-1]] if len(medidas) else None
+                filas.append({
+                    'Variable': variable,
+                    'LMP_min': None if pd.isna(regla['LMP_min']) else float(regla['LMP_min']),
+                    'LMP_max': None if pd.isna(regla['LMP_max']) else float(regla['LMP_max']),
+                    'Unidad': regla['Unidad'],
+                    'Total_Mediciones': total,
+                    'Incumplimientos': fallidas,
+                    'Porcentaje_Incumplimiento': round(fallidas / total * 100, 2) if total else None,
+                    'Ultima_Campana': ultima,
+                    'Ultimo_Valor': indice.valor(punto, ultima, variable) if ultima is not None else None,
+                    'Cumple': None if ultima is None else (punto, ultima, variable) not in fallas,
+                })
+            cumplimiento[punto] = {'Punto': punto, 'TipoSistema': sistema, 'Variables': filas}
+        return cumplimiento
+
+    def _validar(self, valor, conocidos, nombre):
+        if valor is not None and valor not in conocidos:
+            raise KeyError(f"{nombre} desconocido: {valor}")
+
+    def estado(self):
+        return {'ruta': self.ruta, 'version': self.version, 'cargado': self.cargado,
+                'segundos_carga': self.segundos_carga, 'filas': self.filas,
+                'sistemas': self.esquema.sistemas, 'puntos': self.esquema.puntos,
+                'campanas': self.esquema.campanas, 'variables': self.variables}
+
+    def estadisticas(self, sistema=None, punto=None, variable=None):
+        """
+        Resumen de cada sistema y estadisticas por punto, filtrados
+        """
+        self._validar(sistema, self._estadisticas_sistema, 'Sistema')
+        self._validar(punto, self._estadisticas_por_punto, 'Punto')
+        self._validar(variable, self.variables, 'Variable')
+        if punto is not None:
+            puntos = [f for f in self._estadisticas_por_punto[punto]
+                      if sistema is None or f['TipoSistema'] == sistema]
+        elif sistema is not None:
+            puntos = self._estadisticas_por_sistema[sistema]
+        else:
+            puntos = self._estadisticas_punto
+        sistemas = [self._estadisticas_sistema[s] for s in dict.fromkeys(f['TipoSistema'] for f in puntos)]
+        if variable is not None:
+            claves = ('TipoSistema', 'Punto', variable)
+            sistemas = [{c: f[c] for c in claves if c in f} for f in sistemas]
+            puntos = [{c: f[c] for c in claves} for f in puntos]
+        return {'version': self.version, 'sistemas': sistemas, 'puntos': puntos}
+
+    def limites(self):
+        return {'version': self.version, 'limites': self._limites, 'porcentajes': self._porcentajes}
+
+    def cumplimiento(self, punto=None, sistema=None):
+        self._validar(punto, self._cumplimiento, 'Punto')
+        self._validar(sistema, self._estadisticas_sistema, 'Sistema')
+        puntos = [self._cumplimiento[punto]] if punto is not None else list(self._cumplimiento.values())
+        if sistema is not None:
+            puntos = [p for p in puntos if p['TipoSistema'] == sistema]
+        return {'version': self.version, 'puntos': puntos}
+
+    def incumplimientos(self, punto=None, variable=None, campana=None):
+        self._validar(punto, self._estadisticas_por_punto, 'Punto')
+        self._validar(variable, self.variables, 'Variable')
+        filas = self._incumplimientos_por_punto.get(punto, []) if punto is not None else self._incumplimientos
+        filas = [f for f in filas
+                 if (variable is None or f['Variable'] == variable) and (campana is None or f['Campaña'] == campana)]
+        return {'version': self.version, 'incumplimientos': filas}
+
+
+def huella_origen(ruta):
+    """
+    (ruta, fecha de modificacion, tamaño) de cada libro de ruta: cambia al
+    editar, agregar o quitar un libro
+    """
+    huella = []
+    for libro in listar_libros(ruta):
+        try:
+            estado = os.stat(libro)
+        except OSError:
+            continue
+        huella.append((libro, estado.st_mtime_ns, estado.st_size))
+    return tuple(huella)
+
+
+def cargar_conjunto(ruta=RUTA_DATOS, version=1, trabajadores=None, usar_cache=True):
+    """
+    Carga y organiza los datos de ruta (libro, directorio o patron glob).
+    Retorna un ConjuntoConsultas, o None si no se pudieron cargar.
+    """
+    inicio = time.perf_counter()
+    datos, coordenadas, limites = cargar_datos(ruta, usar_cache, trabajadores)
+    if datos is None:
+        return None
+    datos_organizados = organizar_datos(datos, coordenadas)
+    if not datos_organizados:
+        return None
+    conjunto = ConjuntoConsultas(ruta, datos_organizados, limites, version)
+    conjunto.segundos_carga = round(time.perf_counter() - inicio, 3)
+    return conjunto
+
+
+class ServicioConsultas:
+    """
+    Mantiene el conjunto vigente y lo recarga cuando cambian los libros
+    """
+
+    def __init__(self, ruta=RUTA_DATOS, intervalo=INTERVALO_RECARGA, trabajadores=None, usar_cache=True):
+        self.ruta = ruta
+        self.intervalo = intervalo
+        self.trabajadores = trabajadores
+        self.usar_cache = usar_cache
+        self._huella = huella_origen(ruta)
+        self.conjunto = cargar_conjunto(ruta, trabajadores=trabajadores, usar_cache=usar_cache)
+        if self.conjunto is None:
+            raise ValueError(f"No se pudieron cargar los datos de {ruta}")
+        # Una recarga a la vez (la del vigilante o la pedida con POST /recargar)
+        self._recargando = threading.Lock()
+        self._detener = threading.Event()
+        self._vigilante = None
+
+    def recargar(self, forzar=False):
+        """
+        Recarga si la huella de los libros cambio (o siempre con forzar).
+        Si la carga falla se sigue sirviendo el conjunto anterior y la huella
+        no se actualiza, asi el vigilante lo vuelve a intentar.
+        Retorna True si se reemplazo el conjunto.
+        """
+        with self._recargando:
+            huella = huella_origen(self.ruta)
+            if huella == self._huella and not forzar:
+                return False
+            try:
+                conjunto = cargar_conjunto(self.ruta, self.conjunto.version + 1, self.trabajadores, self.usar_cache)
+            except Exception as error:  # libro a medio escribir, hoja faltante, etc.
+                print(f"Error al recargar {self.ruta}: {error}")
+                return False
+            if conjunto is None:
+                return False
+            self._huella = huella
+            self.conjunto = conjunto
+            print(f"Datos recargados (version {conjunto.version}, {conjunto.segundos_carga:.2f} s)")
+            return True
+
+    def _vigilar(self):
+        while not self._detener.wait(self.intervalo):
+            self.recargar()
+
+    def iniciar_vigilancia(self):
+        self._vigilante = threading.Thread(target=self._vigilar, name='vigilante-libros', daemon=True)
+        self._vigilante.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._vigilante is not None:
+            self._vigilante.join()
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    # HTTP/1.1 mantiene la conexion abierta entre consultas del mismo cliente
+    protocol_version = 'HTTP/1.1'
+    # Sin Nagle: la respuesta no espera el ACK retrasado del cliente (~40 ms)
+    disable_nagle_algorithm = True
+    rutas = {
+        '/estado': ('estado', ()),
+        '/estadisticas': ('estadisticas', ('sistema', 'punto', 'variable')),
+        '/limites': ('limites', ()),
+        '/cumplimiento': ('cumplimiento', ('punto', 'sistema')),
+        '/incumplimientos': ('incumplimientos', ('punto', 'variable', 'campana')),
+    }
+
+    def _responder(self, codigo, cuerpo):
+        contenido = json.dumps(cuerpo, ensure_ascii=False).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(contenido)))
+        self.end_headers()
+        self.wfile.write(contenido)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path not in self.rutas:
+            self._responder(404, {'error': f"Ruta desconocida: {url.path}", 'rutas': list(self.rutas)})
+            return
+        metodo, parametros = self.rutas[url.path]
+        consulta = {clave: valores[-1] for clave, valores in parse_qs(url.query).items()}
+        desconocidos = [clave for clave in consulta if clave not in parametros]
+        if desconocidos:
+            self._responder(400, {'error': f"Parametros no soportados: {desconocidos}",
+                                  'parametros': list(parametros)})
+            return
+        # Una sola lectura de la referencia: toda la respuesta sale de la misma version
+        conjunto = self.server.servicio.conjunto
+        try:
+            cuerpo = getattr(conjunto, metodo)(**consulta)
+        except KeyError as error:
+            self._responder(404, {'error': error.args[0] if error.args else str(error)})
+            return
+        except (ValueError, TypeError) as error:
+            self._responder(400, {'error': str(error)})
+            return
+        except Exception as error:  # la conexion del cliente sigue abierta con un 500 en JSON
+            self._responder(500, {'error': f"{type(error).__name__}: {error}"})
+            return
+        self._responder(200, cuerpo)
+
+    def do_POST(self):
+        if urlsplit(self.path).path != '/recargar':
+            self._responder(404, {'error': f"Ruta desconocida: {self.path}"})
+            return
+        servicio = self.server.servicio
+        recargado = servicio.recargar(forzar=True)
+        self._responder(200, {'recargado': recargado, 'version': servicio.conjunto.version})
+
+    def log_message(self, formato, *args):
+        # Sin una linea por consulta; los errores se imprimen al recargar
+        pass
+
+
+def crear_servidor(servicio, host=HOST, puerto=PUERTO):
+    """
+    Servidor HTTP con un hilo por conexion sobre el servicio (puerto 0 = libre)
+    """
+    servidor = ThreadingHTTPServer((host, puerto), _Manejador)
+    servidor.daemon_threads = True
+    servidor.servicio = servicio
+    return servidor
+
+
+def servir(ruta=RUTA_DATOS, host=HOST, puerto=PUERTO, intervalo=INTERVALO_RECARGA):
+    """
+    Carga los datos y atiende consultas hasta Ctrl+C
+    """
+    servicio = ServicioConsultas(ruta, intervalo)
+    servidor = crear_servidor(servicio, host, puerto)
+    servicio.iniciar_vigilancia()
+    host, puerto = servidor.server_address[:2]
+    print(f"\nServicio de consultas en http://{host}:{puerto} (datos: {ruta}, version {servicio.conjunto.version})")
+    print(f"Rutas: {', '.join(_Manejador.rutas)}, POST /recargar")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\nDeteniendo el servicio...")
+    finally:
+        servicio.detener()
+        servidor.server_close()
@@ -0,0 +1,160 @@
+"""
+CACHE DE RESULTADOS (MEMOIZACION)
+Guarda las tablas que producen las etapas de estadisticas y de evaluacion de
+LMP bajo una clave que es el hash de su entrada: el corte de datos que usa la
+etapa, la tabla de limites y los parametros. Si nada cambio, la etapa retoma
+sus tablas del disco en vez de recalcularlas.
+
+Cada entrada es un .npz comprimido con columnas tipadas (sin pickle). Al usar
+una entrada se actualiza su fecha de modificacion; cuando el directorio supera
+el tamaño maximo se borran primero las usadas hace mas tiempo (LRU).
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from modules.data_loader import DIRECTORIO_CACHE, arreglos_desde_tabla, tabla_desde_arreglos
+
+DIRECTORIO_RESULTADOS = os.path.join(DIRECTORIO_CACHE, 'resultados')
+TAMANO_MAXIMO_MB = 64
+SALIDAS = 'salidas.json'
+
+# Subir al cambiar como se calculan las tablas para invalidar las entradas guardadas
+VERSION_CALCULO = 1
+
+
+def huella_tabla(df):
+    """
+    Hash SHA-256 del contenido de un DataFrame (columnas, tipos y valores, sin indice)
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode('utf-8'))
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+class CacheResultados:
+    """
+    Cache en disco de listas de (nombre_tabla, DataFrame), con conteo de aciertos y fallos
+    """
+
+    def __init__(self, directorio=DIRECTORIO_RESULTADOS, tamano_maximo_mb=TAMANO_MAXIMO_MB):
+        self.directorio = directorio
+        self.tamano_maximo = int(tamano_maximo_mb * 1024 ** 2)
+        self.aciertos = {}
+        self.fallos = {}
+
+    def clave(self, etapa, tablas, parametros=None):
+        """
+        Clave de una etapa: hash de sus tablas de entrada y de sus parametros
+        """
+        h = hashlib.sha256()
+        h.update(json.dumps([etapa, VERSION_CALCULO, parametros], sort_keys=True, default=str).encode('utf-8'))
+        for tabla in tablas:
+            h.update(huella_tabla(tabla).encode('ascii'))
+        return f'{etapa}-{h.hexdigest()[:32]}'
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f'{clave}.npz')
+
+    def obtener(self, clave):
+        """
+        Tablas guardadas bajo clave, o None si no hay entrada
+        """
+        ruta = self._ruta(clave)
+        try:
+            with np.load(ruta, allow_pickle=False) as arreglos:
+                nombres = [str(n) for n in arreglos['nombres']]
+                tablas = [(nombre, tabla_desde_arreglos(arreglos, f't{j}_')) for j, nombre in enumerate(nombres)]
+        except (OSError, KeyError, ValueError):
+            return None
+        # Marca de uso reciente para el LRU
+        os.utime(ruta)
+        return tablas
+
+    def guardar(self, clave, tablas):
+        os.makedirs(self.directorio, exist_ok=True)
+        arreglos = {'nombres': np.array([nombre for nombre, _ in tablas], dtype=str)}
+        for j, (_nombre, df) in enumerate(tablas):
+            arreglos.update(arreglos_desde_tabla(df, f't{j}_'))
+        ruta = self._ruta(clave)
+        temporal = ruta + '.tmp.npz'
+        np.savez_compressed(temporal, **arreglos)
+        os.replace(temporal, ruta)
+        self.desalojar()
+
+    def desalojar(self):
+        """
+        Borra las entradas usadas hace mas tiempo hasta quedar bajo el tamaño maximo
+        """
+        if not os.path.isdir(self.directorio):
+            return []
+        entradas = []
+        for nombre in os.listdir(self.directorio):
+            if nombre.endswith('.npz') and not nombre.endswith('.tmp.npz'):
+                estado = os.stat(os.path.join(self.directorio, nombre))
+                entradas.append((estado.st_mtime_ns, estado.st_size, nombre))
+        entradas.sort()
+
+        total = sum(tamano for _, tamano, _ in entradas)
+        borradas = []
+        for _mtime, tamano, nombre in entradas:
+            if total <= self.tamano_maximo:
+                break
+            os.remove(os.path.join(self.directorio, nombre))
+            total -= tamano
+            borradas.append(nombre)
+        return borradas
+
+    def memorizar(self, etapa, calcular, entradas, parametros=None):
+        """
+        Retorna (clave, tablas, acierto): las tablas guardadas si la entrada ya
+        se vio, si no las que devuelve calcular() (una lista de (nombre_tabla, DataFrame))
+        """
+        clave = self.clave(etapa, entradas, parametros)
+        tablas = self.obtener(clave)
+        if tablas is not None:
+            self.aciertos[etapa] = self.aciertos.get(etapa, 0) + 1
+            return clave, tablas, True
+        self.fallos[etapa] = self.fallos.get(etapa, 0) + 1
+        tablas = calcular()
+        self.guardar(clave, tablas)
+        return clave, tablas, False
+
+    # Las salidas (libros Excel) escritas desde cada clave, para no reescribirlas
+
+    def _leer_salidas(self):
+        ruta = os.path.join(self.directorio, SALIDAS)
+        if not os.path.exists(ruta):
+            return {}
+        with open(ruta, encoding='utf-8') as archivo:
+            return json.load(archivo)
+
+    def salida_vigente(self, ruta, clave):
+        """
+        True si ruta se escribio desde clave y no se modifico despues
+        """
+        registro = self._leer_salidas().get(os.path.abspath(ruta))
+        if registro is None or registro['clave'] != clave or not os.path.exists(ruta):
+            return False
+        estado = os.stat(ruta)
+        return registro['mtime'] == estado.st_mtime_ns and registro['tamano'] == estado.st_size
+
+    def registrar_salida(self, ruta, clave):
+        os.makedirs(self.directorio, exist_ok=True)
+        salidas = self._leer_salidas()
+        estado = os.stat(ruta)
+        salidas[os.path.abspath(ruta)] = {'clave': clave, 'mtime': estado.st_mtime_ns, 'tamano': estado.st_size}
+        ruta_salidas = os.path.join(self.directorio, SALIDAS)
+        with open(ruta_salidas + '.tmp', 'w', encoding='utf-8') as archivo:
+            json.dump(salidas, archivo, indent=2, sort_keys=True)
+        os.replace(ruta_salidas + '.tmp', ruta_salidas)
+
+    def mostrar(self):
+        print("\n--- CACHE DE RESULTADOS ---")
+        for etapa in dict.fromkeys([*self.aciertos, *self.fallos]):
+            print(f"  - {etapa}: {self.aciertos.get(etapa, 0)} aciertos, {self.fallos.get(etapa, 0)} fallos")
@@ -0,0 +1,213 @@
+"""
+ESQUEMA DE LOS DATOS
+Descubre una sola vez, a partir del libro, los sistemas, puntos, campañas,
+variables medidas y sus unidades, y lo combina con la configuracion del
+analisis (variables del grupo, variables clave, variables con LMP y puntos
+clave). Todas las etapas recorren este esquema en vez de listas fijas, asi el
+analisis escala a cualquier cantidad de puntos y campañas sin tocar codigo.
+
+El esquema descubierto se guarda en JSON en la cache del libro y se invalida
+junto con ella cuando el libro cambia. La configuracion se puede cambiar con
+un data/esquema.json opcional, por ejemplo:
+
+    {"variables_grupo": ["Turb_NTU", "pH"], "puntos_clave": ["P2", "P9"]}
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from modules.data_loader import (COLUMNAS_CLAVE, DIRECTORIO_CACHE, HOJAS, RUTA_DATOS, VARIABLES_GRUPO,
+                                 cargar_hojas, huella_libro, ruta_en_cache)
+
+RUTA_CONFIGURACION = 'data/esquema.json'
+
+# Configuracion por defecto del analisis; se cruza con lo que hay en los datos
+CONFIGURACION = {
+    'variables_grupo': VARIABLES_GRUPO,
+    # Variables clave para graficar (3 como minimo)
+    'variables_clave': ['Turb_NTU', 'Coli_fec_NMP100mL', 'Caudal_Ls'],
+    'variables_con_limites': ['Turb_NTU', 'Coli_fec_NMP100mL'],
+    'puntos_clave': ['P3', 'P7', 'P1', 'P8'],
+}
+MAX_PUNTOS_CLAVE = 4
+
+# Unidad por sufijo del nombre de columna, cuando la hoja Limites no la trae
+SUFIJOS_UNIDAD = {
+    '_NTU': 'NTU', '_PtCo': 'Pt-Co', '_NMP100mL': 'NMP/100mL', '_Ls': 'L/s', '_mm_d': 'mm/d',
+    '_mgL': 'mg/L', '_uScm': 'µS/cm', '_C': '°C',
+}
+
+
+def clave_natural(texto):
+    """
+    Clave de orden natural: 'P2' va antes que 'P10'
+    """
+    return [(0, int(parte), '') if parte.isdigit() else (1, 0, parte.lower())
+            for parte in re.split(r'(\d+)', str(texto)) if parte]
+
+
+def _unicos(columnas):
+    valores = pd.unique(np.concatenate([np.asarray(c, dtype=object) for c in columnas]))
+    return [v for v in valores if pd.notna(v)]
+
+
+def _unidad_por_sufijo(variable):
+    for sufijo, unidad in SUFIJOS_UNIDAD.items():
+        if variable.endswith(sufijo):
+            return unidad
+    return ''
+
+
+class EsquemaDatos:
+    """
+    Disposicion de los datos (descubierta) mas la configuracion del analisis
+    """
+
+    def __init__(self, sistemas, puntos, campanas, variables, sistema_punto, unidades, variables_lmp,
+                 configuracion=None):
+        self.sistemas = list(sistemas)
+        self.puntos = list(puntos)
+        self.campanas = list(campanas)
+        self.variables = list(variables)
+        self.sistema_punto = dict(sistema_punto)
+        self.unidades = dict(unidades)
+        # Variables con algun LMP_max en la hoja Limites
+        self.variables_lmp = list(variables_lmp)
+        self.configuracion = {**CONFIGURACION, **(configuracion or {})}
+
+    def _configuradas(self, clave, disponibles):
+        disponibles = set(disponibles)
+        return [v for v in self.configuracion[clave] if v in disponibles]
+
+    @property
+    def variables_grupo(self):
+        return self._configuradas('variables_grupo', self.variables)
+
+    @property
+    def variables_clave(self):
+        return self._configuradas('variables_clave', self.variables)
+
+    @property
+    def variables_con_limites(self):
+        return self._configuradas('variables_con_limites', self.variables_lmp)
+
+    @property
+    def puntos_clave(self):
+        """
+        Puntos clave configurados que existen; si ninguno existe, los primeros puntos
+        """
+        return self._configuradas('puntos_clave', self.puntos) or self.puntos[:MAX_PUNTOS_CLAVE]
+
+    @property
+    def variables_faltantes(self):
+        """
+        Variables configuradas que no estan en los datos
+        """
+        configuradas = dict.fromkeys(self.configuracion['variables_grupo'] + self.configuracion['variables_clave'])
+        return [v for v in configuradas if v not in self.variables]
+
+    def unidad(self, variable):
+        return self.unidades.get(variable, '')
+
+    def a_dict(self):
+        """
+        Parte descubierta del esquema, serializable en JSON (sin la configuracion)
+        """
+        return {'sistemas': self.sistemas, 'puntos': self.puntos, 'campanas': self.campanas,
+                'variables': self.variables, 'sistema_punto': self.sistema_punto,
+                'unidades': self.unidades, 'variables_lmp': self.variables_lmp}
+
+    @classmethod
+    def desde_dict(cls, datos, configuracion=None):
+        return cls(**datos, configuracion=configuracion)
+
+    def mostrar(self):
+        print("\n--- ESQUEMA DE LOS DATOS ---")
+        print(f"  - Sistemas: {self.sistemas}")
+        print(f"  - Puntos: {len(self.puntos)} ({', '.join(self.puntos[:10])}"
+              f"{', ...' if len(self.puntos) > 10 else ''})")
+        print(f"  - Campañas: {self.campanas}")
+        print(f"  - Variables medidas: {len(self.variables)}")
+        if self.variables_faltantes:
+            print(f"  - Variables configuradas sin datos: {self.variables_faltantes}")
+
+
+def descubrir_esquema(datos, limites=None, configuracion=None):
+    """
+    Construye el esquema a partir de la hoja Datos (un DataFrame o un
+    diccionario {tipo_sistema: DataFrame}, como el de organizar_datos)
+    y de la hoja Limites, si se da.
+    """
+    partes = list(datos.values()) if isinstance(datos, dict) else [datos]
+    partes = [df for df in partes if not df.empty] or partes[:1]
+
+    sistemas = sorted(_unicos(df['TipoSistema'] for df in partes), key=clave_natural)
+    puntos = sorted(_unicos(df['Punto'] for df in partes), key=clave_natural)
+    campanas = sorted(_unicos(df['Campaña'] for df in partes), key=clave_natural)
+
+    sistema_punto = {}
+    for df in partes:
+        primeros = df.drop_duplicates('Punto')
+        sistema_punto.update((p, s) for p, s in zip(primeros['Punto'], primeros['TipoSistema'])
+                             if p not in sistema_punto)
+
+    variables = [c for c in partes[0].columns
+                 if c not in COLUMNAS_CLAVE and pd.api.types.is_numeric_dtype(partes[0][c])]
+
+    unidades = {variable: _unidad_por_sufijo(variable) for variable in variables}
+    variables_lmp = []
+    if limites is not None and not limites.empty:
+        for variable, unidad in limites.drop_duplicates('Variable')[['Variable', 'Unidad']].itertuples(index=False):
+            if variable in unidades and pd.notna(unidad):
+                unidades[variable] = str(unidad)
+        con_maximo = set(limites.loc[limites['LMP_max'].notna(), 'Variable'])
+        variables_lmp = [v for v in variables if v in con_maximo]
+
+    return EsquemaDatos(sistemas, puntos, campanas, variables, sistema_punto, unidades, variables_lmp,
+                        configuracion)
+
+
+def leer_configuracion(ruta=RUTA_CONFIGURACION):
+    """
+    Lee la configuracion del analisis (JSON) si el archivo existe; si no, retorna {}
+    """
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding='utf-8') as archivo:
+        configuracion = json.load(archivo)
+    desconocidas = [clave for clave in configuracion if clave not in CONFIGURACION]
+    if desconocidas:
+        raise ValueError(f"Claves de configuracion no reconocidas en {ruta}: {desconocidas}")
+    return configuracion
+
+
+def cargar_esquema(ruta=RUTA_DATOS, hojas=None, directorio_cache=DIRECTORIO_CACHE,
+                   ruta_configuracion=RUTA_CONFIGURACION, usar_cache=True):
+    """
+    Esquema del libro en ruta. Se reutiliza el JSON cacheado mientras el libro
+    no cambie; si hay que descubrirlo se usan las hojas ya cargadas (hojas) o
+    se leen del libro.
+    """
+    configuracion = leer_configuracion(ruta_configuracion)
+    ruta_esquema = None
+    if usar_cache:
+        ruta_esquema = ruta_en_cache(ruta, huella_libro(ruta, directorio_cache), 'esquema.json',
+                                     directorio_cache)
+        if os.path.exists(ruta_esquema):
+            with open(ruta_esquema, encoding='utf-8') as archivo:
+                return EsquemaDatos.desde_dict(json.load(archivo), configuracion)
+
+    if hojas is None:
+        hojas = cargar_hojas(ruta, HOJAS, directorio_cache=directorio_cache, usar_cache=usar_cache)
+    esquema = descubrir_esquema(hojas['Datos'], hojas.get('Limites'), configuracion)
+
+    if ruta_esquema is not None:
+        os.makedirs(os.path.dirname(ruta_esquema), exist_ok=True)
+        with open(ruta_esquema + '.tmp', 'w', encoding='utf-8') as archivo:
+            json.dump(esquema.a_dict(), archivo, indent=2, ensure_ascii=False)
+        os.replace(ruta_esquema + '.tmp', ruta_esquema)
+    return esquema
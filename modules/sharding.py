@@ -0,0 +1,109 @@
+"""
+EJECUCION POR FRAGMENTOS
+Parte los datos organizados por TipoSistema o por Zona y reparte los
+fragmentos en un pool de procesos. Cada trabajador calcula, para su
+fragmento, los momentos de las estadisticas por punto (AcumuladorEstadisticas)
+y los incumplimientos y conteos de Porcentajes. El proceso principal reduce
+los resultados parciales: combina los momentos (formula de Chan), suma los
+conteos de Porcentajes y une los incumplimientos en el orden de la
+evaluacion en un solo proceso, asi el resultado es el mismo.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from modules.data_loader import VARIABLES_GRUPO
+from modules.lmp_analysis import (calcular_porcentajes, combinar_incumplimientos, combinar_porcentajes,
+                                  indexar_limites, marcar_incumplimientos)
+from modules.stats_accumulator import AcumuladorEstadisticas
+
+FRAGMENTACIONES = ('TipoSistema', 'Zona')
+TAREAS = ('estadisticas', 'lmp')
+
+
+def fragmentar(datos_organizados, por='TipoSistema'):
+    """
+    Retorna una lista de (nombre, DataFrame), un fragmento por sistema o por zona.
+    Los fragmentos conservan el indice de datos_organizados.
+    """
+    if por not in FRAGMENTACIONES:
+        raise ValueError(f"Fragmentacion no soportada: {por} (opciones: {', '.join(FRAGMENTACIONES)})")
+    if por == 'TipoSistema':
+        return [(sistema, df) for sistema, df in datos_organizados.items() if not df.empty]
+
+    todos = pd.concat(list(datos_organizados.values()))
+    if 'Zona' not in todos.columns:
+        raise ValueError("Fragmentar por Zona requiere datos de varios libros (columna Zona)")
+    return [(zona, df) for zona, df in todos.groupby('Zona', sort=False)]
+
+
+def _procesar_fragmento(trabajo):
+    """
+    Resultados parciales de un fragmento; se ejecuta en el trabajador
+    """
+    nombre, df, variables, limites, tareas = trabajo
+    parcial = {'nombre': nombre}
+    if 'estadisticas' in tareas:
+        parcial['estadisticas'] = AcumuladorEstadisticas(variables).actualizar(df)
+    if 'lmp' in tareas:
+        parcial['incumplimientos'] = marcar_incumplimientos(df, indexar_limites(limites, variables))
+        parcial['porcentajes'] = calcular_porcentajes({nombre: df}, limites, variables)
+    return parcial
+
+
+def _reducir_estadisticas(parciales, sistemas, variables):
+    """
+    Combina los momentos de todos los fragmentos y arma una hoja {sistema}_Puntos
+    por sistema, con el formato de construir_tablas_estadisticas
+    """
+    acumulado = AcumuladorEstadisticas(variables)
+    for parcial in parciales:
+        acumulado.combinar(parcial['estadisticas'])
+    tabla = acumulado.resultado()
+
+    hojas = []
+    for sistema in sistemas:
+        df = tabla[tabla['TipoSistema'] == sistema].drop(columns='TipoSistema').reset_index(drop=True)
+        if not df.empty:
+            hojas.append((f'{sistema}_Puntos', df))
+    return hojas
+
+
+def analizar_por_fragmentos(datos_organizados, limites=None, variables=VARIABLES_GRUPO, por='TipoSistema',
+                            trabajadores=None, tareas=TAREAS):
+    """
+    Calcula por fragmentos las estadisticas por punto y/o la evaluacion de LMP.
+    trabajadores: procesos del pool (None = todos los nucleos, 1 = en serie).
+    tareas: 'estadisticas' y/o 'lmp' (esta requiere limites).
+    Retorna un diccionario con 'estadisticas' (lista de ({sistema}_Puntos, DataFrame)),
+    'incumplimientos' y 'porcentajes', segun las tareas pedidas.
+    """
+    desconocidas = [t for t in tareas if t not in TAREAS]
+    if desconocidas:
+        raise ValueError(f"Tareas no soportadas: {desconocidas}")
+    if 'lmp' in tareas and (limites is None or limites.empty):
+        raise ValueError("La evaluacion de LMP por fragmentos requiere la tabla de limites")
+
+    variables = list(variables)
+    trabajos = [(nombre, df, variables, limites, tuple(tareas))
+                for nombre, df in fragmentar(datos_organizados, por)]
+
+    if trabajadores is None:
+        trabajadores = os.cpu_count() or 1
+    trabajadores = min(trabajadores, len(trabajos))
+    if trabajadores <= 1:
+        parciales = [_procesar_fragmento(trabajo) for trabajo in trabajos]
+    else:
+        with ProcessPoolExecutor(max_workers=trabajadores) as pool:
+            parciales = list(pool.map(_procesar_fragmento, trabajos))
+    print(f"  - {len(parciales)} fragmentos por {por} procesados con {max(trabajadores, 1)} trabajadores")
+
+    resultado = {}
+    if 'estadisticas' in tareas:
+        resultado['estadisticas'] = _reducir_estadisticas(parciales, list(datos_organizados), variables)
+    if 'lmp' in tareas:
+        resultado['incumplimientos'] = combinar_incumplimientos([p['incumplimientos'] for p in parciales])
+        resultado['porcentajes'] = combinar_porcentajes([p['porcentajes'] for p in parciales], variables)
+    return resultado
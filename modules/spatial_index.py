@@ -0,0 +1,281 @@
+"""
+INDICE ESPACIAL DE ESTACIONES
+Indice de grilla uniforme sobre las coordenadas (X_UTM, Y_UTM) de la hoja
+Coordenadas: cada estacion cae en una celda y las estaciones quedan
+ordenadas por celda (formato CSR: inicio de cada celda en un arreglo de
+posiciones). Responde, para muchas consultas a la vez:
+
+  - cercanas: las k estaciones mas cercanas. Las consultas de una misma
+    celda comparten las candidatas de las celdas a distancia r y se resuelven
+    con una matriz de distancias y argpartition. Si la k-esima candidata no
+    esta mas lejos que los lados del bloque el resultado es exacto (cualquier
+    estacion fuera del bloque esta mas lejos); si no, se repite con 2r solo
+    para esas consultas.
+  - en_radio: las estaciones a menos de un radio.
+  - interpolar_idw: superficie por distancia inversa (IDW) con las k
+    estaciones mas cercanas de cada nodo de una grilla.
+
+Todo es NumPy (sin scipy); las consultas se procesan por bloques para acotar
+la memoria con grillas de alta resolucion.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from modules.visualization import DIRECTORIO_GRAFICAS, DPI
+
+# Estaciones por celda buscadas al elegir el tamaño de la celda
+ESTACIONES_POR_CELDA = 2
+# Consultas por bloque en cercanas (acota los pares consulta-estacion en memoria)
+CONSULTAS_POR_BLOQUE = 65_536
+VECINOS_IDW = 8
+POTENCIA_IDW = 2
+RESOLUCION = 200
+
+
+class IndiceEspacial:
+    """
+    Grilla uniforme de estaciones; puntos, x, y son arreglos del mismo largo
+    """
+
+    def __init__(self, puntos, x, y, tamano_celda=None):
+        self.puntos = np.asarray(puntos, dtype=object)
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        if len(self.x) == 0:
+            raise ValueError("El indice espacial necesita al menos una estacion")
+        if np.isnan(self.x).any() or np.isnan(self.y).any():
+            raise ValueError("Hay estaciones sin coordenadas")
+
+        self.x_min, self.y_min = self.x.min(), self.y.min()
+        ancho = max(self.x.max() - self.x_min, self.y.max() - self.y_min)
+        if tamano_celda is None:
+            # Celdas cuadradas con unas ESTACIONES_POR_CELDA estaciones en promedio
+            area = max((self.x.max() - self.x_min) * (self.y.max() - self.y_min), ancho ** 2 / len(self.x))
+            tamano_celda = np.sqrt(area * ESTACIONES_POR_CELDA / len(self.x))
+        self.celda = float(tamano_celda) if tamano_celda > 0 else 1.0
+        self.nx = int((self.x.max() - self.x_min) // self.celda) + 1
+        self.ny = int((self.y.max() - self.y_min) // self.celda) + 1
+
+        ix, iy = self._celdas(self.x, self.y)
+        celdas = iy * self.nx + ix
+        self.orden = np.argsort(celdas, kind='stable')
+        self.inicios = np.searchsorted(celdas[self.orden], np.arange(self.nx * self.ny + 1))
+
+    @classmethod
+    def desde_coordenadas(cls, coordenadas, tamano_celda=None):
+        """
+        Indice de la hoja Coordenadas (columnas Punto, X_UTM, Y_UTM)
+        """
+        validas = coordenadas.dropna(subset=['X_UTM', 'Y_UTM']).drop_duplicates('Punto')
+        return cls(validas['Punto'].to_numpy(), validas['X_UTM'].to_numpy(), validas['Y_UTM'].to_numpy(),
+                   tamano_celda)
+
+    def __len__(self):
+        return len(self.x)
+
+    def _celdas(self, x, y):
+        """
+        Celda (ix, iy) de cada coordenada, sin recortar a la grilla
+        """
+        return (np.floor((x - self.x_min) / self.celda).astype(np.int64),
+                np.floor((y - self.y_min) / self.celda).astype(np.int64))
+
+    def _estaciones_bloque(self, cx, cy, r):
+        """
+        Estaciones de las celdas a distancia <= r (Chebyshev) de la celda (cx, cy),
+        recortado a la grilla. En cada fila de celdas son un solo tramo del orden CSR.
+        """
+        cx0, cx1 = max(cx - r, 0), min(cx + r, self.nx - 1)
+        tramos = [self.orden[self.inicios[fila * self.nx + cx0]:self.inicios[fila * self.nx + cx1 + 1]]
+                  for fila in range(max(cy - r, 0), min(cy + r, self.ny - 1) + 1)]
+        return np.concatenate(tramos) if tramos else np.empty(0, dtype=np.int64)
+
+    def _cota_fuera_del_bloque(self, x, y, ix, iy, r):
+        """
+        Distancia minima de cada consulta a una estacion fuera del bloque de radio r:
+        la distancia a los lados del bloque que no coinciden con el borde de la grilla
+        """
+        cota = np.full(len(x), np.inf)
+        lados = [(ix - r > 0, x - (self.x_min + (ix - r) * self.celda)),
+                 (ix + r < self.nx - 1, self.x_min + (ix + r + 1) * self.celda - x),
+                 (iy - r > 0, y - (self.y_min + (iy - r) * self.celda)),
+                 (iy + r < self.ny - 1, self.y_min + (iy + r + 1) * self.celda - y)]
+        for hay_estaciones_fuera, distancia in lados:
+            cota = np.where(hay_estaciones_fuera, np.minimum(cota, distancia), cota)
+        return cota
+
+    def _cercanas_bloque(self, x, y, k):
+        n = len(x)
+        distancias = np.full((n, k), np.inf)
+        indices = np.full((n, k), -1, dtype=np.int64)
+        # Las consultas fuera de la grilla buscan desde la celda mas proxima del borde
+        ix = np.clip(self._celdas(x, y)[0], 0, self.nx - 1)
+        iy = np.clip(self._celdas(x, y)[1], 0, self.ny - 1)
+        celdas = iy * self.nx + ix
+        pendientes = np.arange(n)
+        r = 1
+        while len(pendientes):
+            # Las consultas de una misma celda comparten candidatas: una matriz de distancias por celda
+            pendientes = pendientes[np.argsort(celdas[pendientes], kind='stable')]
+            unicas, inicios = np.unique(celdas[pendientes], return_index=True)
+            for celda, desde, hasta in zip(unicas.tolist(), inicios.tolist(), [*inicios[1:].tolist(), len(pendientes)]):
+                consultas = pendientes[desde:hasta]
+                candidatas = self._estaciones_bloque(celda % self.nx, celda // self.nx, r)
+                if len(candidatas) == 0:
+                    continue
+                d = np.hypot(x[consultas, None] - self.x[candidatas], y[consultas, None] - self.y[candidatas])
+                tomar = min(k, len(candidatas))
+                filas = np.arange(len(consultas))[:, None]
+                if len(candidatas) > 4 * tomar:
+                    # Con muchas candidatas se preseleccionan las k mas cercanas sin ordenar todo
+                    cerca = np.argpartition(d, tomar - 1, axis=1)[:, :tomar]
+                    orden = cerca[filas, np.argsort(d[filas, cerca], axis=1, kind='stable')]
+                else:
+                    orden = np.argsort(d, axis=1, kind='stable')[:, :tomar]
+                distancias[consultas, :tomar] = d[filas, orden]
+                indices[consultas, :tomar] = candidatas[orden]
+
+            # Exacta si la k-esima candidata (o la ultima, con menos de k estaciones)
+            # no esta mas lejos que cualquier estacion fuera del bloque
+            kesima = distancias[pendientes, min(k, len(self)) - 1]
+            cota = self._cota_fuera_del_bloque(x[pendientes], y[pendientes], ix[pendientes], iy[pendientes], r)
+            pendientes = pendientes[kesima > cota]
+            r *= 2
+        return distancias, indices
+
+    def cercanas(self, x, y, k=1):
+        """
+        Las k estaciones mas cercanas a cada consulta (x, y pueden ser escalares o arreglos).
+        Retorna (distancias, indices) de forma (consultas, k), ordenadas de la mas
+        cercana a la mas lejana; con menos de k estaciones sobran inf y -1.
+        """
+        x = np.atleast_1d(np.asarray(x, dtype=np.float64)).ravel()
+        y = np.atleast_1d(np.asarray(y, dtype=np.float64)).ravel()
+        distancias = np.empty((len(x), k))
+        indices = np.empty((len(x), k), dtype=np.int64)
+        for inicio in range(0, len(x), CONSULTAS_POR_BLOQUE):
+            bloque = slice(inicio, inicio + CONSULTAS_POR_BLOQUE)
+            distancias[bloque], indices[bloque] = self._cercanas_bloque(x[bloque], y[bloque], k)
+        return distancias, indices
+
+    def en_radio(self, x, y, radio):
+        """
+        Estaciones a distancia <= radio de (x, y), de la mas cercana a la mas lejana.
+        Retorna un DataFrame con Punto, X_UTM, Y_UTM y Distancia.
+        """
+        ix, iy = self._celdas(np.array([float(x)]), np.array([float(y)]))
+        # Con la celda recortada a la grilla el bloque sigue cubriendo el circulo
+        cx, cy = int(np.clip(ix[0], 0, self.nx - 1)), int(np.clip(iy[0], 0, self.ny - 1))
+        estaciones = self._estaciones_bloque(cx, cy, int(np.ceil(radio / self.celda)))
+        d = np.hypot(self.x[estaciones] - x, self.y[estaciones] - y)
+        dentro = d <= radio
+        estaciones, d = estaciones[dentro], d[dentro]
+        orden = np.argsort(d, kind='stable')
+        return pd.DataFrame({'Punto': self.puntos[estaciones[orden]], 'X_UTM': self.x[estaciones[orden]],
+                             'Y_UTM': self.y[estaciones[orden]], 'Distancia': d[orden]})
+
+    def mas_cercanas(self, x, y, k=1):
+        """
+        DataFrame con las k estaciones mas cercanas a un punto (x, y)
+        """
+        distancias, indices = self.cercanas(x, y, k)
+        validas = indices[0] >= 0
+        estaciones = indices[0][validas]
+        return pd.DataFrame({'Punto': self.puntos[estaciones], 'X_UTM': self.x[estaciones],
+                             'Y_UTM': self.y[estaciones], 'Distancia': distancias[0][validas]})
+
+
+def interpolar_idw(indice, valores, x, y, k=VECINOS_IDW, potencia=POTENCIA_IDW):
+    """
+    Interpolacion por distancia inversa en las consultas (x, y) con las k
+    estaciones mas cercanas del indice; valores tiene un valor por estacion
+    del indice (sin nulos). En una estacion el valor es el de la estacion.
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    k = min(k, len(indice))
+    distancias, indices = indice.cercanas(x, y, k)
+    with np.errstate(divide='ignore'):
+        pesos = 1 / distancias ** potencia
+    exactas = distancias[:, 0] == 0
+    pesos[exactas] = 0
+    pesos[exactas, 0] = 1
+    return (pesos * valores[indices]).sum(axis=1) / pesos.sum(axis=1)
+
+
+def grilla(indice, resolucion=RESOLUCION, margen=0.05):
+    """
+    Ejes (xs, ys) de una grilla que cubre las estaciones con un margen relativo,
+    con resolucion nodos en el lado mas largo y nodos cuadrados
+    """
+    x_min, x_max = indice.x.min(), indice.x.max()
+    y_min, y_max = indice.y.min(), indice.y.max()
+    extra = margen * max(x_max - x_min, y_max - y_min, 1.0)
+    ancho, alto = x_max - x_min + 2 * extra, y_max - y_min + 2 * extra
+    paso = max(ancho, alto) / (resolucion - 1)
+    return (np.linspace(x_min - extra, x_max + extra, max(2, round(ancho / paso) + 1)),
+            np.linspace(y_min - extra, y_max + extra, max(2, round(alto / paso) + 1)))
+
+
+def superficie_idw(datos_organizados, coordenadas, variable, resolucion=RESOLUCION, k=VECINOS_IDW,
+                   potencia=POTENCIA_IDW):
+    """
+    Superficie IDW de la media por punto de una variable (resolucion: nodos en el lado mas largo).
+    Retorna (xs, ys, superficie de forma (len(ys), len(xs)), indice de las estaciones con dato).
+    """
+    medias = pd.concat([df[['Punto', variable]] for df in datos_organizados.values()])
+    medias = medias.groupby('Punto', sort=False)[variable].mean().dropna()
+    con_dato = coordenadas.dropna(subset=['X_UTM', 'Y_UTM']).drop_duplicates('Punto')
+    con_dato = con_dato[con_dato['Punto'].isin(medias.index)]
+    if con_dato.empty:
+        raise ValueError(f"Ninguna estacion con coordenadas tiene datos de {variable}")
+
+    indice = IndiceEspacial.desde_coordenadas(con_dato)
+    xs, ys = grilla(indice, resolucion)
+    malla_x, malla_y = np.meshgrid(xs, ys)
+    valores = medias.loc[indice.puntos].to_numpy()
+    superficie = interpolar_idw(indice, valores, malla_x, malla_y, k, potencia).reshape(malla_x.shape)
+    return xs, ys, superficie, indice
+
+
+def generar_superficies(datos_organizados, coordenadas, variables, directorio=DIRECTORIO_GRAFICAS,
+                        resolucion=RESOLUCION):
+    """
+    Guarda un mapa IDW por variable (idw_<variable>.png) con las estaciones encima.
+    Retorna la lista de archivos generados.
+    """
+    # Figure sin pyplot, como en modules.visualization: no cambia el backend del proceso
+    from matplotlib.figure import Figure
+    from mpl_toolkits.axes_grid1 import make_axes_locatable
+
+    os.makedirs(directorio, exist_ok=True)
+    archivos = []
+    for variable in variables:
+        try:
+            xs, ys, superficie, indice = superficie_idw(datos_organizados, coordenadas, variable, resolucion)
+        except ValueError as error:
+            print(f"  - {variable}: {error}")
+            continue
+        alto = min(10, max(3, 10 * len(ys) / len(xs)))
+        figura = Figure(figsize=(11, alto + 1.5))
+        ax = figura.subplots()
+        imagen = ax.imshow(superficie, origin='lower', extent=(xs[0], xs[-1], ys[0], ys[-1]),
+                           cmap='viridis', aspect='equal')
+        ax.scatter(indice.x, indice.y, c='white', edgecolors='black', s=30)
+        if len(indice) <= 50:
+            for punto, x, y in zip(indice.puntos, indice.x, indice.y):
+                ax.annotate(punto, (x, y), textcoords='offset points', xytext=(4, 4), fontsize=8)
+        # Barra de color del alto del mapa
+        figura.colorbar(imagen, cax=make_axes_locatable(ax).append_axes('right', size='3%', pad=0.1),
+                        label=variable)
+        ax.ticklabel_format(useOffset=False, style='plain')
+        ax.set_title(f'Interpolacion IDW - {variable} (media por punto)')
+        ax.set_xlabel('X_UTM')
+        ax.set_ylabel('Y_UTM')
+        ruta = os.path.join(directorio, f'idw_{variable}.png')
+        figura.savefig(ruta, dpi=DPI // 2, bbox_inches='tight')
+        archivos.append(ruta)
+        print(f"  - {variable}: {ruta}")
+    return archivos
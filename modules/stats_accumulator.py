@@ -0,0 +1,280 @@
+"""
+ACUMULADOR DE ESTADISTICAS EN UNA PASADA
+Mantiene count, media, M2 (suma de cuadrados de desviaciones), min y max por
+(TipoSistema, Punto, variable). Cada bloque se resume con una agrupacion y se
+combina con el estado usando la formula de Welford/Chan para momentos, asi la
+memoria depende del numero de puntos y no del numero de filas leidas.
+
+Los percentiles aproximados salen de un bosquejo de cubetas logaritmicas
+(estilo DDSketch): cada valor cae en la cubeta gamma^i con error relativo
+PRECISION_BOSQUEJO, y dos bosquejos se combinan sumando conteos por cubeta.
+El estado completo se puede guardar en .npz y actualizar con campañas nuevas;
+guarda tambien las claves (TipoSistema, Punto, Campaña) ya incorporadas para
+no sumar dos veces las filas de un libro que se vuelve a leer con una campaña
+agregada al final.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from modules.data_loader import VARIABLES_GRUPO
+
+MOMENTOS = ['n', 'media', 'm2', 'minimo', 'maximo']
+CLAVES_FILA = ['TipoSistema', 'Punto', 'Campaña']
+PRECISION_BOSQUEJO = 0.01
+
+
+def _momentos_bloque(bloque, variables, claves):
+    """
+    Resume un bloque de filas en momentos por clave: {momento: DataFrame claves x variables}
+    """
+    agrupado = bloque.groupby(list(claves), sort=False, observed=True)[list(variables)]
+    n = agrupado.count()
+    return {
+        'n': n.astype(float),
+        'media': agrupado.mean(),
+        'm2': agrupado.var(ddof=0) * n,
+        'minimo': agrupado.min(),
+        'maximo': agrupado.max(),
+    }
+
+
+def claves_fila(bloque):
+    """
+    MultiIndex (TipoSistema, Punto, Campaña) de cada fila, como texto
+    """
+    return pd.MultiIndex.from_arrays([bloque[c].astype(str) for c in CLAVES_FILA], names=CLAVES_FILA)
+
+
+def combinar_momentos(a, b):
+    """
+    Combina dos conjuntos de momentos (formula paralela de Chan et al.).
+    Las claves nuevas de b se agregan al final, conservando el orden de aparicion.
+    """
+    if a is None:
+        return b
+    if b is None:
+        return a
+
+    indice = a['n'].index.append(b['n'].index.difference(a['n'].index, sort=False))
+    a = {m: t.reindex(indice) for m, t in a.items()}
+    b = {m: t.reindex(indice) for m, t in b.items()}
+
+    n_a = a['n'].fillna(0).to_numpy()
+    n_b = b['n'].fillna(0).to_numpy()
+    media_a = np.nan_to_num(a['media'].to_numpy())
+    media_b = np.nan_to_num(b['media'].to_numpy())
+    m2_a = np.nan_to_num(a['m2'].to_numpy())
+    m2_b = np.nan_to_num(b['m2'].to_numpy())
+
+    n = n_a + n_b
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = media_b - media_a
+        media = np.where(n > 0, media_a + delta * n_b / n, np.nan)
+        m2 = np.where(n > 0, m2_a + m2_b + delta ** 2 * n_a * n_b / n, np.nan)
+
+    columnas = a['n'].columns
+    return {
+        'n': pd.DataFrame(n, index=indice, columns=columnas),
+        'media': pd.DataFrame(media, index=indice, columns=columnas),
+        'm2': pd.DataFrame(m2, index=indice, columns=columnas),
+        'minimo': pd.DataFrame(np.fmin(a['minimo'].to_numpy(dtype=float), b['minimo'].to_numpy(dtype=float)),
+                               index=indice, columns=columnas),
+        'maximo': pd.DataFrame(np.fmax(a['maximo'].to_numpy(dtype=float), b['maximo'].to_numpy(dtype=float)),
+                               index=indice, columns=columnas),
+    }
+
+
+def _cubetas(valores, precision):
+    """
+    Valor representativo de la cubeta logaritmica de cada valor (0 para ceros).
+    El signo se conserva, asi el orden de las cubetas es el orden de los valores.
+    """
+    gamma = (1 + precision) / (1 - precision)
+    absolutos = np.abs(valores)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        indice = np.ceil(np.log(absolutos) / np.log(gamma))
+        representante = 2 * np.power(gamma, indice) / (gamma + 1)
+    return np.where(absolutos > 0, np.sign(valores) * representante, 0.0)
+
+
+def _bosquejo_bloque(bloque, variables, claves, precision):
+    """
+    Conteos por (claves, Variable, Cubeta) de los valores no nulos del bloque
+    """
+    largo = bloque.melt(id_vars=list(claves), value_vars=list(variables),
+                        var_name='Variable', value_name='Valor').dropna(subset=['Valor'])
+    largo['Cubeta'] = _cubetas(largo['Valor'].to_numpy(dtype=float), precision)
+    return largo.groupby(list(claves) + ['Variable', 'Cubeta'], sort=False).size()
+
+
+def cuantiles_bosquejo(bosquejo, claves, cuantiles):
+    """
+    Cuantiles aproximados (0-1) por (claves, Variable) a partir de los conteos por cubeta.
+    Retorna {cuantil: DataFrame claves x variables}.
+    """
+    grupo = list(claves) + ['Variable']
+    tabla = bosquejo.rename('Conteo').reset_index().sort_values(grupo + ['Cubeta'], kind='stable')
+    acumulado = tabla.groupby(grupo, sort=False)['Conteo'].cumsum().to_numpy()
+    total = tabla.groupby(grupo, sort=False)['Conteo'].transform('sum').to_numpy()
+
+    resultado = {}
+    for cuantil in cuantiles:
+        # Primera cubeta cuyo conteo acumulado supera el rango q * (n - 1)
+        alcanzadas = tabla.loc[acumulado > cuantil * (total - 1)]
+        primeras = alcanzadas.drop_duplicates(grupo)
+        resultado[cuantil] = primeras.pivot_table(index=list(claves), columns='Variable',
+                                                  values='Cubeta', aggfunc='first', sort=False)
+    return resultado
+
+
+class AcumuladorEstadisticas:
+    """
+    Estado de una pasada por (claves, variable); se actualiza bloque a bloque
+    """
+
+    def __init__(self, variables=VARIABLES_GRUPO, claves=('TipoSistema', 'Punto'),
+                 precision=PRECISION_BOSQUEJO):
+        self.variables = list(variables)
+        self.claves = list(claves)
+        self.precision = precision
+        self.momentos = None
+        self.bosquejo = None
+        self.filas = 0
+        # Huellas de las fuentes ya incorporadas, para no sumarlas dos veces
+        self.fuentes = []
+        # (TipoSistema, Punto, Campaña) ya incorporadas (ver registrar_filas)
+        self.incorporadas = set()
+
+    def actualizar(self, bloque):
+        """
+        Incorpora un bloque de filas (DataFrame con las claves y las variables)
+        """
+        if bloque.empty:
+            return self
+        self.momentos = combinar_momentos(self.momentos, _momentos_bloque(bloque, self.variables, self.claves))
+        self.bosquejo = self._combinar_bosquejos(
+            self.bosquejo, _bosquejo_bloque(bloque, self.variables, self.claves, self.precision))
+        self.filas += len(bloque)
+        return self
+
+    def filas_nuevas(self, bloque):
+        """
+        Filas del bloque cuya (TipoSistema, Punto, Campaña) no fue registrada
+        """
+        if not self.incorporadas or bloque.empty:
+            return bloque
+        return bloque.loc[~claves_fila(bloque).isin(self.incorporadas)].copy()
+
+    def registrar_filas(self, bloque):
+        """
+        Anota las claves (TipoSistema, Punto, Campaña) de un bloque ya incorporado
+        """
+        self.incorporadas.update(claves_fila(bloque))
+        return self
+
+    @staticmethod
+    def _combinar_bosquejos(a, b):
+        if a is None:
+            return b
+        if b is None:
+            return a
+        return a.add(b, fill_value=0).astype('int64')
+
+    def combinar(self, otro):
+        """
+        Incorpora el estado de otro acumulador con las mismas variables y claves
+        """
+        if otro.precision != self.precision:
+            raise ValueError("No se pueden combinar bosquejos con distinta precision")
+        self.momentos = combinar_momentos(self.momentos, otro.momentos)
+        self.bosquejo = self._combinar_bosquejos(self.bosquejo, otro.bosquejo)
+        self.filas += otro.filas
+        self.fuentes += otro.fuentes
+        self.incorporadas |= otro.incorporadas
+        return self
+
+    def resultado(self, decimales=3, percentiles=()):
+        """
+        Retorna las columnas {variable}_min/_max/_mean/_std (std poblacional)
+        con el mismo formato que estadisticas_por_grupo. Los percentiles (0-100)
+        pedidos se agregan como {variable}_p{n}, aproximados con el bosquejo.
+        """
+        if self.momentos is None:
+            return pd.DataFrame(columns=self.claves)
+
+        n = self.momentos['n']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            desviacion = np.sqrt(self.momentos['m2'] / n.where(n > 0))
+
+        partes = {'min': self.momentos['minimo'], 'max': self.momentos['maximo'],
+                  'mean': self.momentos['media'], 'std': desviacion}
+        if percentiles and self.bosquejo is not None:
+            cuantiles = cuantiles_bosquejo(self.bosquejo, self.claves, [p / 100 for p in percentiles])
+            for percentil in percentiles:
+                tabla = cuantiles[percentil / 100].reindex(index=n.index, columns=self.variables)
+                # El bosquejo tiene error relativo; se acota al rango observado
+                partes[f'p{percentil:g}'] = tabla.clip(self.momentos['minimo'], self.momentos['maximo'])
+        columnas = {f'{variable}_{nombre}': tabla[variable]
+                    for variable in self.variables for nombre, tabla in partes.items()}
+        resultado = pd.DataFrame(columnas)
+        if decimales is not None:
+            resultado = resultado.round(decimales)
+        return resultado.reset_index()
+
+    def guardar(self, ruta):
+        """
+        Guarda el estado (momentos, bosquejo, fuentes y claves incorporadas) en un .npz sin pickle
+        """
+        if self.momentos is None:
+            raise ValueError("El acumulador esta vacio")
+
+        indice = self.momentos['n'].index.to_frame(index=False)
+        arreglos = {
+            'variables': np.array(self.variables), 'claves': np.array(self.claves),
+            'precision': np.array(self.precision), 'filas': np.array(self.filas),
+            'fuentes': np.array(self.fuentes, dtype=str),
+            'incorporadas': np.array(sorted(self.incorporadas), dtype=str).reshape(-1, len(CLAVES_FILA)),
+        }
+        for clave in self.claves:
+            arreglos[f'clave_{clave}'] = indice[clave].astype(str).to_numpy(dtype=str)
+        for momento in MOMENTOS:
+            arreglos[f'momento_{momento}'] = self.momentos[momento][self.variables].to_numpy(dtype=float)
+
+        bosquejo = self.bosquejo.rename('Conteo').reset_index()
+        for columna in self.claves + ['Variable']:
+            arreglos[f'bosquejo_{columna}'] = bosquejo[columna].astype(str).to_numpy(dtype=str)
+        arreglos['bosquejo_Cubeta'] = bosquejo['Cubeta'].to_numpy(dtype=float)
+        arreglos['bosquejo_Conteo'] = bosquejo['Conteo'].to_numpy(dtype='int64')
+
+        temporal = ruta + '.tmp.npz'
+        np.savez_compressed(temporal, **arreglos)
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta):
+        """
+        Reconstruye un acumulador desde el .npz escrito por guardar
+        """
+        with np.load(ruta, allow_pickle=False) as arreglos:
+            claves = [str(c) for c in arreglos['claves']]
+            acumulador = cls([str(v) for v in arreglos['variables']], claves, float(arreglos['precision']))
+            acumulador.filas = int(arreglos['filas'])
+            acumulador.fuentes = [str(f) for f in arreglos['fuentes']]
+            # Los estados anteriores a las claves por fila no las tienen
+            if 'incorporadas' in arreglos.files:
+                acumulador.incorporadas = set(map(tuple, arreglos['incorporadas'].tolist()))
+
+            indice = pd.MultiIndex.from_arrays([arreglos[f'clave_{c}'] for c in claves], names=claves)
+            acumulador.momentos = {
+                momento: pd.DataFrame(arreglos[f'momento_{momento}'], index=indice, columns=acumulador.variables)
+                for momento in MOMENTOS
+            }
+
+            niveles = [arreglos[f'bosquejo_{c}'] for c in claves + ['Variable']] + [arreglos['bosquejo_Cubeta']]
+            acumulador.bosquejo = pd.Series(
+                arreglos['bosquejo_Conteo'],
+                index=pd.MultiIndex.from_arrays(niveles, names=claves + ['Variable', 'Cubeta']))
+        return acumulador
@@ -0,0 +1,125 @@
+"""
+LECTURA EN STREAMING DE EXPORTACIONES GRANDES
+Lee la hoja Datos de un libro Excel fila a fila (openpyxl en modo read-only),
+o exportaciones CSV/Parquet, y entrega bloques con solo las columnas pedidas.
+Las estadisticas por punto y los conteos de incumplimiento se actualizan
+bloque a bloque, asi la memoria queda acotada sin importar el tamano del archivo.
+"""
+
+import os
+
+import pandas as pd
+
+from modules.data_loader import COLUMNAS_CLAVE, VARIABLES_GRUPO
+from modules.lmp_analysis import calcular_porcentajes, evaluar_incumplimientos, indexar_limites
+from modules.stats_accumulator import AcumuladorEstadisticas
+
+TAMANO_BLOQUE = 50_000
+
+
+def _bloques_excel(ruta, columnas, tamano_bloque, hoja):
+    """
+    Recorre la hoja en modo read-only y arma bloques solo con las columnas pedidas
+    """
+    from openpyxl import load_workbook
+
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        filas = libro[hoja].iter_rows(values_only=True)
+        encabezado = next(filas, None)
+        if encabezado is None:
+            return
+        faltantes = [c for c in columnas if c not in encabezado]
+        if faltantes:
+            raise KeyError(f"Columnas no encontradas en la hoja {hoja}: {faltantes}")
+        posiciones = [encabezado.index(c) for c in columnas]
+
+        bloque = []
+        for fila in filas:
+            bloque.append([fila[i] for i in posiciones])
+            if len(bloque) == tamano_bloque:
+                yield pd.DataFrame(bloque, columns=columnas)
+                bloque = []
+        if bloque:
+            yield pd.DataFrame(bloque, columns=columnas)
+    finally:
+        libro.close()
+
+
+def _bloques_parquet(ruta, columnas, tamano_bloque):
+    """
+    Lee un Parquet por lotes de filas (requiere pyarrow)
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as error:
+        raise ImportError("Leer Parquet en streaming requiere pyarrow (pip install pyarrow)") from error
+
+    archivo = pq.ParquetFile(ruta)
+    for lote in archivo.iter_batches(batch_size=tamano_bloque, columns=list(columnas)):
+        yield lote.to_pandas()
+
+
+def leer_por_bloques(ruta, columnas=None, tamano_bloque=TAMANO_BLOQUE, hoja='Datos'):
+    """
+    Genera DataFrames de hasta tamano_bloque filas con las columnas indicadas.
+    Acepta .xlsx (hoja Datos), .csv y .parquet.
+    """
+    if columnas is None:
+        columnas = COLUMNAS_CLAVE + VARIABLES_GRUPO
+    extension = os.path.splitext(ruta)[1].lower()
+
+    if extension in ('.xlsx', '.xlsm'):
+        yield from _bloques_excel(ruta, columnas, tamano_bloque, hoja)
+    elif extension == '.csv':
+        yield from pd.read_csv(ruta, usecols=list(columnas), chunksize=tamano_bloque)
+    elif extension == '.parquet':
+        yield from _bloques_parquet(ruta, columnas, tamano_bloque)
+    else:
+        raise ValueError(f"Formato no soportado para streaming: {extension}")
+
+
+def analizar_en_streaming(ruta, limites, variables=VARIABLES_GRUPO, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Recorre el archivo una sola vez y calcula:
+      - estadisticas por (TipoSistema, Punto) con acumuladores de Welford
+      - conteo de incumplimientos por (Variable, Punto, Tipo)
+      - tabla Porcentajes sumando totales e incumplimientos de cada bloque
+    Retorna (df_estadisticas, df_conteo_incumplimientos, df_porcentajes).
+    """
+    acumulador = AcumuladorEstadisticas(variables)
+    indice_limites = indexar_limites(limites, variables)
+    conteo = None
+    totales = None
+
+    for numero, bloque in enumerate(leer_por_bloques(ruta, COLUMNAS_CLAVE + list(variables), tamano_bloque), 1):
+        for variable in variables:
+            bloque[variable] = pd.to_numeric(bloque[variable], errors='coerce')
+        acumulador.actualizar(bloque)
+
+        incumplimientos = evaluar_incumplimientos(bloque, indice_limites)
+        if not incumplimientos.empty:
+            parcial = incumplimientos.groupby(['Variable', 'Punto', 'Tipo'], sort=False).size()
+            conteo = parcial if conteo is None else conteo.add(parcial, fill_value=0)
+
+        porcentajes = calcular_porcentajes({'bloque': bloque}, limites, variables)
+        parcial = porcentajes.set_index('Variable')[['Total_Mediciones', 'Incumplimientos']]
+        totales = parcial if totales is None else totales.add(parcial, fill_value=0)
+
+        print(f"  - Bloque {numero}: {acumulador.filas} filas procesadas")
+
+    if conteo is None:
+        df_conteo = pd.DataFrame(columns=['Variable', 'Punto', 'Tipo', 'Incumplimientos'])
+    else:
+        df_conteo = conteo.astype(int).rename('Incumplimientos').reset_index()
+
+    if totales is None:
+        df_porcentajes = pd.DataFrame(columns=['Variable', 'Porcentaje_Incumplimiento',
+                                               'Total_Mediciones', 'Incumplimientos'])
+    else:
+        totales = totales.astype(int)
+        df_porcentajes = totales.assign(
+            Porcentaje_Incumplimiento=(totales['Incumplimientos'] / totales['Total_Mediciones'] * 100).round(2)
+        ).reset_index()[['Variable', 'Porcentaje_Incumplimiento', 'Total_Mediciones', 'Incumplimientos']]
+
+    return acumulador.resultado(), df_conteo, df_porcentajes
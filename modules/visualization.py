@@ -0,0 +1,595 @@
+"""
+REQUERIMIENTO iii: ANALISIS GRAFICO
+Graficas de patrones espaciales, temporales, comparativas, boxplots y LMP.
+
+Cada grafica es un trabajo (familia, variable, datos) donde datos son solo las
+series ya agregadas que necesita el dibujo. Los trabajos se pueden renderizar
+en serie o repartir en un pool de procesos con el backend Agg.
+matplotlib se importa recien al agregar o dibujar, asi los flujos sin
+graficas (estadisticas, LMP) no pagan su carga.
+
+Las series de cada variable se leen una sola vez, para todas las familias, de
+un indice denso punto x campaña x variable (modules.dense_index), y cada proceso reutiliza una figura por familia actualizando sus artistas.
+Los puntos, campañas y unidades salen del esquema de los datos
+(modules.schema) y viajan en los datos de cada trabajo.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from modules.schema import descubrir_esquema
+
+DIRECTORIO_GRAFICAS = 'results/graficas'
+MANIFIESTO = 'manifiesto.json'
+DPI = 300
+
+# Subir al cambiar el codigo de dibujo para invalidar las huellas guardadas
+VERSION_ESTILO = 3
+
+# Colores fijos de los puntos conocidos; el resto toma la paleta en orden
+COLORES_SISTEMA = {'Rio': 'blue', 'Potable': 'green', 'Residual': 'red'}
+COLORES_PUNTO = {'P1': 'blue', 'P2': 'lightblue', 'P3': 'green', 'P4': 'lightgreen',
+                 'P5': 'red', 'P6': 'pink', 'P7': 'orange', 'P8': 'yellow'}
+COLORES_CLAVE = {'P3': 'green', 'P7': 'red', 'P1': 'blue', 'P8': 'orange'}
+PALETA = ['tab:blue', 'tab:orange', 'tab:green', 'tab:red', 'tab:purple',
+          'tab:brown', 'tab:pink', 'tab:gray', 'tab:olive', 'tab:cyan']
+
+# Con mas entradas la leyenda tapa el grafico y con mas etiquetas el eje x no se lee
+MAX_LEYENDA = 20
+MAX_ETIQUETAS_EJE = 40
+
+NOMBRES_ARCHIVO = {
+    'espacial': 'espacial_todos_{}.png',
+    'temporal': 'temporal_todos_{}.png',
+    'comparativa': 'comparativa_{}.png',
+    'boxplot': 'boxplot_{}.png',
+    'lmp': 'lmp_{}.png',
+    'panel': 'panel_{}.png',
+}
+
+FAMILIAS = [
+    ('espacial', "Generando graficas de patrones espaciales (todos los puntos)"),
+    ('temporal', "Generando graficas de patrones temporales (todos los puntos)"),
+    ('comparativa', "Generando graficas comparativas"),
+    ('boxplot', "Generando boxplots por campaña"),
+]
+
+
+def _etiqueta_eje(variable, datos):
+    return f'{variable} ({datos["unidad"]})'
+
+
+def _colores(puntos, fijos):
+    return [fijos.get(punto) or PALETA[i % len(PALETA)] for i, punto in enumerate(puntos)]
+
+
+def disposicion_grafica(esquema):
+    """
+    Puntos, campañas y colores de las graficas segun el esquema de los datos
+    """
+    return {'puntos': esquema.puntos, 'campanas': esquema.campanas, 'puntos_clave': esquema.puntos_clave,
+            'colores_punto': _colores(esquema.puntos, COLORES_PUNTO),
+            'colores_clave': _colores(esquema.puntos_clave, COLORES_CLAVE)}
+
+
+def _base_trabajo(variable, esquema):
+    return {'disposicion': disposicion_grafica(esquema), 'unidad': esquema.unidad(variable)}
+
+
+def nombre_grafica(familia, variable):
+    return NOMBRES_ARCHIVO[familia].format(variable)
+
+
+# --- Agregacion (proceso principal) ---
+
+def agregar_variable(datos_organizados, variable, esquema=None, indice=None):
+    """
+    Resumen por punto y series por campaña de una variable, leidos del indice
+    denso (modules.dense_index) una sola vez para todas las familias de graficas:
+      - resumen: {punto: (tipo_sistema, media, desviacion)} con desviacion poblacional
+      - series: {punto: [primer valor no nulo de cada campaña o None]}
+    indice: IndicePuntoCampana con la variable; si no se da se construye.
+    """
+    if indice is None:
+        from modules.dense_index import construir_indice
+
+        indice = construir_indice(datos_organizados, [variable], esquema)
+    return {'resumen': indice.resumen(variable), 'series': indice.series(variable)}
+
+
+def _agregado(datos_organizados, variable, agregado, clave, esquema):
+    if agregado is None:
+        agregado = agregar_variable(datos_organizados, variable, esquema)
+    return agregado[clave]
+
+
+def preparar_espacial(datos_organizados, variable, agregado=None, esquema=None):
+    esquema = esquema or descubrir_esquema(datos_organizados)
+    return {**_base_trabajo(variable, esquema),
+            'resumen': _agregado(datos_organizados, variable, agregado, 'resumen', esquema)}
+
+
+def preparar_temporal(datos_organizados, variable, agregado=None, esquema=None):
+    esquema = esquema or descubrir_esquema(datos_organizados)
+    return {**_base_trabajo(variable, esquema),
+            'series': _agregado(datos_organizados, variable, agregado, 'series', esquema)}
+
+
+def preparar_comparativa(datos_organizados, variable, agregado=None, esquema=None):
+    esquema = esquema or descubrir_esquema(datos_organizados)
+    series = _agregado(datos_organizados, variable, agregado, 'series', esquema)
+    resumen = _agregado(datos_organizados, variable, agregado, 'resumen', esquema)
+    return {**_base_trabajo(variable, esquema),
+            'series': {p: series[p] for p in esquema.puntos_clave if p in series},
+            'medias': {p: resumen[p][1] for p in resumen}}
+
+
+def preparar_boxplot(datos_organizados, variable, agregado=None, esquema=None):
+    """
+    Calcula en el proceso principal los cuartiles y bigotes de cada campaña,
+    asi el trabajo solo lleva estadisticas y no las mediciones
+    """
+    import pandas as pd
+    from matplotlib import cbook
+
+    esquema = esquema or descubrir_esquema(datos_organizados)
+    # Una sola agrupacion por campaña (conserva el orden de las mediciones)
+    mediciones = pd.concat([df[['Campaña', variable]] for df in datos_organizados.values()])
+    por_campana = {campana: grupo.to_numpy() for campana, grupo in
+                   mediciones.dropna(subset=[variable]).groupby('Campaña', sort=False, observed=True)[variable]}
+
+    estadisticas = []
+    for campana in esquema.campanas:
+        valores = por_campana.get(campana, [])
+        caja = cbook.boxplot_stats(valores)[0] if len(valores) else {
+            'med': float('nan'), 'q1': float('nan'), 'q3': float('nan'),
+            'whislo': float('nan'), 'whishi': float('nan'), 'fliers': []}
+        caja['label'] = campana
+        estadisticas.append(caja)
+    return {**_base_trabajo(variable, esquema), 'cajas': estadisticas}
+
+
+def preparar_lmp(datos_organizados, variable, lmp_max, agregado=None, esquema=None):
+    esquema = esquema or descubrir_esquema(datos_organizados)
+    return {**_base_trabajo(variable, esquema),
+            'resumen': _agregado(datos_organizados, variable, agregado, 'resumen', esquema), 'lmp_max': lmp_max}
+
+
+PREPARADORES = {
+    'espacial': preparar_espacial,
+    'temporal': preparar_temporal,
+    'comparativa': preparar_comparativa,
+    'boxplot': preparar_boxplot,
+}
+
+
+# --- Dibujo (proceso principal o trabajador) ---
+#
+# Cada familia tiene un creador, que arma los artistas una sola vez sobre sus
+# ejes, y un actualizador, que les carga los datos de una variable (alturas de
+# barras, set_data de lineas, textos y limites). Cada proceso guarda una
+# plantilla (figura, ejes, artistas) por familia y disposicion (puntos y
+# campañas) y la reutiliza para todas las variables; el modo panel usa los
+# mismos creadores en una figura con una fila de subplots por variable.
+
+def _figura(filas=1, columnas=1, tamano=(10, 6)):
+    """
+    Figura de matplotlib sin pyplot (no queda registrada ni hay que cerrarla)
+    """
+    from matplotlib.figure import Figure
+
+    figura = Figure(figsize=tamano)
+    ejes = figura.subplots(filas, columnas, squeeze=False)
+    return figura, ejes
+
+
+def _etiquetar(ax, titulo, xlabel, ylabel):
+    ax.set_title(titulo)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+
+
+def _reescalar(ax, puntos_extra=()):
+    """
+    Recalcula los limites con los artistas visibles (y puntos extra, p. ej. barras de error)
+    """
+    ax.relim(visible_only=True)
+    if len(puntos_extra):
+        ax.update_datalim(puntos_extra)
+    ax.autoscale_view()
+
+
+def _leyenda(ax, handles, **opciones):
+    """
+    Leyenda solo si cabe; con demasiadas entradas se quita
+    """
+    if len(handles) <= MAX_LEYENDA:
+        ax.legend(handles=handles, **opciones)
+    elif ax.get_legend() is not None:
+        ax.get_legend().remove()
+
+
+def _eje_categorias(ax, cantidad):
+    """
+    Con muchas categorias en x se muestra solo una parte de las etiquetas, en vertical
+    """
+    if cantidad > MAX_ETIQUETAS_EJE:
+        from matplotlib.ticker import MaxNLocator
+
+        ax.xaxis.set_major_locator(MaxNLocator(MAX_ETIQUETAS_EJE, integer=True))
+        ax.tick_params(axis='x', labelrotation=90)
+
+
+def _crear_barras(ax, disposicion, con_error=False):
+    puntos = disposicion['puntos']
+    barras = ax.bar(puntos, [0.0] * len(puntos), alpha=0.7)
+    artistas = {'barras': barras}
+    if con_error:
+        # Mismo estilo que bar(yerr=..., capsize=5)
+        artistas['error'] = ax.errorbar(range(len(puntos)), [0.0] * len(puntos), yerr=[0.0] * len(puntos),
+                                        fmt='none', ecolor='k', capsize=5)
+    ax.grid(True, alpha=0.3)
+    _eje_categorias(ax, len(puntos))
+    return artistas
+
+
+def _crear_espacial(ejes, disposicion):
+    return _crear_barras(ejes[0], disposicion, con_error=True)
+
+
+def _actualizar_espacial(ejes, artistas, variable, datos):
+    """
+    Barras de la media por punto con desviacion estandar, coloreadas por sistema
+    """
+    ax = ejes[0]
+    puntos = datos['disposicion']['puntos']
+    medias, desviaciones, leyenda = [], [], {}
+    for barra, punto in zip(artistas['barras'], puntos):
+        sistema, media, desviacion = datos['resumen'].get(punto, ('Desconocido', 0, 0))
+        barra.set_height(media)
+        barra.set_facecolor(COLORES_SISTEMA.get(sistema, 'gray'))
+        barra.set_alpha(0.7)
+        leyenda.setdefault(sistema, barra)
+        medias.append(media)
+        desviaciones.append(desviacion)
+
+    _linea, (inferior, superior), (verticales,) = artistas['error'].lines
+    posiciones = list(range(len(puntos)))
+    bajos = [m - d for m, d in zip(medias, desviaciones)]
+    altos = [m + d for m, d in zip(medias, desviaciones)]
+    inferior.set_data(posiciones, bajos)
+    superior.set_data(posiciones, altos)
+    verticales.set_segments([[(x, b), (x, a)] for x, b, a in zip(posiciones, bajos, altos)])
+
+    _etiquetar(ax, f'Patron Espacial - {variable}\nComparacion entre TODOS los puntos de muestreo',
+               'Puntos de Muestreo', _etiqueta_eje(variable, datos))
+    ax.legend(list(leyenda.values()), list(leyenda))
+    _reescalar(ax, list(zip(posiciones, bajos)) + list(zip(posiciones, altos)))
+
+
+def _crear_temporal(ejes, disposicion):
+    ax = ejes[0]
+    campanas = disposicion['campanas']
+    lineas = {punto: ax.plot(campanas, [float('nan')] * len(campanas), marker='o', label=punto,
+                             color=color, linewidth=2, markersize=6)[0]
+              for punto, color in zip(disposicion['puntos'], disposicion['colores_punto'])}
+    ax.grid(True, alpha=0.3)
+    _eje_categorias(ax, len(campanas))
+    return {'lineas': lineas}
+
+
+def _actualizar_temporal(ejes, artistas, variable, datos):
+    """
+    Evolucion de la variable por campaña para todos los puntos
+    """
+    ax = ejes[0]
+    visibles = []
+    for punto, linea in artistas['lineas'].items():
+        valores = datos['series'].get(punto)
+        visible = bool(valores) and any(v is not None for v in valores)
+        linea.set_visible(visible)
+        if visible:
+            linea.set_ydata([v if v is not None else float('nan') for v in valores])
+            visibles.append(linea)
+
+    _etiquetar(ax, f'Patron Temporal - {variable}\nEvolucion por Campañas - TODOS los puntos',
+               'Campaña', _etiqueta_eje(variable, datos))
+    _leyenda(ax, visibles, bbox_to_anchor=(1.05, 1), loc='upper left')
+    _reescalar(ax)
+
+
+def _crear_comparativa(ejes, disposicion):
+    ax1, ax2 = ejes
+    campanas, puntos = disposicion['campanas'], disposicion['puntos']
+    lineas = {punto: ax1.plot(campanas, [0.0] * len(campanas), marker='s', label=punto,
+                              color=color, linewidth=2.5, markersize=8)[0]
+              for punto, color in zip(disposicion['puntos_clave'], disposicion['colores_clave'])}
+    ax1.grid(True, alpha=0.3)
+    _eje_categorias(ax1, len(campanas))
+    barras = ax2.bar(puntos, [0.0] * len(puntos), color=disposicion['colores_punto'], alpha=0.7)
+    ax2.grid(True, alpha=0.3)
+    _eje_categorias(ax2, len(puntos))
+    return {'lineas': lineas, 'barras': barras}
+
+
+def _actualizar_comparativa(ejes, artistas, variable, datos):
+    """
+    Puntos clave por campaña junto al promedio de todos los puntos
+    """
+    ax1, ax2 = ejes
+    visibles = []
+    for punto, linea in artistas['lineas'].items():
+        valores = datos['series'].get(punto)
+        linea.set_visible(valores is not None)
+        if valores is not None:
+            linea.set_ydata([v if v is not None else 0 for v in valores])
+            visibles.append(linea)
+    _etiquetar(ax1, f'Puntos Clave - {variable}', 'Campaña', _etiqueta_eje(variable, datos))
+    _leyenda(ax1, visibles)
+    _reescalar(ax1)
+
+    for barra, punto in zip(artistas['barras'], datos['disposicion']['puntos']):
+        barra.set_visible(punto in datos['medias'])
+        barra.set_height(datos['medias'].get(punto, 0.0))
+    _etiquetar(ax2, f'Todos los Puntos - {variable}', 'Puntos de Muestreo', _etiqueta_eje(variable, datos))
+    _reescalar(ax2)
+
+
+def _crear_boxplot(ejes, disposicion):
+    return {}
+
+
+def _actualizar_boxplot(ejes, artistas, variable, datos):
+    """
+    Distribucion de la variable por campaña (todos los puntos).
+    Las cajas cambian de forma con los datos: se redibujan sobre los mismos ejes.
+    """
+    ax = ejes[0]
+    ax.cla()
+    ax.bxp(datos['cajas'])
+    _etiquetar(ax, f'Distribucion de {variable} por Campaña', 'Campaña', _etiqueta_eje(variable, datos))
+    ax.grid(True, alpha=0.3)
+    _eje_categorias(ax, len(datos['cajas']))
+
+
+def _crear_lmp(ejes, disposicion):
+    artistas = _crear_barras(ejes[0], disposicion)
+    artistas['limite'] = ejes[0].axhline(y=0, color='red', linestyle='--', linewidth=2)
+    return artistas
+
+
+def _actualizar_lmp(ejes, artistas, variable, datos):
+    """
+    Promedio por punto con la linea del limite maximo permisible
+    """
+    ax = ejes[0]
+    for barra, punto in zip(artistas['barras'], datos['disposicion']['puntos']):
+        sistema, media, _desviacion = datos['resumen'].get(punto, ('Desconocido', 0.0, 0.0))
+        barra.set_visible(punto in datos['resumen'])
+        barra.set_height(media)
+        barra.set_facecolor(COLORES_SISTEMA.get(sistema, 'gray'))
+        barra.set_alpha(0.7)
+
+    lmp_max = datos['lmp_max']
+    limite = artistas['limite']
+    con_limite = lmp_max is not None and lmp_max == lmp_max  # No es NaN
+    limite.set_visible(con_limite)
+    if con_limite:
+        limite.set_ydata([lmp_max, lmp_max])
+        limite.set_label(f'LMP Max: {lmp_max}')
+        ax.legend(handles=[limite])
+    elif ax.get_legend() is not None:
+        ax.get_legend().remove()
+
+    _etiquetar(ax, f'Evaluacion LMP - {variable}\nLinea roja = Limite Maximo Permisible',
+               'Puntos de Muestreo', _etiqueta_eje(variable, datos))
+    _reescalar(ax)
+
+
+# familia: (creador, actualizador, ejes por variable, tamaño por variable, tight_layout)
+PLANTILLAS = {
+    'espacial': (_crear_espacial, _actualizar_espacial, 1, (14, 6), False),
+    'temporal': (_crear_temporal, _actualizar_temporal, 1, (14, 8), True),
+    'comparativa': (_crear_comparativa, _actualizar_comparativa, 2, (16, 6), True),
+    'boxplot': (_crear_boxplot, _actualizar_boxplot, 1, (10, 6), False),
+    'lmp': (_crear_lmp, _actualizar_lmp, 1, (12, 6), False),
+}
+
+# Plantillas ya armadas en este proceso: {(familia, puntos, campañas, puntos clave): (figura, ejes, artistas)}
+_plantillas_creadas = {}
+
+
+def _plantilla(familia, disposicion):
+    clave = (familia, tuple(disposicion['puntos']), tuple(disposicion['campanas']),
+             tuple(disposicion['puntos_clave']))
+    if clave not in _plantillas_creadas:
+        crear, _actualizar, columnas, tamano, _ajustar = PLANTILLAS[familia]
+        figura, ejes = _figura(1, columnas, tamano)
+        _plantillas_creadas[clave] = (figura, list(ejes[0]), crear(list(ejes[0]), disposicion))
+    return _plantillas_creadas[clave]
+
+
+def _guardar(figura, nombre, directorio):
+    figura.savefig(os.path.join(directorio, nombre), dpi=DPI, bbox_inches='tight')
+    return nombre
+
+
+def dibujar(familia, variable, datos, directorio):
+    """
+    Dibuja una grafica reutilizando la plantilla de su familia
+    """
+    _crear, actualizar, _columnas, _tamano, ajustar = PLANTILLAS[familia]
+    figura, ejes, artistas = _plantilla(familia, datos['disposicion'])
+    actualizar(ejes, artistas, variable, datos)
+    if ajustar:
+        figura.tight_layout()
+    return _guardar(figura, nombre_grafica(familia, variable), directorio)
+
+
+def dibujar_espacial(variable, datos, directorio):
+    return dibujar('espacial', variable, datos, directorio)
+
+
+def dibujar_temporal(variable, datos, directorio):
+    return dibujar('temporal', variable, datos, directorio)
+
+
+def dibujar_comparativa(variable, datos, directorio):
+    return dibujar('comparativa', variable, datos, directorio)
+
+
+def dibujar_boxplot(variable, datos, directorio):
+    return dibujar('boxplot', variable, datos, directorio)
+
+
+def dibujar_lmp(variable, datos, directorio):
+    return dibujar('lmp', variable, datos, directorio)
+
+
+def dibujar_panel(familia, datos, directorio):
+    """
+    Todas las variables de una familia en una figura, una fila de subplots por variable.
+    datos: {'variables': [...], 'datos': [datos de cada variable]}
+    """
+    crear, actualizar, columnas, (ancho, alto), _ajustar = PLANTILLAS[familia]
+    variables = datos['variables']
+    figura, ejes = _figura(len(variables), columnas, (ancho, alto * len(variables)))
+    for fila, variable, datos_variable in zip(ejes, variables, datos['datos']):
+        actualizar(list(fila), crear(list(fila), datos_variable['disposicion']), variable, datos_variable)
+    figura.tight_layout()
+    return _guardar(figura, nombre_grafica('panel', familia), directorio)
+
+
+DIBUJANTES = {
+    'espacial': dibujar_espacial,
+    'temporal': dibujar_temporal,
+    'comparativa': dibujar_comparativa,
+    'boxplot': dibujar_boxplot,
+    'lmp': dibujar_lmp,
+    'panel': dibujar_panel,
+}
+
+
+def _renderizar_trabajo(trabajo):
+    """
+    Dibuja un trabajo (familia, variable, datos, directorio); se ejecuta en el trabajador
+    """
+    familia, variable, datos, directorio = trabajo
+    return DIBUJANTES[familia](variable, datos, directorio)
+
+
+def _a_json(valor):
+    """
+    Convierte arreglos y escalares de NumPy para poder serializar los datos de un trabajo
+    """
+    if hasattr(valor, 'tolist'):
+        return valor.tolist()
+    raise TypeError(f"No serializable: {type(valor).__name__}")
+
+
+def huella_grafica(familia, variable, datos):
+    """
+    Huella SHA-256 de todo lo que determina una grafica: familia, variable,
+    series agregadas, disposicion (puntos, campañas, colores, unidad), limites
+    y configuracion de estilo
+    """
+    estilo = {'version': VERSION_ESTILO, 'dpi': DPI, 'colores_sistema': COLORES_SISTEMA}
+    contenido = json.dumps([familia, variable, datos, estilo], sort_keys=True, default=_a_json)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def _leer_manifiesto(directorio):
+    ruta = os.path.join(directorio, MANIFIESTO)
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+
+def _escribir_manifiesto(directorio, manifiesto):
+    ruta = os.path.join(directorio, MANIFIESTO)
+    with open(ruta + '.tmp', 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo, indent=2, sort_keys=True)
+    os.replace(ruta + '.tmp', ruta)
+
+
+def renderizar_graficas(trabajos, trabajadores=None, directorio=DIRECTORIO_GRAFICAS, incremental=True):
+    """
+    Renderiza una lista de trabajos (familia, variable, datos).
+    trabajadores: procesos del pool (None = todos los nucleos, 1 = en serie).
+    incremental: omite las graficas cuya huella coincide con la del manifiesto
+    y cuyo archivo todavia existe.
+    Retorna los nombres de archivo en el mismo orden que los trabajos.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    manifiesto = _leer_manifiesto(directorio) if incremental else {}
+
+    nombres = []
+    pendientes = []
+    huellas = {}
+    for familia, variable, datos in trabajos:
+        nombre = nombre_grafica(familia, variable)
+        huellas[nombre] = huella_grafica(familia, variable, datos)
+        nombres.append(nombre)
+        sin_cambios = (manifiesto.get(nombre) == huellas[nombre]
+                       and os.path.exists(os.path.join(directorio, nombre)))
+        if not sin_cambios:
+            pendientes.append((familia, variable, datos, directorio))
+
+    if trabajadores is None:
+        trabajadores = os.cpu_count() or 1
+    trabajadores = min(trabajadores, len(pendientes))
+
+    if trabajadores <= 1:
+        reconstruidas = [_renderizar_trabajo(trabajo) for trabajo in pendientes]
+    else:
+        with ProcessPoolExecutor(max_workers=trabajadores) as pool:
+            reconstruidas = list(pool.map(_renderizar_trabajo, pendientes))
+
+    for nombre in reconstruidas:
+        print(f"  - Grafica guardada: {nombre}")
+    if reconstruidas:
+        # Releer antes de escribir para no perder entradas de otras etapas
+        _escribir_manifiesto(directorio, {**_leer_manifiesto(directorio),
+                                          **{n: huellas[n] for n in reconstruidas}})
+
+    print(f"  Graficas reconstruidas: {len(reconstruidas)}, "
+          f"omitidas sin cambios: {len(nombres) - len(reconstruidas)}")
+    return nombres
+
+
+def generar_graficas_patrones(datos_organizados, limites=None, trabajadores=None, incremental=True,
+                              directorio=DIRECTORIO_GRAFICAS, paneles=False, esquema=None):
+    """
+    Genera las graficas espaciales, temporales, comparativas y boxplots de las
+    variables clave del esquema en directorio. Con incremental=True solo se
+    redibujan las graficas cuyos datos o estilo cambiaron.
+    paneles: una figura por familia con todas las variables como subplots
+    (panel_<familia>.png) en vez de una grafica por variable.
+    esquema: EsquemaDatos (por defecto se descubre de datos_organizados).
+    """
+    esquema = esquema or descubrir_esquema(datos_organizados, limites)
+    variables = esquema.variables_clave
+    if not variables:
+        print("\n  Ninguna variable clave configurada esta en los datos")
+        return
+    from modules.dense_index import construir_indice
+
+    # Un solo indice punto x campaña x variable para todas las familias
+    indice = construir_indice(datos_organizados, variables, esquema)
+    agregados = {variable: agregar_variable(datos_organizados, variable, esquema, indice) for variable in variables}
+    trabajos = []
+    for familia, descripcion in FAMILIAS:
+        print(f"\n  - {descripcion}...")
+        datos = [PREPARADORES[familia](datos_organizados, variable, agregados[variable], esquema)
+                 for variable in variables]
+        if paneles:
+            trabajos.append(('panel', familia, {'variables': variables, 'datos': datos}))
+        else:
+            trabajos.extend((familia, variable, d) for variable, d in zip(variables, datos))
+
+    print(f"\n  Renderizando {len(trabajos)} graficas...")
+    nombres = renderizar_graficas(trabajos, trabajadores, directorio=directorio, incremental=incremental)
+    print(f"\n  {len(nombres)} graficas al dia en '{directorio}/'")
@@ -3,23 +3,20 @@ REQUERIMIENTO 1: LECTURA Y ORGANIZACION DE DATOS
 Variables del grupo: Turbiedad, Color aparente, Coliformes totales, Coliformes fecales, Caudal, Precipitacion
 """
 
-import pandas as pd
+from modules.data_loader import cargar_datos
+from modules.schema import cargar_esquema
 
 print("=== REQUERIMIENTO 1: LECTURA Y ORGANIZACION DE DATOS ===\n")
 
 # 1. Cargar datos
 print("1. Cargando datos desde Excel...")
-datos = pd.read_excel('data/VillaVerde_WaterSystemData.xlsx', sheet_name='Datos')
-coordenadas = pd.read_excel('data/VillaVerde_WaterSystemData.xlsx', sheet_name='Coordenadas')
-limites = pd.read_excel('data/VillaVerde_WaterSystemData.xlsx', sheet_name='Limites')
-
-print("Datos cargados exitosamente")
-print(f"  - Datos principales: {datos.shape[0]} filas, {datos.shape[1]} columnas")
-print(f"  - Coordenadas: {coordenadas.shape[0]} puntos")
-print(f"  - Limites: {limites.shape[0]} regulaciones")
+# Se parsea el Excel una sola vez; las siguientes ejecuciones leen la cache columnar
+datos, coordenadas, limites = cargar_datos()
+# Puntos, campañas, sistemas y variables descubiertos del libro (cacheado)
+esquema = cargar_esquema(hojas={'Datos': datos, 'Limites': limites})
 
 # 2. Filtrar solo las variables de nuestro grupo
-variables_grupo = ['Turb_NTU', 'Color_PtCo', 'Coli_tot_NMP100mL', 'Coli_fec_NMP100mL', 'Caudal_Ls', 'Precip_mm_d']
+variables_grupo = esquema.variables_grupo
 columnas_mantener = ['Punto', 'TipoSistema', 'Campaña'] + variables_grupo
 
 datos_filtrados = datos[columnas_mantener].copy()
@@ -31,20 +28,18 @@ datos_completos = datos_filtrados.merge(coordenadas[['Punto', 'Descripcion']],
 print("\nColumnas disponibles después del merge:")
 print(datos_completos.columns.tolist())
 
-# 4. Organizar por tipo de sistema (usar la columna correcta)
-potable = datos_completos[datos_completos['TipoSistema'] == 'Potable']
-residual = datos_completos[datos_completos['TipoSistema'] == 'Residual']
-rio = datos_completos[datos_completos['TipoSistema'] == 'Rio']
+# 4. Organizar por tipo de sistema (todos los sistemas del esquema)
+por_sistema = {sistema: datos_completos[datos_completos['TipoSistema'] == sistema]
+               for sistema in esquema.sistemas}
 
 print("\n2. Datos organizados por tipo de sistema:")
-print(f"  - Potable: {len(potable)} registros")
-print(f"  - Residual: {len(residual)} registros") 
-print(f"  - Rio: {len(rio)} registros")
+for sistema, df in por_sistema.items():
+    print(f"  - {sistema}: {len(df)} registros")
 
 # 5. Mostrar informacion basica
 print("\n3. Informacion de datos:")
-print(f"Puntos de monitoreo: {list(datos_completos['Punto'].unique())}")
-print(f"Campañas: {list(datos_completos['Campaña'].unique())}")
+print(f"Puntos de monitoreo: {esquema.puntos}")
+print(f"Campañas: {esquema.campanas}")
 print(f"Variables de nuestro grupo: {variables_grupo}")
 
 # 6. Mostrar limites cargados
@@ -64,11 +59,8 @@ for index, fila in limites_grupo.iterrows():
 
 # 7. Vista previa
 print("\n5. Vista previa de datos (primeras 2 filas por sistema):")
-print("\nPotable:")
-print(potable.head(2))
-print("\nResidual:")
-print(residual.head(2)) 
-print("\nRio:")
-print(rio.head(2))
+for sistema, df in por_sistema.items():
+    print(f"\n{sistema}:")
+    print(df.head(2))
 
 print("\nREQUERIMIENTO 1 COMPLETADO")
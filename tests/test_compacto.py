@@ -0,0 +1,38 @@
+"""
+Pruebas del modo compacto de organizar_datos contra la tabla ancha habitual
+"""
+
+import contextlib
+import io
+
+from pandas.testing import assert_frame_equal
+
+from modules.data_loader import RUTA_DATOS, cargar_hojas, organizar_datos
+from modules.descriptive_stats import construir_tablas_estadisticas
+from modules.lmp_analysis import calcular_porcentajes, identificar_incumplimientos
+from modules.schema import descubrir_esquema
+
+
+def test_etapas_sobre_tabla_compacta_igual_a_tabla_ancha():
+    hojas = cargar_hojas(RUTA_DATOS, ['Datos', 'Coordenadas', 'Limites'])
+    ancha = organizar_datos(hojas['Datos'], hojas['Coordenadas'])
+    compacta = organizar_datos(hojas['Datos'], hojas['Coordenadas'], compacto=True)
+    limites = hojas['Limites']
+    variables = descubrir_esquema(ancha, limites).variables_grupo
+
+    assert list(compacta) == list(ancha)
+    for sistema, df in ancha.items():
+        assert list(compacta[sistema].columns) == list(df.columns)
+        assert compacta[sistema].memory_usage(deep=True).sum() < df.memory_usage(deep=True).sum()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        esperadas = construir_tablas_estadisticas(ancha, variables)
+        obtenidas = construir_tablas_estadisticas(compacta, variables)
+    assert [n for n, _ in obtenidas] == [n for n, _ in esperadas]
+    for (nombre, df_esperado), (_, df_obtenido) in zip(esperadas, obtenidas):
+        assert_frame_equal(df_obtenido, df_esperado, check_dtype=False, check_categorical=False, obj=nombre)
+
+    for funcion in (identificar_incumplimientos, calcular_porcentajes):
+        assert_frame_equal(funcion(compacta, limites, variables).reset_index(drop=True),
+                           funcion(ancha, limites, variables).reset_index(drop=True),
+                           check_dtype=False, check_categorical=False)
@@ -0,0 +1,52 @@
+"""
+Pruebas de la ejecucion por fragmentos contra la ejecucion en un solo proceso
+"""
+
+import contextlib
+import io
+
+import pytest
+from pandas.testing import assert_frame_equal
+
+from benchmarks.datos_sinteticos import generar_libro
+from modules.data_loader import RUTA_DATOS, cargar_hojas, organizar_datos
+from modules.descriptive_stats import construir_tablas_estadisticas
+from modules.lmp_analysis import calcular_porcentajes, identificar_incumplimientos
+from modules.schema import descubrir_esquema
+from modules.sharding import analizar_por_fragmentos
+
+
+def _libro_real():
+    return cargar_hojas(RUTA_DATOS, ['Datos', 'Coordenadas', 'Limites'])
+
+
+def _libro_sintetico():
+    with contextlib.redirect_stdout(io.StringIO()):
+        return generar_libro(60, 5)
+
+
+@pytest.mark.parametrize('libro', [_libro_real, _libro_sintetico], ids=['real', 'sintetico'])
+def test_fragmentos_con_pool_igual_a_un_proceso(libro):
+    hojas = libro()
+    datos_organizados = organizar_datos(hojas['Datos'], hojas['Coordenadas'])
+    limites = hojas['Limites']
+    variables = descubrir_esquema(datos_organizados, limites).variables_grupo
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        esperadas = [(nombre, df) for nombre, df in construir_tablas_estadisticas(datos_organizados, variables)
+                     if nombre.endswith('_Puntos')]
+        # Un pool real (3 procesos), no la ruta en serie de trabajadores=1
+        obtenido = analizar_por_fragmentos(datos_organizados, limites, variables, trabajadores=3)
+
+    assert [n for n, _ in obtenido['estadisticas']] == [n for n, _ in esperadas]
+    for (nombre, df_esperado), (_, df_obtenido) in zip(esperadas, obtenido['estadisticas']):
+        assert_frame_equal(df_obtenido, df_esperado, check_dtype=False, obj=nombre)
+
+    # Mismos incumplimientos y en el mismo orden que la evaluacion en un proceso
+    incumplimientos = identificar_incumplimientos(datos_organizados, limites, variables)
+    assert not incumplimientos.empty
+    assert_frame_equal(obtenido['incumplimientos'].reset_index(drop=True), incumplimientos.reset_index(drop=True),
+                       check_dtype=False)
+    assert_frame_equal(obtenido['porcentajes'].reset_index(drop=True),
+                       calcular_porcentajes(datos_organizados, limites, variables).reset_index(drop=True),
+                       check_dtype=False)
@@ -0,0 +1,22 @@
+"""
+Pruebas del analisis en streaming contra el analisis en memoria
+"""
+
+import contextlib
+import io
+
+import pandas as pd
+
+from modules.data_loader import RUTA_DATOS, cargar_hojas, organizar_datos
+from modules.lmp_analysis import calcular_porcentajes
+from modules.streaming import analizar_en_streaming
+
+
+def test_porcentajes_con_variables_no_predeterminadas():
+    hojas = cargar_hojas(RUTA_DATOS, ['Datos', 'Coordenadas', 'Limites'])
+    variables = ['Turb_NTU']
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, _, porcentajes = analizar_en_streaming(RUTA_DATOS, hojas['Limites'], variables, tamano_bloque=7)
+    esperado = calcular_porcentajes(organizar_datos(hojas['Datos'], hojas['Coordenadas']), hojas['Limites'],
+                                    variables)
+    pd.testing.assert_frame_equal(porcentajes, esperado, check_dtype=False)